@@ -67,5 +67,8 @@ if __name__ == "__main__":
             make_artifacts=vivarium_csu_swissre_colorectal_cancer.tools.cli:make_artifacts
             make_results=vivarium_csu_swissre_colorectal_cancer.tools.cli:make_results
             make_specs=vivarium_csu_swissre_colorectal_cancer.tools.cli:make_specs
+            make_synthetic_artifact=vivarium_csu_swissre_colorectal_cancer.tools.cli:make_synthetic_artifact
+            benchmark_artifact_storage=vivarium_csu_swissre_colorectal_cancer.tools.cli:benchmark_artifact_storage
+            run_sweep=vivarium_csu_swissre_colorectal_cancer.tools.cli:run_sweep_locally
         '''
     )
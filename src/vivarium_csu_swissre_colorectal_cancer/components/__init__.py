@@ -6,3 +6,6 @@ from .observers import (DisabilityObserver,
 from .risk_effect import LogNormalRiskEffect
 from .screening import ScreeningAlgorithm
 from .intervention import ScreeningScaleUp
+from .replicates import ReplicatedPopulation
+from .population import LivingIndex
+from .importance_sampling import SimulantWeights, WeightedPopulation
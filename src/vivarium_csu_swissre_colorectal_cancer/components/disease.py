@@ -1,3 +1,4 @@
+import collections
 import math
 import itertools
 import typing
@@ -9,7 +10,8 @@ from vivarium_public_health.disease import (DiseaseState as DiseaseState_, Disea
                                             RateTransition as RateTransition_, RecoveredState, SusceptibleState)
 
 from ..constants import data_keys, data_values, metadata, models
-from ..utilities import get_random_variable
+from ..data.cache import get_file_fingerprint
+from ..utilities import get_random_variable, is_stored_by_draw, read_data_by_draw
 
 if typing.TYPE_CHECKING:
     from vivarium.framework.engine import Builder
@@ -99,12 +101,67 @@ def ColorectalCancer():
     # Add transitions for recovered state
     recovered.allow_self_transitions()
 
-    return DiseaseModel(models.COLORECTAL_CANCER, states=[susceptible, preclinical, clinical, recovered])
+    return DiseaseModel(models.COLORECTAL_CANCER, states=[susceptible, preclinical, clinical, recovered],
+                        get_data_functions={'cause_specific_mortality_rate': load_csmr})
 
 
 
+class DrawDataCache:
+    """Input data that depends only on the artifact and the input draw.
+
+    Kept for the life of the process, so a worker running many random seeds
+    of the same draw loads and derives it once.  The ``max_draws`` most
+    recently used draws are kept, so a worker alternating between a few draws
+    does not reload them.  The artifact's fingerprint is part of the key, so
+    an artifact rebuilt at the same path is reloaded.
+
+    """
+
+    def __init__(self, max_draws: int):
+        self.max_draws = max_draws
+        self._draws = collections.OrderedDict()
+
+    def get(self, builder: 'Builder', name: str, loader: typing.Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        artifact_path = builder.configuration.input_data.artifact_path
+        draw = (get_file_fingerprint(artifact_path), builder.configuration.input_data.input_draw_number)
+        if draw in self._draws:
+            self._draws.move_to_end(draw)
+        else:
+            self._draws[draw] = {}
+            while len(self._draws) > self.max_draws:
+                self._draws.popitem(last=False)
+        data = self._draws[draw]
+        if name not in data:
+            data[name] = loader()
+        return data[name].copy()
+
+    def clear(self):
+        self._draws.clear()
+
+
+DRAW_DATA_CACHE = DrawDataCache(metadata.CACHED_INPUT_DRAWS)
+
+
+def get_cached_draw_data(builder: 'Builder', name: str,
+                         loader: typing.Callable[[], pd.DataFrame]) -> pd.DataFrame:
+    return DRAW_DATA_CACHE.get(builder, name, loader)
+
+
 def load_raw_data(builder: 'Builder', key: str) -> pd.DataFrame:
-    return builder.data.load(key).set_index(metadata.ARTIFACT_INDEX_COLUMNS[1:])
+    return get_cached_draw_data(builder, key, lambda: _load_raw_data(builder, key))
+
+
+def _load_raw_data(builder: 'Builder', key: str) -> pd.DataFrame:
+    artifact_path = builder.configuration.input_data.artifact_path
+    if key in data_keys.BY_DRAW_KEYS and is_stored_by_draw(artifact_path, key):
+        data = read_data_by_draw(artifact_path, key, builder.configuration.input_data.input_draw_number)
+    else:
+        data = builder.data.load(key)
+    return data.set_index(metadata.ARTIFACT_INDEX_COLUMNS[1:])
+
+
+def load_csmr(cause: str, builder: 'Builder') -> pd.DataFrame:
+    return load_raw_data(builder, data_keys.COLORECTAL_CANCER.CSMR).reset_index()
 
 
 def load_clinical_emr(cause: str, builder: 'Builder', is_final: bool = True) -> pd.DataFrame:
@@ -145,6 +202,11 @@ def load_clinical_general_prevalence(cause: str, builder: 'Builder') -> pd.DataF
 
 
 def load_age_shifted_incidence_rate(builder: 'Builder') -> pd.DataFrame:
+    return get_cached_draw_data(builder, 'age_shifted_incidence_rate',
+                                lambda: _load_age_shifted_incidence_rate(builder))
+
+
+def _load_age_shifted_incidence_rate(builder: 'Builder') -> pd.DataFrame:
     # incidenc[(bin + ceil(mst / binwidth)) * (mst % binwidth) / binwidth]
     raw_data = load_raw_data(builder, data_keys.COLORECTAL_CANCER.RAW_INCIDENCE_RATE)
     mst = get_random_variable(builder.configuration.input_data.input_draw_number, *data_values.MEAN_SOJOURN_TIME)
@@ -0,0 +1,173 @@
+"""Importance sampling of the simulated population.
+
+Most simulants are too young to ever be screened during the simulation or
+are not at high risk of cancer, and add little to the outcomes we report.
+These components oversample simulants who start at or above
+``OVERSAMPLED_AGE_START`` and simulants with family history or adenoma, and
+give every simulant a weight so weighted results estimate those of an
+unweighted population of the same size.
+
+To run a weighted simulation, replace ``BasePopulation()`` with
+``WeightedPopulation()`` in the model specification, add
+``SimulantWeights()`` and set the ``importance_sampling`` factors.
+
+"""
+import typing
+
+import numpy as np
+import pandas as pd
+from vivarium_public_health.population import BasePopulation
+
+from ..constants import data_values, results
+
+if typing.TYPE_CHECKING:
+    from vivarium.framework.engine import Builder
+    from vivarium.framework.population import SimulantData
+
+
+RISK = 'family_history_or_adenoma'
+
+
+class WeightedPopulation(BasePopulation):
+    """Base population that samples ages at or above ``OVERSAMPLED_AGE_START``
+    ``importance_sampling.age_oversampling`` times as often.
+
+    Ages are first sampled from the population structure as usual.  A share
+    of the younger simulants, chosen at random, are then given ages drawn
+    from those sampled at or above ``OVERSAMPLED_AGE_START``.  Oversampling
+    works on the ages actually sampled, so it does not depend on how the
+    population structure is binned.  The age weights follow from the counts
+    before and after and are published through the ``age_weights`` pipeline.
+    Only the initial population is oversampled.
+
+    """
+
+    configuration_defaults = {
+        **BasePopulation.configuration_defaults,
+        'importance_sampling': {
+            'age_oversampling': 1.0,
+            'high_risk_oversampling': 1.0,
+        }
+    }
+
+    # noinspection PyAttributeOutsideInit
+    def setup(self, builder: 'Builder'):
+        super().setup(builder)
+        self.age_oversampling = builder.configuration.importance_sampling.age_oversampling
+        if self.age_oversampling < 1:
+            raise ValueError(f'Age oversampling must be at least 1. Got {self.age_oversampling}.')
+        self.age_weights = None
+        self.oversampling_randomness = builder.randomness.get_stream('age_oversampling')
+        builder.value.register_value_producer(data_values.AGE_WEIGHTS_KEY, source=lambda index: self.age_weights)
+
+    def on_initialize_simulants(self, pop_data: 'SimulantData'):
+        super().on_initialize_simulants(pop_data)
+        if self.age_weights is not None:
+            return
+        age = self.population_view.subview(['age']).get(pop_data.index).age
+        age, self.age_weights = oversample_ages(
+            age, self.age_oversampling,
+            self.oversampling_randomness.get_draw(pop_data.index, additional_key='selection'),
+            self.oversampling_randomness.get_draw(pop_data.index, additional_key='age'),
+        )
+        self.population_view.update(age)
+
+
+def oversample_ages(age: pd.Series, oversampling: float, selection_draw: pd.Series,
+                    age_draw: pd.Series) -> typing.Tuple[pd.Series, typing.Tuple[float, float]]:
+    """Moves younger simulants into the oversampled ages.
+
+    Returns
+    -------
+        The new ages and the weights of simulants below and in the
+        oversampled ages.
+
+    """
+    in_oversampled_ages = age >= data_values.OVERSAMPLED_AGE_START
+    size, oversampled_size = len(age), int(in_oversampled_ages.sum())
+    younger_size = size - oversampled_size
+    if not oversampled_size or not younger_size:
+        return age, (1.0, 1.0)
+
+    p = oversampled_size / size
+    target_size = int(round(size * oversampling * p / (oversampling * p + 1 - p)))
+    # Keep at least one younger simulant so that its weight is defined.
+    moved_size = min(max(target_size - oversampled_size, 0), younger_size - 1)
+    moved = selection_draw[~in_oversampled_ages].sort_values().index[:moved_size]
+
+    age = age.copy()
+    age[moved] = np.percentile(age[in_oversampled_ages].values, 100 * age_draw[moved].values)
+    age_weights = (younger_size / (younger_size - moved_size), oversampled_size / (oversampled_size + moved_size))
+    return age, age_weights
+
+
+class SimulantWeights:
+    """Oversamples the high-risk group and assigns every simulant its weight.
+
+    A simulant's weight is the ratio of how common it is in the population
+    to how common it is in the sample, given its age at initialization and
+    risk group.  Age weights come from :class:`WeightedPopulation`.  Weights
+    take one value per weight class, so observers stratify by class and
+    results processing applies the weight of each class, which is reported
+    with the results.
+
+    """
+
+    @property
+    def name(self) -> str:
+        return 'simulant_weights'
+
+    # noinspection PyAttributeOutsideInit
+    def setup(self, builder: 'Builder'):
+        config = builder.configuration.importance_sampling
+        self.high_risk_oversampling = config.high_risk_oversampling
+        self.exposure = builder.configuration[RISK].exposure
+        self.sampled_exposure = self.exposure * self.high_risk_oversampling
+        if not 0 < self.sampled_exposure < 1:
+            raise ValueError(f'Oversampling {RISK} by {self.high_risk_oversampling} gives a sampled '
+                             f'exposure of {self.sampled_exposure}, which is not a proportion.')
+
+        # Set once the population has been sampled.
+        self.class_weights = None
+        self.age_weights = builder.value.get_value(data_values.AGE_WEIGHTS_KEY)
+        self.risk_exposure = builder.value.get_value(f'{RISK}.exposure')
+        builder.value.register_value_modifier(f'{RISK}.exposure_parameters', modifier=self.oversample_high_risk)
+
+        columns_created = [results.WEIGHT_COLUMN, results.WEIGHT_CLASS_COLUMN]
+        builder.population.initializes_simulants(self.on_initialize_simulants,
+                                                 creates_columns=columns_created,
+                                                 requires_columns=['age'],
+                                                 requires_values=[f'{RISK}.exposure', data_values.AGE_WEIGHTS_KEY])
+        self.population_view = builder.population.get_view(['age'] + columns_created)
+        builder.value.register_value_modifier('metrics', self.metrics)
+
+    def oversample_high_risk(self, index: pd.Index, exposure: pd.Series) -> pd.Series:
+        return exposure * self.high_risk_oversampling
+
+    def on_initialize_simulants(self, pop_data: 'SimulantData'):
+        if self.class_weights is None:
+            self.class_weights = get_class_weights(self.age_weights(pop_data.index),
+                                                   self.exposure, self.sampled_exposure)
+        age = self.population_view.subview(['age']).get(pop_data.index).age
+        in_oversampled_ages = (age >= data_values.OVERSAMPLED_AGE_START).astype(int)
+        high_risk = (self.risk_exposure(pop_data.index) == 'cat1').astype(int)
+        weight_class = pd.Series(2 * in_oversampled_ages + high_risk, name=results.WEIGHT_CLASS_COLUMN)
+        weight = weight_class.map(self.class_weights).rename(results.WEIGHT_COLUMN)
+        self.population_view.update(pd.concat([weight, weight_class], axis=1))
+
+    def metrics(self, index: pd.Index, metrics: typing.Dict[str, float]) -> typing.Dict[str, float]:
+        if self.class_weights is None:
+            return metrics
+        metrics.update({results.CLASS_WEIGHT_COLUMN_TEMPLATE.format(WEIGHT_CLASS=weight_class): weight
+                        for weight_class, weight in self.class_weights.items()})
+        return metrics
+
+    def __repr__(self) -> str:
+        return 'SimulantWeights()'
+
+
+def get_class_weights(age_weights: typing.Tuple[float, float], exposure: float,
+                      sampled_exposure: float) -> typing.Dict[int, float]:
+    risk_weights = [(1 - exposure) / (1 - sampled_exposure), exposure / sampled_exposure]
+    return {2 * in_oversampled_ages + high_risk: age_weights[in_oversampled_ages] * risk_weights[high_risk]
+            for in_oversampled_ages in [0, 1] for high_risk in [0, 1]}
@@ -13,6 +13,7 @@ from vivarium_public_health.metrics.utilities import (get_output_template, get_g
                                                       )
 
 from ..constants import models, results, data_values
+from .screening import get_offset
 
 if typing.TYPE_CHECKING:
     from vivarium.framework.engine import Builder
@@ -52,6 +53,30 @@ class ResultsStratifier:
                            for age_cohort in results.AGE_COHORTS},
         }
 
+        # Replicates stacked in one population table are kept apart in every result.
+        replicate_count = (builder.configuration.replicates.count
+                           if 'replicates' in builder.configuration else 1)
+        if replicate_count > 1:
+            columns_required.append(results.REPLICATE_COLUMN)
+            self.stratification_levels[results.REPLICATE_COLUMN] = {
+                str(replicate): lambda replicate=replicate: (
+                    self.population_values[results.REPLICATE_COLUMN] == replicate
+                )
+                for replicate in range(replicate_count)
+            }
+
+        # Importance sampling weights are constant within a weight class, so results are kept
+        # apart by class and weighted in results processing.
+        self.weighted = 'importance_sampling' in builder.configuration
+        if self.weighted:
+            columns_required += [results.WEIGHT_COLUMN, results.WEIGHT_CLASS_COLUMN]
+            self.stratification_levels[results.WEIGHT_CLASS_COLUMN] = {
+                str(weight_class): lambda weight_class=weight_class: (
+                    self.population_values[results.WEIGHT_CLASS_COLUMN] == weight_class
+                )
+                for weight_class in results.WEIGHT_CLASSES
+            }
+
         self.population_view = builder.population.get_view(columns_required)
         self.pipeline_values = {pipeline: None for pipeline in self.pipelines}
         self.population_values = None
@@ -70,6 +95,18 @@ class ResultsStratifier:
         # TODO: handle any non-static groupings
         pass
 
+    def get_weights(self, index: pd.Index) -> pd.Series:
+        """Gets the importance sampling weight of each simulant, or one if the population is unweighted."""
+        if not self.weighted:
+            return pd.Series(1.0, index=index)
+        return self.population_view.subview([results.WEIGHT_COLUMN]).get(index)[results.WEIGHT_COLUMN]
+
+    def get_checkpoint_state(self) -> Dict[str, pd.Series]:
+        return {'stratification_groups': self.stratification_groups}
+
+    def set_checkpoint_state(self, state: Dict[str, pd.Series]):
+        self.stratification_groups = state['stratification_groups']
+
     def get_all_stratifications(self) -> List[Tuple[Dict[str, str], ...]]:
         """
         Gets all stratification combinations. Returns a List of Stratifications. Each Stratification is represented as a
@@ -184,9 +221,10 @@ class MortalityObserver(MortalityObserver_):
 
         the_living = pop[(pop.alive == 'alive') & pop.tracked]
         the_dead = pop[pop.alive == 'dead']
-        metrics[results.TOTAL_YLLS_COLUMN] = self.life_expectancy(the_dead.index).sum()
-        metrics['total_population_living'] = len(the_living)
-        metrics['total_population_dead'] = len(the_dead)
+        weights = self.stratifier.get_weights(index)
+        metrics[results.TOTAL_YLLS_COLUMN] = (self.life_expectancy(the_dead.index) * weights[the_dead.index]).sum()
+        metrics['total_population_living'] = weights[the_living.index].sum()
+        metrics['total_population_dead'] = weights[the_dead.index].sum()
 
         return metrics
 
@@ -201,8 +239,13 @@ class DisabilityObserver(DisabilityObserver_):
     def sub_components(self) -> List[ResultsStratifier]:
         return [self.stratifier]
 
+    # noinspection PyAttributeOutsideInit
+    def setup(self, builder: 'Builder'):
+        super().setup(builder)
+        self.living = builder.value.get_value(data_values.LIVING_INDEX_KEY)
+
     def on_time_step_prepare(self, event: 'Event'):
-        pop = self.population_view.get(event.index, query='tracked == True and alive == "alive"')
+        pop = self.population_view.get(self.living(event.index))
         self.update_metrics(pop)
 
         pop.loc[:, results.TOTAL_YLDS_COLUMN] += self.disability_weight(pop.index)
@@ -215,6 +258,19 @@ class DisabilityObserver(DisabilityObserver_):
             measure_data = self.stratifier.update_labels(get_years_lived_with_disability(*base_args), labels)
             self.years_lived_with_disability.update(measure_data)
 
+    def metrics(self, index: pd.Index, metrics: Dict[str, float]) -> Dict[str, float]:
+        metrics = super().metrics(index, metrics)
+        if self.stratifier.weighted:
+            ylds = self.population_view.get(index)[results.TOTAL_YLDS_COLUMN]
+            metrics[results.TOTAL_YLDS_COLUMN] = (ylds * self.stratifier.get_weights(index)).sum()
+        return metrics
+
+    def get_checkpoint_state(self) -> Dict[str, Counter]:
+        return {'years_lived_with_disability': self.years_lived_with_disability}
+
+    def set_checkpoint_state(self, state: Dict[str, Counter]):
+        self.years_lived_with_disability = state['years_lived_with_disability']
+
 
 class StateMachineObserver:
     """Observes transition counts and person time for a cause."""
@@ -292,10 +348,11 @@ class StateMachineObserver:
                 state_person_time_this_step = self.stratifier.update_labels(state_person_time_this_step, labels)
                 self.person_time.update(state_person_time_this_step)
 
-        # This enables tracking of transitions between states
-        prior_state_pop = self.population_view.get(event.index)
-        prior_state_pop[self.previous_state_column] = prior_state_pop[self.state_machine]
-        self.population_view.update(prior_state_pop)
+        # This enables tracking of transitions between states.  Only simulants whose state
+        # changed since the last step need their previous state written.
+        changed = pop[self.previous_state_column] != pop[self.state_machine]
+        if changed.any():
+            self.population_view.update(pop.loc[changed, self.state_machine].rename(self.previous_state_column))
 
     def on_collect_metrics(self, event: 'Event'):
         pop = self.population_view.get(event.index)
@@ -315,6 +372,13 @@ class StateMachineObserver:
         metrics.update(self.person_time)
         return metrics
 
+    def get_checkpoint_state(self) -> Dict[str, Counter]:
+        return {'counts': self.counts, 'person_time': self.person_time}
+
+    def set_checkpoint_state(self, state: Dict[str, Counter]):
+        self.counts = state['counts']
+        self.person_time = state['person_time']
+
     def __repr__(self) -> str:
         return f"StateMachineObserver({self.state_machine})"
 
@@ -349,6 +413,7 @@ class ScreeningObserver:
     def setup(self, builder: 'Builder'):
         self.config = builder.configuration['metrics']['screening'].to_dict()
         self.clock = builder.time.clock()
+        self.start_time = pd.Timestamp(**builder.configuration.time.start.to_dict())
         self.step_size = builder.time.step_size()
         self.age_bins = get_age_bins(builder)
         self.counts = Counter()
@@ -369,9 +434,11 @@ class ScreeningObserver:
 
     def on_collect_metrics(self, event: 'Event'):
         pop = self.population_view.get(event.index)
+        last_step = get_offset(self.clock() - self.step_size(), self.start_time)
         for labels, pop_in_group in self.stratifier.group(pop):
-            scheduled_screening = (pop_in_group.loc[:, data_values.PREVIOUS_SCREENING_DATE]
-                                   > (self.clock() - self.step_size()))
+            previous_screening = pop_in_group.loc[:, data_values.PREVIOUS_SCREENING_DATE]
+            scheduled_screening = ((previous_screening != data_values.NO_SCREENING_DATE)
+                                   & (previous_screening > last_step))
             attended_screening = scheduled_screening & pop_in_group.loc[:, data_values.ATTENDED_LAST_SCREENING]
             year = f'in_{self.clock().year}'
             counts_this_step = self.stratifier.update_labels(
@@ -386,6 +453,12 @@ class ScreeningObserver:
         metrics.update(self.counts)
         return metrics
 
+    def get_checkpoint_state(self) -> Dict[str, Counter]:
+        return {'counts': self.counts}
+
+    def set_checkpoint_state(self, state: Dict[str, Counter]):
+        self.counts = state['counts']
+
     def __repr__(self) -> str:
         return 'ScreeningObserver'
 
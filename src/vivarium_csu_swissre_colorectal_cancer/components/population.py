@@ -0,0 +1,66 @@
+import typing
+from typing import Dict, Union
+
+import pandas as pd
+
+from ..constants import data_values
+
+if typing.TYPE_CHECKING:
+    from vivarium.framework.engine import Builder
+    from vivarium.framework.event import Event
+    from vivarium.framework.population import SimulantData
+
+
+class LivingIndex:
+    """Maintains the index of living, tracked simulants.
+
+    Components get the subset of an index that is alive and tracked from the
+    ``living_index`` pipeline instead of querying the whole state table.
+    The index is updated as simulants are added and right after deaths on
+    each time step, and only the simulants alive at the last update are
+    looked at, so dead simulants cost nothing once they have been removed.
+    Callers usually pass the index of the whole population, which is recognized
+    by its length alone and answered without looking at the dead.
+
+    """
+
+    @property
+    def name(self) -> str:
+        return 'living_index'
+
+    # noinspection PyAttributeOutsideInit
+    def setup(self, builder: 'Builder'):
+        self.living = pd.Index([], dtype=int)
+        self.population_size = 0
+        self.population_view = builder.population.get_view(['alive', 'tracked'])
+        builder.population.initializes_simulants(self.on_initialize_simulants, requires_columns=['alive'])
+        builder.value.register_value_producer(data_values.LIVING_INDEX_KEY, source=self.get_living)
+        # Mortality updates the alive column at priority 0.
+        builder.event.register_listener('time_step', self.on_time_step, priority=1)
+
+    def on_initialize_simulants(self, pop_data: 'SimulantData'):
+        self.population_size += len(pop_data.index)
+        self.living = self.living.append(self.get_living_in(pop_data.index))
+
+    def on_time_step(self, event: 'Event'):
+        self.living = self.get_living_in(self.living)
+
+    def get_living_in(self, index: pd.Index) -> pd.Index:
+        pop = self.population_view.get(index)
+        return pop.index[(pop.alive == 'alive') & pop.tracked]
+
+    def get_living(self, index: pd.Index) -> pd.Index:
+        # Simulant indices are unique, so an index as long as the population is the whole population.
+        if index is self.living or len(index) == self.population_size:
+            return self.living
+        return index.intersection(self.living)
+
+    def get_checkpoint_state(self) -> Dict[str, Union[pd.Index, int]]:
+        return {'living': self.living, 'population_size': self.population_size}
+
+    def set_checkpoint_state(self, state: Dict[str, Union[pd.Index, int]]):
+        self.living = state['living']
+        self.population_size = state['population_size']
+
+    def __repr__(self) -> str:
+        return 'LivingIndex()'
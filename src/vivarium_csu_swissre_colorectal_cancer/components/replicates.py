@@ -0,0 +1,66 @@
+"""Replicates of the simulation stacked in one population table.
+
+Each simulant is assigned to one of ``replicates.count`` replicates, and
+the replicate is part of the simulant's randomness key, so every replicate
+draws from its own keys.  Observers stratify their results by replicate,
+and results processing labels the rows with a ``replicate`` column next to
+the run's random seed.
+
+Replicates are not independent runs.  They share the run's random seed,
+input draw and everything sampled once per run, such as the relative risk
+sampled by :class:`LogNormalRiskEffect`, so results processing never treats
+them as separate seeds.
+
+To stack replicates, replace ``BasePopulation()`` with
+``ReplicatedPopulation()`` in the model specification, set
+``replicates.count``, add ``replicate`` to ``randomness.key_columns`` and
+multiply ``population.population_size`` by the number of replicates.
+
+"""
+import typing
+
+import pandas as pd
+from vivarium_public_health.population import BasePopulation
+
+from ..constants import results
+
+if typing.TYPE_CHECKING:
+    from vivarium.framework.engine import Builder
+    from vivarium.framework.population import SimulantData
+
+
+class ReplicatedPopulation(BasePopulation):
+    """Base population split into replicates with their own randomness keys."""
+
+    configuration_defaults = {
+        **BasePopulation.configuration_defaults,
+        'replicates': {
+            'count': 1,
+        }
+    }
+
+    # noinspection PyAttributeOutsideInit
+    def setup(self, builder: 'Builder'):
+        super().setup(builder)
+        self.replicate_count = builder.configuration.replicates.count
+        if results.REPLICATE_COLUMN not in builder.configuration.randomness.key_columns:
+            raise ValueError(f'Replicates need their own randomness keys. Add {results.REPLICATE_COLUMN} '
+                             f'to randomness.key_columns.')
+
+        # BasePopulation registers simulants for randomness by entrance time and age.
+        register_simulants = self.register_simulants
+        self.register_simulants = lambda simulants: register_simulants(
+            simulants.assign(**{results.REPLICATE_COLUMN: self.get_replicate(simulants.index)})
+        )
+        builder.population.initializes_simulants(self.on_initialize_replicates,
+                                                 creates_columns=[results.REPLICATE_COLUMN])
+        self.replicate_view = builder.population.get_view([results.REPLICATE_COLUMN])
+
+    def on_initialize_replicates(self, pop_data: 'SimulantData'):
+        self.replicate_view.update(self.get_replicate(pop_data.index))
+
+    def get_replicate(self, index: pd.Index) -> pd.Series:
+        return pd.Series(index % self.replicate_count, index=index, name=results.REPLICATE_COLUMN)
+
+    def __repr__(self) -> str:
+        return 'ReplicatedPopulation()'
@@ -25,10 +25,12 @@ class LogNormalRiskEffect(RiskEffect):
             f'effect_of_{self.risk.name}_on_{self.target.name}.{self.target.measure}'
         )
 
+        # Relative risks are sampled once and used for both tables.
         relative_risk_data = self.load_relative_risk_data(builder)
+        population_attributable_fraction_data = self.load_population_attributable_fraction_data(builder,
+                                                                                               relative_risk_data)
         self.relative_risk = builder.lookup.build_table(relative_risk_data, key_columns=['sex'],
                                                         parameter_columns=['age', 'year'])
-        population_attributable_fraction_data = self.load_population_attributable_fraction_data(builder)
         self.population_attributable_fraction = builder.lookup.build_table(population_attributable_fraction_data,
                                                                            key_columns=['sex'],
                                                                            parameter_columns=['age', 'year'])
@@ -55,10 +57,12 @@ class LogNormalRiskEffect(RiskEffect):
         rr_data.loc[:, 'cat1'] = np.exp(rr_data.loc[:, 'cat1'])
         return rr_data
 
-    def load_population_attributable_fraction_data(self, builder: 'Builder'):
+    def load_population_attributable_fraction_data(self, builder: 'Builder', relative_risk_data: pd.DataFrame = None):
         key_cols = ['sex', 'age_start', 'age_end', 'year_start', 'year_end']
         exposure_data = get_exposure_data(builder, self.risk).set_index(key_cols)
-        relative_risk_data = self.load_relative_risk_data(builder).set_index(key_cols)
+        if relative_risk_data is None:
+            relative_risk_data = self.load_relative_risk_data(builder)
+        relative_risk_data = relative_risk_data.set_index(key_cols)
         mean_rr = (exposure_data * relative_risk_data).sum(axis=1)
         paf_data = ((mean_rr - 1) / mean_rr).reset_index().rename(columns={0: 'value'})
         return paf_data
@@ -1,10 +1,19 @@
 
-"""Healthcare utilization and treatment model."""
+"""Healthcare utilization and treatment model.
+
+Screening dates are stored in the state table as int64 nanoseconds since
+the start of the simulation, with ``NO_SCREENING_DATE`` for simulants with
+no previous or next screening.  Nanoseconds are the resolution of the
+simulation clock, so comparing dates with the current time is exact,
+unlike with whole days or steps, and nothing outside this module reads
+the dates, so they are never converted back to timestamps.
+
+"""
 import typing
 import numpy as np, pandas as pd
 
 from ..constants import models, data_values, scenarios
-from ..utilities import get_normal_dist_random_variable
+from ..utilities import get_draws, get_normal_dist_random_variable
 
 
 if typing.TYPE_CHECKING:
@@ -17,6 +26,14 @@ if typing.TYPE_CHECKING:
 AGE = 'age'
 SEX = 'sex'
 
+# Randomness keys
+ATTENDED_PREVIOUS = 'attended_previous'
+PROGRESS_TO_NEXT_SCREENING = 'progress_to_next_screening'
+ATTENDANCE = 'attendance'
+FOBT_SENSITIVITY = 'fobt_sensitivity'
+COLONOSCOPY_SENSITIVITY = 'colonoscopy_sensitivity'
+SCHEDULE_NEXT = 'schedule_next'
+
 
 class ScreeningAlgorithm:
     """Manages screening."""
@@ -42,6 +59,7 @@ class ScreeningAlgorithm:
         """
         self.scenario = builder.configuration.screening_algorithm.scenario
         self.clock = builder.time.clock()
+        self.start_time = pd.Timestamp(**builder.configuration.time.start.to_dict())
         self.step_size = builder.time.step_size()
         self.randomness = builder.randomness.get_stream(self.name)
 
@@ -50,6 +68,7 @@ class ScreeningAlgorithm:
                                      for parameter in data_values.SCREENING}
 
         self.family_history_or_adenoma = builder.value.get_value('family_history_or_adenoma.exposure')
+        self.living = builder.value.get_value(data_values.LIVING_INDEX_KEY)
 
         self.probability_attending_screening = builder.value.register_value_producer(
             data_values.PROBABILITY_ATTENDING_SCREENING_KEY,
@@ -86,8 +105,10 @@ class ScreeningAlgorithm:
                                      index=pop.index,
                                      name=models.SCREENING_RESULT_MODEL_NAME)
 
+        # All draws for initialization in one pass.
+        draws = get_draws(self.randomness, pop.index, [ATTENDED_PREVIOUS, PROGRESS_TO_NEXT_SCREENING, SCHEDULE_NEXT])
 
-        attended_previous = pd.Series(self.randomness.get_draw(pop.index, 'attended_previous')
+        attended_previous = pd.Series(draws[ATTENDED_PREVIOUS]
                                       < self.screening_parameters[data_values.SCREENING.BASE_ATTENDANCE.name],
                                       name=data_values.ATTENDED_LAST_SCREENING)
 
@@ -106,26 +127,32 @@ class ScreeningAlgorithm:
         #  - never for simulants over LAST_SCREENING_AGE
         #  - beginning of sim for women between FIRST_SCREENING_AGE & LAST_SCREENING_AGE
         #  - FIRST_SCREENING_AGE-st birthday for women younger than FIRST_SCREENING_AGE
-        screening_start = pd.Series(pd.NaT, index=pop.index)
-        screening_start.loc[within_screening_age] = self.clock()
-        screening_start.loc[under_screening_age] = (
-                self.clock()
-                + pd.to_timedelta(data_values.FIRST_SCREENING_AGE - age[under_screening_age], unit='Y')
-        )
+        now = get_offset(self.clock(), self.start_time)
+        years_to_screening_age = data_values.FIRST_SCREENING_AGE - age[under_screening_age]
+        screening_start = pd.Series(data_values.NO_SCREENING_DATE, index=pop.index, dtype=np.int64)
+        screening_start.loc[within_screening_age] = now
+        screening_start.loc[under_screening_age] = now + to_offset(years_to_screening_age * data_values.DAYS_PER_YEAR)
+        starts_screening = screening_start != data_values.NO_SCREENING_DATE
 
         # Draw a duration between screenings to use for scheduling the first screening
-        time_between_screenings = self._schedule_screening(screening_start, screening_result) - screening_start
+        first_screening = self._schedule_screening(screening_start, screening_result, draws[SCHEDULE_NEXT])
+        time_between_screenings = (first_screening - screening_start).loc[starts_screening]
 
         # Determine how far along between screenings we are the time screening starts
-        progress_to_next_screening = self.randomness.get_draw(pop.index, 'progress_to_next_screening')
+        progress_to_next_screening = draws.loc[starts_screening, PROGRESS_TO_NEXT_SCREENING]
 
         # Get previous screening date for use in calculating next screening date
-        previous_screening = pd.Series(screening_start - progress_to_next_screening * time_between_screenings,
+        previous_screening = pd.Series(data_values.NO_SCREENING_DATE, index=pop.index, dtype=np.int64,
                                        name=data_values.PREVIOUS_SCREENING_DATE)
-        next_screening = pd.Series(previous_screening + time_between_screenings,
+        previous_screening.loc[starts_screening] = (
+                screening_start.loc[starts_screening]
+                - np.round(progress_to_next_screening * time_between_screenings).astype(np.int64)
+        )
+        next_screening = pd.Series(data_values.NO_SCREENING_DATE, index=pop.index, dtype=np.int64,
                                    name=data_values.NEXT_SCREENING_DATE)
+        next_screening.loc[starts_screening] = previous_screening.loc[starts_screening] + time_between_screenings
         # Remove the "appointment" used to determine the first appointment after turning 21
-        previous_screening.loc[under_screening_age] = pd.NaT
+        previous_screening.loc[under_screening_age] = data_values.NO_SCREENING_DATE
 
         self.population_view.update(
             pd.concat([screening_result, previous_screening, next_screening, attended_previous], axis=1)
@@ -135,64 +162,61 @@ class ScreeningAlgorithm:
     def on_time_step(self, event: 'Event'):
         """Determine if someone will go for a screening"""
         # Get all simulants with a screening scheduled during this timestep
-        pop = self.population_view.get(event.index, query='alive == "alive"')
+        pop = self.population_view.get(self.living(event.index))
 
 
         # Get all simulants who have clinical cancer on this timestep
         has_symptoms = self.is_symptomatic_presentation(pop)
 
-        # Set next screening date for simulants who are symptomatic to today
-        next_screening_date = pop.loc[:, data_values.NEXT_SCREENING_DATE].copy()
-        next_screening_date.loc[has_symptoms] = self.clock()
-
+        # Simulants who are symptomatic are screened now
         age = pop.loc[:, AGE]
-
-        screening_scheduled = has_symptoms | ((next_screening_date <= self.clock())
+        now = get_offset(self.clock(), self.start_time)
+        screening_scheduled = has_symptoms | ((pop.loc[:, data_values.NEXT_SCREENING_DATE].values <= now)
                                               & self._within_screening_age(age))
 
+        # Only simulants with a screening scheduled change, so everything below works on them alone.
+        scheduled = pop.loc[screening_scheduled]
+        if scheduled.empty:
+            return
+        has_symptoms = has_symptoms.loc[screening_scheduled]
+
         # Get probability of attending the next screening for scheduled simulants
-        p_attends_screening = self.probability_attending_screening(pop.index)
+        p_attends_screening = self.probability_attending_screening(scheduled.index)
 
-        # Get all simulants who actually attended their screening
-        attends_screening: pd.Series = (
-                screening_scheduled
-                & (has_symptoms | (self.randomness.get_draw(pop.index, 'attendance') < p_attends_screening))
-        )
+        # All draws for this time step in one pass.
+        draws = get_draws(self.randomness, scheduled.index,
+                          [ATTENDANCE, FOBT_SENSITIVITY, COLONOSCOPY_SENSITIVITY, SCHEDULE_NEXT])
 
-        # Update attended previous screening column
-        attended_last_screening = pop.loc[:, data_values.ATTENDED_LAST_SCREENING].copy()
-        attended_last_screening.loc[screening_scheduled] = attends_screening.loc[screening_scheduled]
-        attended_last_screening = attended_last_screening.astype(bool)
+        # Get all simulants who actually attended their screening
+        attends_screening: pd.Series = has_symptoms | (draws[ATTENDANCE] < p_attends_screening)
 
-        # Screening results for everyone
-        screening_result = pop.loc[:, models.SCREENING_RESULT_MODEL_NAME].copy()
-        screening_result[attends_screening] = self._do_screening(pop.loc[attends_screening, :])
+        # Screening results for scheduled simulants
+        screening_result = scheduled.loc[:, models.SCREENING_RESULT_MODEL_NAME].copy()
+        screening_result[attends_screening] = self._do_screening(scheduled.loc[attends_screening, :],
+                                                                 draws.loc[attends_screening])
 
-        # Update previous screening column
-        previous_screening = pop.loc[:, data_values.PREVIOUS_SCREENING_DATE].copy()
-        previous_screening.loc[screening_scheduled] = pop.loc[screening_scheduled, data_values.NEXT_SCREENING_DATE]
+        # The scheduled screening becomes the previous one, and the next one is scheduled
+        previous_screening = scheduled.loc[:, data_values.NEXT_SCREENING_DATE]
+        next_screening = self._schedule_screening(previous_screening, screening_result, draws[SCHEDULE_NEXT])
 
-        # Next scheduled screening for everyone
-        next_screening = pop.loc[:, data_values.NEXT_SCREENING_DATE].copy()
-        next_screening.loc[screening_scheduled] = self._schedule_screening(
-            pop.loc[screening_scheduled, data_values.NEXT_SCREENING_DATE],
-            screening_result.loc[screening_scheduled]
-        )
-
-        # Update values
-        self.population_view.update(
-            pd.concat([screening_result, previous_screening, next_screening, attended_last_screening], axis=1)
-        )
+        # Update values for scheduled simulants only
+        self.population_view.update(pd.DataFrame({
+            models.SCREENING_RESULT_MODEL_NAME: screening_result,
+            data_values.PREVIOUS_SCREENING_DATE: previous_screening,
+            data_values.NEXT_SCREENING_DATE: next_screening,
+            data_values.ATTENDED_LAST_SCREENING: attends_screening.astype(bool),
+        }, index=scheduled.index))
 
     def get_screening_attendance_probability(self, idx):
         return data_values.SCREENING_BASELINE
 
-    def _do_screening(self, pop: pd.DataFrame) -> pd.Series:
+    def _do_screening(self, pop: pd.DataFrame, draws: pd.DataFrame = None) -> pd.Series:
         """Perform screening for all simulants who attended their screening
 
         Parameters
         ----------
         pop: pd.DataFrame, the population table
+        draws: pd.DataFrame, sensitivity draws for the population, drawn here if not given
 
         Results
         -------
@@ -200,6 +224,8 @@ class ScreeningAlgorithm:
 
         """
         screened_cancer_state = pd.Series(models.SCREENING_NEGATIVE_STATE, index=pop.index)
+        if draws is None:
+            draws = get_draws(self.randomness, pop.index, [FOBT_SENSITIVITY, COLONOSCOPY_SENSITIVITY])
 
         ##########################################################
         # symptomatic presentation always identifies the cancer
@@ -220,8 +246,8 @@ class ScreeningAlgorithm:
         sensitivity = self.screening_parameters[
             data_values.SCREENING.FOBT_SENSITIVITY.name
         ]
-        screening_positive_results = ((self.randomness.get_draw(pop.index, 'fobt_sensitivity') < sensitivity)  # FIXME: perhaps this sensitivity should be different on different timesteps
-                                      & (self.randomness.get_draw(pop.index, 'colonoscopy_sensitivity') < sensitivity))
+        screening_positive_results = ((draws[FOBT_SENSITIVITY] < sensitivity)  # FIXME: perhaps this sensitivity should be different on different timesteps
+                                      & (draws[COLONOSCOPY_SENSITIVITY] < sensitivity))
 
         actually_preclinical = pop[models.COLORECTAL_CANCER] == models.PRECLINICAL_STATE
         actually_positive_or_recovered = pop[models.COLORECTAL_CANCER].isin([models.CLINICAL_STATE,
@@ -239,7 +265,7 @@ class ScreeningAlgorithm:
         sensitivity = self.screening_parameters[
             data_values.SCREENING.COLONOSCOPY_SENSITIVITY.name
         ]
-        screening_positive_results = self.randomness.get_draw(pop.index, 'colonoscopy_sensitivity') < sensitivity  # FIXME: perhaps this random draw sholud be different on different time steps
+        screening_positive_results = draws[COLONOSCOPY_SENSITIVITY] < sensitivity  # FIXME: perhaps this random draw sholud be different on different time steps
 
         actually_preclinical = pop[models.COLORECTAL_CANCER] == models.PRECLINICAL_STATE
         actually_positive_or_recovered = pop[models.COLORECTAL_CANCER].isin([models.CLINICAL_STATE,
@@ -252,7 +278,7 @@ class ScreeningAlgorithm:
         return screened_cancer_state
 
     def _schedule_screening(self, previous_screening: pd.Series,
-                            screening_result: pd.Series) -> pd.Series:
+                            screening_result: pd.Series, draw: pd.Series = None) -> pd.Series:
         """Schedules follow up visits:
  
         * without family history or adenoma are medium-risk and get a
@@ -264,33 +290,37 @@ class ScreeningAlgorithm:
         Parameters
         ----------
 
-        previous_screening: pd.Series of strings, risk group based on last screening
+        previous_screening: pd.Series of ints, time of the previous screening
         screening_result: pd.Series of strings, result of current screening
+        draw: pd.Series of scheduling draws, drawn here if not given
 
         Results
         -------
 
-        returns pd.Series of pd.Timestamps indicating when each
-        individual is next scheduled for a screening (which they might
-        or might not attend)
+        returns pd.Series of ints indicating when each individual is
+        next scheduled for a screening (which they might or might not
+        attend), or NO_SCREENING_DATE if they are not scheduled
 
         """
-        time_to_next_screening = pd.Series(pd.NaT, previous_screening.index)
-        draw = self.randomness.get_draw(previous_screening.index, 'schedule_next')
-
-        annual_screening = (screening_result == models.SCREENING_NEGATIVE_STATE)
-        time_to_next_screening.loc[annual_screening] = pd.to_timedelta(
-            pd.Series(data_values.DAYS_UNTIL_NEXT_ANNUAL[1].ppf(  # FIXME: this could be a lot cleaner
-                draw, **data_values.DAYS_UNTIL_NEXT_ANNUAL[2]), index=draw.index), unit='day'
-        ).loc[annual_screening]
-
-        quinquennial_screening = (screening_result == models.SCREENING_HIGH_RISK_STATE)
-        time_to_next_screening.loc[quinquennial_screening] = pd.to_timedelta(
-            pd.Series(data_values.DAYS_UNTIL_NEXT_QUINQUENNIAL[1].ppf(  # FIXME: this could be a lot cleaner
-                draw, **data_values.DAYS_UNTIL_NEXT_QUINQUENNIAL[2]), index=draw.index), unit='day'
-        ).loc[quinquennial_screening]
+        if draw is None:
+            draw = self.randomness.get_draw(previous_screening.index, SCHEDULE_NEXT)
+        draw = np.asarray(draw)
+        previous_screening = previous_screening.values
+
+        days_to_next_screening = np.full(len(previous_screening), np.nan)
+        annual_screening = (screening_result == models.SCREENING_NEGATIVE_STATE).values
+        days_to_next_screening[annual_screening] = data_values.DAYS_UNTIL_NEXT_ANNUAL[1].ppf(
+            draw[annual_screening], **data_values.DAYS_UNTIL_NEXT_ANNUAL[2]
+        )
+        quinquennial_screening = (screening_result == models.SCREENING_HIGH_RISK_STATE).values
+        days_to_next_screening[quinquennial_screening] = data_values.DAYS_UNTIL_NEXT_QUINQUENNIAL[1].ppf(
+            draw[quinquennial_screening], **data_values.DAYS_UNTIL_NEXT_QUINQUENNIAL[2]
+        )
 
-        return previous_screening + time_to_next_screening.astype('timedelta64[ns]')
+        scheduled = ~np.isnan(days_to_next_screening) & (previous_screening != data_values.NO_SCREENING_DATE)
+        next_screening = np.full(len(previous_screening), data_values.NO_SCREENING_DATE, dtype=np.int64)
+        next_screening[scheduled] = previous_screening[scheduled] + to_offset(days_to_next_screening[scheduled])
+        return pd.Series(next_screening, index=screening_result.index)
 
     def is_symptomatic_presentation(self, pop: pd.DataFrame):
         return ((pop.loc[:, models.COLORECTAL_CANCER].isin([models.CLINICAL_STATE]))
@@ -303,3 +333,13 @@ class ScreeningAlgorithm:
                  & (age < data_values.LAST_SCREENING_AGE))
 
 
+def get_offset(time: pd.Timestamp, start_time: pd.Timestamp) -> int:
+    """Converts a time to nanoseconds since the start of the simulation."""
+    return (time - start_time).value
+
+
+def to_offset(days: typing.Union[pd.Series, np.ndarray]) -> typing.Union[pd.Series, np.ndarray]:
+    """Converts durations in days to nanoseconds, as a Timedelta would hold them."""
+    return np.round(days * data_values.NANOSECONDS_PER_DAY).astype(np.int64)
+
+
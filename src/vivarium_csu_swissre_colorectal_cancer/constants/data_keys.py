@@ -8,6 +8,7 @@ from vivarium_public_health.utilities import TargetString
 #############
 
 METADATA_LOCATIONS = 'metadata.locations'
+METADATA_BUILD_HASHES = 'metadata.build_hashes'
 
 SWISSRE_LOCATION_WEIGHTS = {
     'Tianjin': 0.18,
@@ -50,6 +51,7 @@ class __ColorectalCancer(NamedTuple):
 
     # Useful keys not for the artifact - distinguished by not using the colon type declaration
     EMR = TargetString('cause.colon_and_rectum_cancer.excess_mortality_rate')
+    PREVALENCE_CANCER = TargetString('cause.colon_and_rectum_cancer.cancer_prevalence')
 
     INCIDENCE_RATE_PRECLINICAL = TargetString('sequela.preclinical.incidence_rate')
     PREVALENCE_PRECLINICAL = TargetString('sequela.preclinical.prevalence')
@@ -70,3 +72,14 @@ MAKE_ARTIFACT_KEY_GROUPS = [
     POPULATION,
     COLORECTAL_CANCER
 ]
+
+# Keys written to the artifact on a per-draw basis, so a simulation reads only
+# its own input draw.  Only keys loaded by this project's components belong
+# here; data loaded by vivarium_public_health components goes through the
+# artifact manager, which expects a single table.  The disease model is given
+# its own CSMR loader for this reason.
+BY_DRAW_KEYS = [
+    COLORECTAL_CANCER.RAW_PREVALENCE,
+    COLORECTAL_CANCER.RAW_INCIDENCE_RATE,
+    COLORECTAL_CANCER.CSMR,
+]
@@ -22,6 +22,7 @@ DAYS_UNTIL_NEXT_QUINQUENNIAL = ('days_until_next_quinquennial', stats.lognorm, {
 
 
 PROBABILITY_ATTENDING_SCREENING_KEY = 'probability_attending_screening'
+LIVING_INDEX_KEY = 'living_index'
 PROBABILITY_ATTENDING_FIRST_SCREENING_MEAN = 0.15
 PROBABILITY_ATTENDING_FIRST_SCREENING_STDDEV = 0.0025
 # 1.89 with 95%CI 1.06-2.49 (Yan et al. 2017)
@@ -43,11 +44,19 @@ ATTENDED_PREVIOUS_SCREENING_MULTIPLIER_STDDEV = 0.3575
 # p2 = p1/m
 
 ATTENDED_LAST_SCREENING = 'attended_last_screening'
+# Screening dates are stored as int64 nanoseconds since the start of the simulation
 PREVIOUS_SCREENING_DATE = 'previous_screening_date'
 NEXT_SCREENING_DATE = 'next_screening_date'
+# Screening date of simulants with no previous or next screening
+NO_SCREENING_DATE = np.iinfo(np.int64).max
+DAYS_PER_YEAR = 365.2425
+NANOSECONDS_PER_DAY = 24 * 60 * 60 * 10**9
 
 FIRST_SCREENING_AGE = 50
 LAST_SCREENING_AGE = 75
+# Simulants younger than this at the start never reach the first screening age by 2040.
+OVERSAMPLED_AGE_START = FIRST_SCREENING_AGE - 20
+AGE_WEIGHTS_KEY = 'age_weights'
 
 
 class __Screening(NamedTuple):
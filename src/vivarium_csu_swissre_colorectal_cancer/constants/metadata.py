@@ -1,3 +1,5 @@
+from typing import NamedTuple
+
 ####################
 # Project metadata #
 ####################
@@ -10,6 +12,18 @@ MAKE_ARTIFACT_MEM = '10G'
 MAKE_ARTIFACT_CPU = '1'
 MAKE_ARTIFACT_RUNTIME = '3:00:00'
 MAKE_ARTIFACT_SLEEP = 10
+MAKE_ARTIFACT_FETCH_WORKERS = 8
+MAKE_ARTIFACT_BUILD_WORKERS = 4
+# Years of raw forecast data pivoted into draw columns at a time.  None pivots all years at once.
+MAKE_ARTIFACT_PIVOT_YEAR_CHUNK_SIZE = 10
+
+RUN_SWEEP_WRITE_INTERVAL = 60  # Seconds
+RUN_SWEEP_SEEDS_PER_BATCH = 10
+RUN_SWEEP_CHECKPOINT_INTERVAL = 600  # Seconds
+RUN_SWEEP_MAX_INPUT_DRAWS = 1000
+RUN_SWEEP_KEYSPACE_SEED = 123456
+# Input draws whose derived input data a process keeps in memory.
+CACHED_INPUT_DRAWS = 4
 
 LOCATIONS = [
     'SwissRE Coverage',
@@ -25,3 +39,27 @@ ARTIFACT_INDEX_COLUMNS = [
 ]
 
 ARTIFACT_BIN_WIDTH = 5
+
+
+class __StorageProfile(NamedTuple):
+    """How per-draw artifact data is laid out on disk.
+
+    ``expected_rows`` sizes the HDF chunks of table-format data; pandas does
+    not expose the chunk shape directly.
+    """
+    format: str
+    complib: str
+    complevel: int
+    expected_rows: int = None
+
+
+ARTIFACT_STORAGE_PROFILES = {
+    'fixed_zlib_9': __StorageProfile('fixed', 'zlib', 9),
+    'fixed_blosc_5': __StorageProfile('fixed', 'blosc', 5),
+    'fixed_lz4_5': __StorageProfile('fixed', 'blosc:lz4', 5),
+    'fixed_uncompressed': __StorageProfile('fixed', None, 0),
+    'table_blosc_5': __StorageProfile('table', 'blosc', 5),
+    'table_lz4_5_small_chunks': __StorageProfile('table', 'blosc:lz4', 5, 1_000),
+    'table_lz4_5_large_chunks': __StorageProfile('table', 'blosc:lz4', 5, 1_000_000),
+}
+DEFAULT_ARTIFACT_STORAGE_PROFILE = 'fixed_zlib_9'
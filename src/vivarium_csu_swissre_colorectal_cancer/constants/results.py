@@ -17,6 +17,15 @@ SCREENING_ATTENDED = 'screening_attended_count'
 INPUT_DRAW_COLUMN = 'input_draw'
 RANDOM_SEED_COLUMN = 'random_seed'
 OUTPUT_SCENARIO_COLUMN = 'screening_algorithm.scenario'
+# Replicates stacked in one run, labelled as a trailing `_replicate_{r}` on result columns
+# and kept in their own column, apart from the random seed, in processed results
+REPLICATE_COLUMN = 'replicate'
+# Importance sampling weights, with result columns labelled by a trailing `_weight_class_{k}`
+WEIGHT_COLUMN = 'simulant_weight'
+WEIGHT_CLASS_COLUMN = 'weight_class'
+# Weight class is 2 * (in oversampled ages) + (in the high-risk group)
+WEIGHT_CLASSES = (0, 1, 2, 3)
+CLASS_WEIGHT_COLUMN_TEMPLATE = 'simulant_weight_of_class_{WEIGHT_CLASS}'
 
 STANDARD_COLUMNS = {
     'total_population': TOTAL_POPULATION_COLUMN,
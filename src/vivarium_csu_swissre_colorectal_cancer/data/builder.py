@@ -10,13 +10,14 @@ Some degree of verbosity/boilerplate is fine in the interest of transparancy.
 
 """
 from pathlib import Path
+from typing import Any, Dict, List
 
 from loguru import logger
-import pandas as pd
-from vivarium.framework.artifact import Artifact, get_location_term, EntityKey
+from vivarium.framework.artifact import Artifact, get_location_term
 
-from vivarium_csu_swissre_colorectal_cancer.constants import data_keys
-from vivarium_csu_swissre_colorectal_cancer.data import loader
+from vivarium_csu_swissre_colorectal_cancer import utilities
+from vivarium_csu_swissre_colorectal_cancer.constants import data_keys, metadata
+from vivarium_csu_swissre_colorectal_cancer.data import graph, loader
 
 
 def open_artifact(output_path: Path, location: str) -> Artifact:
@@ -48,70 +49,145 @@ def open_artifact(output_path: Path, location: str) -> Artifact:
     return artifact
 
 
-def load_and_write_data(artifact: Artifact, key: str, location: str):
-    """Loads data and writes it to the artifact if not already present.
+def load_existing_data(artifact: Artifact, key: str) -> Any:
+    """Loads data from the artifact, or returns ``None`` if the key is not in it."""
+    if key not in artifact:
+        return None
+    elif key in data_keys.BY_DRAW_KEYS:
+        # Data written by draw can't be read back through the artifact.
+        return utilities.read_draws(artifact.path, key)
+    return artifact.load(key)
+
+
+def build_and_write_data(artifact: Artifact, keys: List[str], location: str,
+                         max_workers: int = metadata.MAKE_ARTIFACT_BUILD_WORKERS,
+                         incremental: bool = False,
+                         storage_profile: str = metadata.DEFAULT_ARTIFACT_STORAGE_PROFILE
+                         ) -> Dict[str, graph.KeyProfile]:
+    """Builds the keys missing from the artifact through the build graph and writes them.
+
+    Inputs shared between keys are built once, and independent keys are built
+    concurrently.  Keys already in the artifact are skipped but may still be
+    read as inputs to other keys.  The content hash of every key written is
+    recorded in the artifact metadata.
 
     Parameters
     ----------
     artifact
         The artifact to write to.
-    key
-        The entity key associated with the data to write.
+    keys
+        The entity keys to build.
     location
         The location associated with the data to load and the artifact to
         write to.
+    max_workers
+        The number of threads used to build independent keys.
+    incremental
+        Whether to first remove keys whose content hash no longer matches
+        the one recorded in the artifact, so that they are rebuilt.
+    storage_profile
+        Name of the storage profile to write per-draw data with.
 
-    """
-    if key in artifact:
-        logger.debug(f'Data for {key} already in artifact.  Skipping...')
-    else:
-        logger.debug(f'Loading data for {key} for location {location}.')
-        data = loader.get_data(key, location, artifact)
-        logger.debug(f'Writing data for {key} to artifact.')
-        artifact.write(key, data)
-    return artifact.load(key)
-
+    Returns
+    -------
+        The time taken and peak memory use for each key that was built,
+        including intermediates.
 
-def write_data(artifact: Artifact, key: str, data: pd.DataFrame):
-    """Writes data to the artifact if not already present.
+    """
+    build_graph = graph.BuildGraph(loader.get_build_nodes(), location, max_workers,
+                                   lambda key: load_existing_data(artifact, key))
+    if incremental:
+        remove_stale_data(artifact, keys, location)
+
+    for key in keys:
+        if key in artifact:
+            logger.debug(f'Data for {key} already in artifact.  Skipping...')
+    missing = [key for key in keys if key not in artifact]
+    data = build_graph.build(missing)
+    # Written from this thread since PyTables is not thread safe.
+    for key in missing:
+        if key in data_keys.BY_DRAW_KEYS:
+            logger.debug(f'Writing data for {key} to artifact by draw.')
+            utilities.write_data_by_draw(artifact, key, data[key], storage_profile)
+        else:
+            logger.debug(f'Writing data for {key} to artifact.')
+            artifact.write(key, data[key])
+    write_build_hashes(artifact, {key: build_graph.get_hash(key) for key in missing})
+    return build_graph.profile
+
+
+def remove_stale_data(artifact: Artifact, keys: List[str], location: str) -> List[str]:
+    """Removes keys from the artifact whose recorded content hash is missing or out of date.
 
     Parameters
     ----------
     artifact
-        The artifact to write to.
-    key
-        The entity key associated with the data to write.
-    data
-        The data to write.
+        The artifact to remove data from.
+    keys
+        The entity keys to check.
+    location
+        The location represented by the artifact.
+
+    Returns
+    -------
+        The keys that were removed.
 
     """
+    build_graph = graph.BuildGraph(loader.get_build_nodes(), location)
+    build_hashes = get_build_hashes(artifact)
+    stale = [key for key in keys if key in artifact and build_hashes.get(key) != build_graph.get_hash(key)]
+    for key in stale:
+        logger.debug(f'Data for {key} is out of date.  Removing...')
+        artifact.remove(key)
+    return stale
+
+
+def get_build_hashes(artifact: Artifact) -> Dict[str, str]:
+    """Gets the content hash recorded for each key built into the artifact."""
+    key = data_keys.METADATA_BUILD_HASHES
+    return dict(artifact.load(key)) if key in artifact else {}
+
+
+def write_build_hashes(artifact: Artifact, build_hashes: Dict[str, str]):
+    """Records content hashes for keys in the artifact, keeping those of other keys."""
+    if not build_hashes:
+        return
+    key = data_keys.METADATA_BUILD_HASHES
+    updated_hashes = {**get_build_hashes(artifact), **build_hashes}
     if key in artifact:
-        logger.debug(f'Data for {key} already in artifact.  Skipping...')
+        artifact.replace(key, updated_hashes)
     else:
-        logger.debug(f'Writing data for {key} to artifact.')
-        artifact.write(key, data)
-    return artifact.load(key)
+        artifact.write(key, updated_hashes)
+
+
+def merge_artifact(artifact: Artifact, partial_path: Path,
+                   storage_profile: str = metadata.DEFAULT_ARTIFACT_STORAGE_PROFILE):
+    """Copies every key of a partial artifact into the artifact.
 
-# TODO - writing and reading by draw is necessary if you are using
-#        LBWSG data. Find the read function in utilities.py
-def write_data_by_draw(artifact: Artifact, key: str, data: pd.DataFrame):
-    """Writes data to the artifact on a per-draw basis. This is useful
-    for large datasets like Low Birthweight Short Gestation (LBWSG).
+    Keys already in the artifact are skipped.  Content hashes recorded in
+    the partial artifact are carried over for the keys that are copied.
 
     Parameters
     ----------
     artifact
         The artifact to write to.
-    key
-        The entity key associated with the data to write.
-    data
-        The data to write.
+    partial_path
+        Fully resolved path to the partial artifact, built for the same
+        location.
+    storage_profile
+        Name of the storage profile to write per-draw data with.
 
     """
-    with pd.HDFStore(artifact.path, complevel=9, mode='a') as store:
-        key = EntityKey(key)
-        artifact._keys.append(key)
-        store.put(f'{key.path}/index', data.index.to_frame(index=False))
-        data = data.reset_index(drop=True)
-        for c in data.columns:
-            store.put(f'{key.path}/{c}', data[c])
+    partial = Artifact(partial_path)
+    partial_hashes = get_build_hashes(partial)
+    merged = []
+    for key in partial.keys:
+        if key in [data_keys.METADATA_LOCATIONS, data_keys.METADATA_BUILD_HASHES] or key in artifact:
+            continue
+        logger.debug(f'Merging data for {key} from {str(partial_path)}.')
+        if key in data_keys.BY_DRAW_KEYS:
+            utilities.write_data_by_draw(artifact, key, utilities.read_draws(partial_path, key), storage_profile)
+        else:
+            artifact.write(key, partial.load(key))
+        merged.append(key)
+    write_build_hashes(artifact, {key: partial_hashes[key] for key in merged if key in partial_hashes})
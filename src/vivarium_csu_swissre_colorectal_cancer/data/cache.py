@@ -0,0 +1,302 @@
+"""On-disk caches for artifact inputs.
+
+Raw forecast files are large CSVs covering every location, and we only ever
+use the provinces in :data:`data_keys.SWISSRE_LOCATION_WEIGHTS`.  The first
+time a file is read it is filtered and written to the cache directory as HDF,
+keyed by a fingerprint of the source path, size and modification time.  Later
+builds read the cached copy, and a changed source file gets a new fingerprint.
+The cache lives in the user's cache directory unless the
+``SWISSRE_RAW_DATA_CACHE_DIR`` environment variable points elsewhere.  If the
+cache directory is not writable, raw files are read without caching.
+
+Static GBD reference data (age bins, location ids, ...) is memoized for the
+life of the process and persisted to the reference data directory, which
+the ``SWISSRE_REFERENCE_DATA_DIR`` environment variable can point elsewhere.
+In offline mode that directory is the only source, so artifacts can be built
+on machines without database access from a copy of it.  If it is not
+writable, fetched reference data is only kept in memory.
+
+GBD entity measures pulled for each SwissRE province are cached in the
+measure cache directory (``SWISSRE_MEASURE_CACHE_DIR``) and fetched
+concurrently on a bounded thread pool.  Cached measures are keyed by the
+installed versions of the packages that pull them, which pin the GBD round
+and decomp step, so updating the inputs never serves stale measures.
+
+.. admonition::
+
+   Logging in this module should be done at the ``debug`` level.
+
+"""
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+import pandas as pd
+import pkg_resources
+
+from vivarium_csu_swissre_colorectal_cancer import paths
+from vivarium_csu_swissre_colorectal_cancer.constants import data_keys
+from vivarium_csu_swissre_colorectal_cancer.utilities import sanitize_location
+
+RAW_CSV_CHUNK_SIZE = 1_000_000
+RAW_LOCATION_COLUMN = 'location_id'
+# Packages deciding which GBD round and decomp step measures are pulled from.
+DATA_SOURCE_PACKAGES = ['gbd_mapping', 'vivarium_inputs', 'vivarium_gbd_access']
+
+# PyTables is not thread safe, and artifact keys are built on several threads.
+_HDF_LOCK = threading.RLock()
+
+_REFERENCE_DATA_CONFIG = {
+    'reference_dir': paths.REFERENCE_DATA_DIR,
+    'offline': False,
+}
+_REFERENCE_DATA: Dict[str, pd.DataFrame] = {}
+
+
+def get_file_fingerprint(path: Path) -> str:
+    """Gets a short hash identifying the path, size and modification time of a file."""
+    path = Path(path).resolve()
+    stat = path.stat()
+    return hashlib.sha1(f'{path}:{stat.st_size}:{stat.st_mtime_ns}'.encode()).hexdigest()[:16]
+
+
+def read_raw_forecast(data_path: Path, cache_dir: Path = paths.RAW_DATA_CACHE_DIR) -> pd.DataFrame:
+    """Reads a raw forecast file filtered to the SwissRE provinces, using the cache if possible.
+
+    Parameters
+    ----------
+    data_path
+        Path to a raw forecast ``.csv`` or ``.hdf`` file.
+    cache_dir
+        Directory holding cached copies of raw forecast files.
+
+    Returns
+    -------
+        The rows of the raw file for the SwissRE provinces.
+
+    """
+    data_path = Path(data_path)
+    cache_path = cache_dir / f'{data_path.stem}.{get_file_fingerprint(data_path)}.hdf'
+    if cache_path.exists():
+        logger.debug(f'Reading cached raw data for {str(data_path)} from {str(cache_path)}.')
+        return read_cache_file(cache_path)
+
+    logger.debug(f'Reading raw data from {str(data_path)}.')
+    data = _read_swissre_locations(data_path)
+
+    try:
+        replace_cache_file(cache_path, f'{data_path.stem}.*.hdf', data, complevel=5, complib='blosc')
+    except OSError as e:
+        logger.debug(f'Could not write to cache directory {str(cache_dir)} ({e}). Not caching {str(data_path)}.')
+    else:
+        logger.debug(f'Cached raw data for {str(data_path)} at {str(cache_path)}.')
+    return data
+
+
+def replace_cache_file(path: Path, stale_pattern: str, data: pd.DataFrame, **kwargs):
+    """Writes data to a cache file, removing older versions of it matching ``stale_pattern``.
+
+    Raises
+    ------
+    OSError
+        If the cache directory is not writable.
+
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    for stale_path in path.parent.glob(stale_pattern):
+        if stale_path == path:
+            continue
+        logger.debug(f'Removing stale cache file {str(stale_path)}.')
+        try:
+            stale_path.unlink()
+        except FileNotFoundError:
+            # Another build removed it first.
+            pass
+    write_cache_file(path, data, **kwargs)
+
+
+def write_cache_file(path: Path, data: pd.DataFrame, **kwargs):
+    """Atomically writes data to a cache file.
+
+    Artifacts may be built by several processes at once, so the data is written
+    to a temporary file unique to this process and then moved into place.
+    Readers only ever see a complete file.
+
+    """
+    tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+    try:
+        with _HDF_LOCK:
+            data.to_hdf(tmp_path, key='data', mode='w', **kwargs)
+        tmp_path.replace(path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def read_cache_file(path: Path) -> pd.DataFrame:
+    """Reads data written by :func:`write_cache_file`."""
+    with _HDF_LOCK:
+        return pd.read_hdf(path)
+
+
+def _read_swissre_locations(data_path: Path) -> pd.DataFrame:
+    if data_path.suffix == '.hdf':
+        raw_data = read_cache_file(data_path)
+        return raw_data[raw_data[RAW_LOCATION_COLUMN].isin(data_keys.SWISSRE_LOCATION_WEIGHTS)]
+    elif data_path.suffix == '.csv':
+        # Filter while reading so we never hold every location in memory.
+        chunks = pd.read_csv(data_path, chunksize=RAW_CSV_CHUNK_SIZE)
+        return pd.concat([chunk[chunk[RAW_LOCATION_COLUMN].isin(data_keys.SWISSRE_LOCATION_WEIGHTS)]
+                          for chunk in chunks], ignore_index=True)
+    else:
+        raise ValueError(f'File has unsupported suffix: {data_path.suffix}')
+
+
+def configure_reference_data(reference_dir: Path = paths.REFERENCE_DATA_DIR, offline: bool = False):
+    """Sets where reference data is persisted and whether it may be fetched.
+
+    Parameters
+    ----------
+    reference_dir
+        Directory holding one HDF file per reference dataset.
+    offline
+        If true, reference data is only read from ``reference_dir`` and is
+        never requested from the GBD databases.
+
+    """
+    _REFERENCE_DATA_CONFIG['reference_dir'] = Path(reference_dir)
+    _REFERENCE_DATA_CONFIG['offline'] = offline
+    _REFERENCE_DATA.clear()
+
+
+def get_reference_data(name: str, getter: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+    """Gets static reference data from memory, disk or, failing both, ``getter``.
+
+    Parameters
+    ----------
+    name
+        Unique name of the reference dataset, used as its file name.
+    getter
+        Function fetching the data from its source.
+
+    Returns
+    -------
+        A copy of the reference data, safe to modify.
+
+    """
+    if name not in _REFERENCE_DATA:
+        path = _REFERENCE_DATA_CONFIG['reference_dir'] / f'{name}.hdf'
+        if path.exists():
+            logger.debug(f'Reading {name} reference data from {str(path)}.')
+            data = read_cache_file(path)
+        elif _REFERENCE_DATA_CONFIG['offline']:
+            raise FileNotFoundError(f'Offline build requires {name} reference data at {str(path)}.')
+        else:
+            logger.debug(f'Fetching {name} reference data.')
+            data = getter()
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                write_cache_file(path, data)
+            except OSError as e:
+                logger.debug(f'Could not write {name} reference data to {str(path)} ({e}). Not persisting it.')
+        _REFERENCE_DATA[name] = data
+    return _REFERENCE_DATA[name].copy()
+
+
+# Local imports keep this module importable without the GBD access packages.
+
+def get_age_bins() -> pd.DataFrame:
+    def fetch():
+        from vivarium_gbd_access import gbd
+        return gbd.get_age_bins()
+    return get_reference_data('gbd_age_bins', fetch)
+
+
+def get_location_ids() -> pd.DataFrame:
+    def fetch():
+        from vivarium_gbd_access import gbd
+        return gbd.get_location_ids()
+    return get_reference_data('gbd_location_ids', fetch)
+
+
+def get_artifact_age_bins() -> pd.DataFrame:
+    def fetch():
+        from vivarium_inputs import interface
+        return interface.get_age_bins()
+    return get_reference_data('artifact_age_bins', fetch)
+
+
+def get_theoretical_minimum_risk_life_expectancy() -> pd.DataFrame:
+    def fetch():
+        from vivarium_inputs import interface
+        return interface.get_theoretical_minimum_risk_life_expectancy()
+    return get_reference_data('theoretical_minimum_risk_life_expectancy', fetch)
+
+
+def get_package_version(package: str) -> Optional[str]:
+    """Gets the installed version of a package, or ``None`` if it is not an installed distribution."""
+    try:
+        return pkg_resources.get_distribution(package).version
+    except pkg_resources.DistributionNotFound:
+        return None
+
+
+@functools.lru_cache()
+def get_data_source_version() -> str:
+    """Gets a short hash of the installed versions of :data:`DATA_SOURCE_PACKAGES`."""
+    versions = [f'{package}=={get_package_version(package)}' for package in DATA_SOURCE_PACKAGES]
+    return hashlib.sha1('\n'.join(versions).encode()).hexdigest()[:16]
+
+
+def get_measures(requests: List[Tuple[Any, str, str]],
+                 fetch: Callable[[Any, str, str], pd.DataFrame],
+                 max_workers: int,
+                 cache_dir: Path = paths.MEASURE_CACHE_DIR) -> List[pd.DataFrame]:
+    """Gets measure data for many entities and locations, fetching what is not cached concurrently.
+
+    Parameters
+    ----------
+    requests
+        ``(entity, measure, location)`` triples. Entities must have a ``name``.
+    fetch
+        Function retrieving a single request from its source, e.g.
+        :func:`vivarium_inputs.interface.get_measure`.
+    max_workers
+        Maximum number of requests in flight at once.
+    cache_dir
+        Directory holding cached measure data.
+
+    Returns
+    -------
+        The data for each request, in the order requested.
+
+    """
+    names = [f'{entity.name}.{measure}.{sanitize_location(location)}' for entity, measure, location in requests]
+    version = get_data_source_version()
+    paths_ = [cache_dir / f'{name}.{version}.hdf' for name in names]
+    data = {}
+    for i, path in enumerate(paths_):
+        if path.exists():
+            data[i] = read_cache_file(path)
+        elif _REFERENCE_DATA_CONFIG['offline']:
+            raise FileNotFoundError(f'Offline build requires cached measure data at {str(path)}.')
+
+    missing = [i for i in range(len(requests)) if i not in data]
+    if missing:
+        logger.debug(f'Fetching {len(missing)} of {len(requests)} measures with {max_workers} workers.')
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            fetched = executor.map(lambda i: fetch(*requests[i]), missing)
+            # PyTables is not thread safe, so results are written from this thread as they arrive.
+            for i, measure_data in zip(missing, fetched):
+                data[i] = measure_data
+                try:
+                    replace_cache_file(paths_[i], f'{names[i]}.*.hdf', measure_data)
+                except OSError as e:
+                    logger.debug(f'Could not write to cache directory {str(cache_dir)} ({e}). '
+                                 f'Not caching {names[i]}.')
+    return [data[i] for i in range(len(requests))]
@@ -0,0 +1,240 @@
+"""Declarative build graph for artifact data.
+
+Every key that can be built is a node naming the loader that builds it and
+the keys its loader takes as inputs.  A :class:`BuildGraph` computes each
+node at most once per build and keeps the result in memory, so intermediates
+shared by several keys (e.g. the prevalence used to build both the
+prevalence and the excess mortality rate) are only fetched and transformed
+once.  Nodes whose inputs are ready are built concurrently on a thread pool.
+
+Each node also has a content hash covering its source file fingerprints, the
+code its loader runs, its parameters and the hashes of its inputs.
+Stored alongside the artifact, it tells us which keys are out of date.
+
+.. admonition::
+
+   Logging in this module should be done at the ``debug`` level.
+
+"""
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+import hashlib
+import inspect
+from pathlib import Path
+import resource
+import sys
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from loguru import logger
+
+from vivarium_csu_swissre_colorectal_cancer.data import cache
+
+PACKAGE = __name__.split('.')[0]
+
+
+class BuildNode(NamedTuple):
+    """A key's loader and the keys it needs as inputs.
+
+    The loader is called as ``loader(key, location, *input_data)``.  Files
+    the loader reads and any project constants it depends on are declared
+    as ``sources`` and ``parameters`` so they count towards the node's hash.
+
+    """
+    loader: Callable[..., Any]
+    inputs: Tuple[str, ...] = ()
+    sources: Tuple[Path, ...] = ()
+    parameters: Tuple[Any, ...] = ()
+
+
+class KeyProfile(NamedTuple):
+    """Time spent building a key and the change in process memory while it was built.
+
+    Keys built concurrently share the process, so the memory change of
+    overlapping keys includes each other's allocations.
+
+    """
+    seconds: float
+    rss_delta_mb: float
+
+
+def get_rss_mb() -> float:
+    """Gets the current resident set size of this process, or NaN where /proc is not available."""
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+    except OSError:
+        return float('nan')
+    return resident_pages * resource.getpagesize() / 1024 ** 2
+
+
+def get_code_version(function: Callable, package: str = PACKAGE) -> str:
+    """Hashes the code a loader runs.
+
+    This covers the source of the loader and of every function from its
+    module it calls.  It also covers the full source of every other module
+    of ``package`` they refer to, directly or through other modules, and
+    the installed versions of the other packages those modules use.
+
+    """
+    root_module = function.__module__
+    sources = {}
+    modules = set()
+    functions = [function]
+    while functions:
+        function = functions.pop()
+        if function in sources:
+            continue
+        sources[function] = inspect.getsource(function)
+
+        names = set()
+        codes = [function.__code__]
+        while codes:
+            code = codes.pop()
+            names.update(code.co_names)
+            codes.extend(const for const in code.co_consts if inspect.iscode(const))
+        module_globals = function.__globals__
+        for name in names:
+            value = module_globals.get(name)
+            if inspect.isfunction(value) and value.__module__ == root_module:
+                functions.append(value)
+            else:
+                modules.add(get_module_name(value))
+
+    internal_modules, external_packages = get_module_dependencies(modules - {None, root_module}, package)
+    # The loader's own module is covered function by function, so other loaders can change without a rebuild.
+    internal_modules.discard(root_module)
+    content = sorted(sources.values())
+    content += [inspect.getsource(sys.modules[module]) for module in sorted(internal_modules)]
+    for external_package in sorted(external_packages):
+        version = cache.get_package_version(external_package)
+        if version is not None:
+            content.append(f'{external_package}=={version}')
+    return hashlib.sha1('\n'.join(content).encode()).hexdigest()
+
+
+def get_module_name(value: Any) -> Optional[str]:
+    """Gets the module a module, function or class comes from, or ``None`` for other values."""
+    if inspect.ismodule(value):
+        return value.__name__
+    if inspect.isfunction(value) or inspect.isclass(value) or inspect.isbuiltin(value):
+        return getattr(value, '__module__', None)
+    return None
+
+
+def get_module_dependencies(modules: Set[str], package: str) -> Tuple[Set[str], Set[str]]:
+    """Follows modules of ``package`` through the modules they refer to.
+
+    Returns
+    -------
+        The modules of ``package`` reached, and the top level names of the
+        other packages they refer to.
+
+    """
+    internal_modules, external_packages = set(), set()
+    stack = list(modules)
+    while stack:
+        module = stack.pop()
+        top_level = module.split('.')[0]
+        if top_level != package:
+            external_packages.add(top_level)
+        elif module not in internal_modules and module in sys.modules:
+            internal_modules.add(module)
+            stack.extend(name for name in map(get_module_name, vars(sys.modules[module]).values())
+                         if name is not None)
+    return internal_modules, external_packages
+
+
+class BuildGraph:
+    """Builds artifact keys and their inputs for a single location.
+
+    Parameters
+    ----------
+    nodes
+        Mapping from each buildable key to its node.
+    location
+        The location to build data for.
+    max_workers
+        The number of threads used to build independent nodes.
+    load_existing
+        Optional callable returning already built data for a key, or
+        ``None`` if the key has not been built.  Used to seed the graph from
+        a partially built artifact.
+
+    """
+
+    def __init__(self, nodes: Dict[str, BuildNode], location: str, max_workers: int = 1,
+                 load_existing: Callable[[str], Any] = None):
+        self.nodes = nodes
+        self.location = location
+        self.max_workers = max_workers
+        self.load_existing = load_existing
+        self.data: Dict[str, Any] = {}
+        self.hashes: Dict[str, str] = {}
+        self.profile: Dict[str, KeyProfile] = {}
+
+    def get(self, key: str) -> Any:
+        """Returns the data for a key, building it and its inputs if needed."""
+        return self.build([key])[key]
+
+    def build(self, keys: List[str]) -> Dict[str, Any]:
+        """Builds the keys and everything they depend on.
+
+        Returns
+        -------
+            The data for each of the requested keys.
+
+        """
+        pending = self._get_pending(keys)
+        futures: Dict[Future, str] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or futures:
+                ready = [key for key in pending
+                         if all(input_key in self.data for input_key in self.nodes[key].inputs)]
+                for key in ready:
+                    pending.remove(key)
+                    futures[executor.submit(self._build_node, key)] = key
+                if not futures:
+                    raise ValueError(f'Build graph has a cycle among {sorted(pending)}.')
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key = futures.pop(future)
+                    self.data[key] = future.result()
+        return {key: self.data[key] for key in keys}
+
+    def get_hash(self, key: str) -> str:
+        """Returns the content hash of a key, which changes whenever the key would build differently."""
+        if key not in self.hashes:
+            node = self.nodes[key]
+            content = [key, self.location, get_code_version(node.loader), repr(node.parameters)]
+            content += [cache.get_file_fingerprint(source) for source in node.sources]
+            content += [self.get_hash(input_key) for input_key in node.inputs]
+            self.hashes[key] = hashlib.sha1('\n'.join(content).encode()).hexdigest()
+        return self.hashes[key]
+
+    def _get_pending(self, keys: List[str]) -> List[str]:
+        """Finds every key that still has to be built."""
+        pending = []
+        stack = list(keys)
+        while stack:
+            key = stack.pop()
+            if key in self.data or key in pending:
+                continue
+            if key not in self.nodes:
+                raise ValueError(f'No build node for key {key}.')
+            existing = self.load_existing(key) if self.load_existing else None
+            if existing is not None:
+                logger.debug(f'Using existing data for {key}.')
+                self.data[key] = existing
+                continue
+            pending.append(key)
+            stack.extend(self.nodes[key].inputs)
+        return pending
+
+    def _build_node(self, key: str) -> Any:
+        node = self.nodes[key]
+        logger.debug(f'Building {key} for location {self.location}.')
+        start, start_rss_mb = time.time(), get_rss_mb()
+        data = node.loader(key, self.location, *[self.data[input_key] for input_key in node.inputs])
+        self.profile[key] = KeyProfile(time.time() - start, get_rss_mb() - start_rss_mb)
+        logger.debug(f'Built {key} in {self.profile[key].seconds:.1f} seconds.')
+        return data
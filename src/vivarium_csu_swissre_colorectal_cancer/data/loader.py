@@ -12,6 +12,9 @@ for an example.
 
    No logging is done here. Logging is done in vivarium inputs itself and forwarded.
 """
+import itertools
+from typing import Dict
+
 import numpy as np, pandas as pd
 from pathlib import Path
 
@@ -21,8 +24,9 @@ from vivarium_gbd_access import gbd
 from vivarium_inputs import globals as vi_globals, interface, utilities as vi_utils, utility_data
 from vivarium_inputs.mapping_extension import alternative_risk_factors
 
-from vivarium_csu_swissre_colorectal_cancer import paths, utilities
+from vivarium_csu_swissre_colorectal_cancer import paths
 from vivarium_csu_swissre_colorectal_cancer.constants import data_keys, data_values, metadata
+from vivarium_csu_swissre_colorectal_cancer.data import cache, graph
 
 
 def get_data(lookup_key: str, location: str, artifact: Artifact = None) -> pd.DataFrame:
@@ -43,29 +47,59 @@ def get_data(lookup_key: str, location: str, artifact: Artifact = None) -> pd.Da
         The requested data.
 
     """
-    mapping = {
-        data_keys.POPULATION.STRUCTURE: load_population_structure,
-        data_keys.POPULATION.AGE_BINS: load_age_bins,
-        data_keys.POPULATION.DEMOGRAPHY: load_demographic_dimensions,
-        data_keys.POPULATION.TMRLE: load_theoretical_minimum_risk_life_expectancy,
-        data_keys.POPULATION.ACMR: load_acmr,
-
-        data_keys.COLORECTAL_CANCER.RAW_INCIDENCE_RATE: load_raw_incidence_rate,
-        data_keys.COLORECTAL_CANCER.RAW_PREVALENCE: load_raw_prevalence,
-        data_keys.COLORECTAL_CANCER.DISABILITY_WEIGHT: load_disability_weight,
-        data_keys.COLORECTAL_CANCER.CSMR: load_csmr,
-        data_keys.COLORECTAL_CANCER.RESTRICTIONS: load_metadata
-    }
-
-
     if artifact and lookup_key in artifact:
         data = artifact.load(lookup_key)
     else:
-        data = mapping[lookup_key](lookup_key, location)
+        data = get_build_graph(location).get(lookup_key)
 
     return data
 
 
+# One graph per location, so keys built by earlier calls are reused as inputs by later ones.
+_BUILD_GRAPHS: Dict[str, graph.BuildGraph] = {}
+
+
+def get_build_graph(location: str) -> graph.BuildGraph:
+    """Gets the build graph shared by every :func:`get_data` call for a location."""
+    if location not in _BUILD_GRAPHS:
+        _BUILD_GRAPHS[location] = graph.BuildGraph(get_build_nodes(), location)
+    return _BUILD_GRAPHS[location]
+
+
+def get_build_nodes() -> Dict[str, graph.BuildNode]:
+    """Declares how to build each key and which keys it is built from."""
+    colorectal_cancer = data_keys.COLORECTAL_CANCER
+    location_weights = (data_keys.SWISSRE_LOCATION_WEIGHTS,)
+    return {
+        data_keys.POPULATION.STRUCTURE: graph.BuildNode(load_population_structure),
+        data_keys.POPULATION.AGE_BINS: graph.BuildNode(load_age_bins),
+        data_keys.POPULATION.DEMOGRAPHY: graph.BuildNode(load_demographic_dimensions),
+        data_keys.POPULATION.TMRLE: graph.BuildNode(load_theoretical_minimum_risk_life_expectancy),
+        data_keys.POPULATION.ACMR: graph.BuildNode(
+            load_acmr, sources=(paths.RAW_ACMR_DATA_PATH,), parameters=location_weights
+        ),
+
+        colorectal_cancer.RAW_INCIDENCE_RATE: graph.BuildNode(
+            load_raw_incidence_rate, sources=(paths.RAW_INCIDENCE_RATE_DATA_PATH,), parameters=location_weights
+        ),
+        colorectal_cancer.RAW_PREVALENCE: graph.BuildNode(
+            load_raw_prevalence, sources=(paths.RAW_PREVALENCE_DATA_PATH,), parameters=location_weights
+        ),
+        colorectal_cancer.DISABILITY_WEIGHT: graph.BuildNode(load_disability_weight, parameters=location_weights),
+        colorectal_cancer.CSMR: graph.BuildNode(
+            load_csmr, sources=(paths.RAW_MORTALITY_DATA_PATH,), parameters=location_weights
+        ),
+        colorectal_cancer.RESTRICTIONS: graph.BuildNode(load_metadata),
+
+        colorectal_cancer.PREVALENCE_CANCER: graph.BuildNode(
+            load_cancer_prevalence, (colorectal_cancer.RAW_PREVALENCE,), parameters=(data_values.SCREENING_BASELINE,)
+        ),
+        colorectal_cancer.EMR: graph.BuildNode(
+            load_emr, (colorectal_cancer.CSMR, colorectal_cancer.PREVALENCE_CANCER)
+        ),
+    }
+
+
 def load_population_structure(key: str, location: str) -> pd.DataFrame:
 
     def get_row(sex, year):
@@ -92,7 +126,7 @@ def load_population_structure(key: str, location: str) -> pd.DataFrame:
 
 
 def load_age_bins(key: str, location: str) -> pd.DataFrame:
-    return interface.get_age_bins()
+    return cache.get_artifact_age_bins()
 
 
 def load_demographic_dimensions(key: str, location: str) -> pd.DataFrame:
@@ -118,7 +152,7 @@ def load_demographic_dimensions(key: str, location: str) -> pd.DataFrame:
 
 
 def load_theoretical_minimum_risk_life_expectancy(key: str, location: str) -> pd.DataFrame:
-    return interface.get_theoretical_minimum_risk_life_expectancy()
+    return cache.get_theoretical_minimum_risk_life_expectancy()
 
 
 def load_standard_data(key: str, location: str) -> pd.DataFrame:
@@ -160,42 +194,46 @@ def load_raw_prevalence(key: str, location: str) -> pd.DataFrame:
 def load_disability_weight(key: str, location: str):
     """Loads disability weights, weighting by subnational location"""
     if key == data_keys.COLORECTAL_CANCER.DISABILITY_WEIGHT:
-        location_weighted_disability_weight = 0
-        for swissre_location, location_weight in data_keys.SWISSRE_LOCATION_WEIGHTS.items():
-            prevalence_disability_weight = 0
-            total_sequela_prevalence = 0
-            for sequela in causes.colon_and_rectum_cancer.sequelae:
-                # Get prevalence and disability weight for location and sequela
-                prevalence = interface.get_measure(sequela, 'prevalence', swissre_location)
-                prevalence = prevalence.reset_index()
-                prevalence["location"] = location
-                prevalence = prevalence.set_index(metadata.ARTIFACT_INDEX_COLUMNS)
-                disability_weight = interface.get_measure(sequela, 'disability_weight', swissre_location)
-                disability_weight = disability_weight.reset_index()
-                disability_weight["location"] = location
-                disability_weight = disability_weight.set_index(metadata.ARTIFACT_INDEX_COLUMNS)
-                # Apply prevalence weight
-                prevalence_disability_weight += prevalence * disability_weight
-                total_sequela_prevalence += prevalence
-
-            # Calculate disability weight and apply location weight
-            disability_weight = prevalence_disability_weight / total_sequela_prevalence
-            disability_weight = disability_weight.fillna(0)  # handle NaNs from dividing by 0 prevalence
-            location_weighted_disability_weight += disability_weight * location_weight
-        disability_weight = location_weighted_disability_weight / sum(data_keys.SWISSRE_LOCATION_WEIGHTS.values())
-        return disability_weight
+        swissre_locations = list(data_keys.SWISSRE_LOCATION_WEIGHTS)
+        sequelae = list(causes.colon_and_rectum_cancer.sequelae)
+        measures = ['prevalence', 'disability_weight']
+        requests = list(itertools.product(sequelae, measures, swissre_locations))
+        data = cache.get_measures(requests, interface.get_measure, metadata.MAKE_ARTIFACT_FETCH_WORKERS)
+
+        # Stack everything into one frame indexed by request, with the province dropped from the data index.
+        data = pd.concat([d.reset_index('location', drop=True) for d in data],
+                         keys=[(sequela.name, measure, swissre_location)
+                               for sequela, measure, swissre_location in requests],
+                         names=['sequela', 'measure', 'swissre_location'])
+        demographic_levels = [c for c in metadata.ARTIFACT_INDEX_COLUMNS if c != 'location']
+        prevalence = data.xs('prevalence', level='measure')
+        disability_weight = data.xs('disability_weight', level='measure')
+
+        # Prevalence-weighted disability weight by province
+        by_province = ['swissre_location'] + demographic_levels
+        disability_weight = ((prevalence * disability_weight).groupby(level=by_province).sum()
+                             / prevalence.groupby(level=by_province).sum())
+        disability_weight = disability_weight.fillna(0)  # handle NaNs from dividing by 0 prevalence
+
+        # Apply location weights
+        location_weights = pd.Series(data_keys.SWISSRE_LOCATION_WEIGHTS)
+        disability_weight = (disability_weight
+                             .mul(location_weights, axis=0, level='swissre_location')
+                             .groupby(level=demographic_levels).sum()
+                             / location_weights.sum())
+        disability_weight['location'] = location
+        return disability_weight.set_index('location', append=True).reorder_levels(metadata.ARTIFACT_INDEX_COLUMNS)
     else:
         raise ValueError(f'Unrecognized key {key}')
 
 
 
 # TODO move to lookup table implementation
-def load_emr(key: str, location: str):
-    return get_data(data_keys.COLORECTAL_CANCER.CSMR, location) / get_data(data_keys.COLORECTAL_CANCER.PREVALENCE_CANCER, location)
+def load_emr(key: str, location: str, csmr: pd.DataFrame, prevalence: pd.DataFrame):
+    return csmr / prevalence
 
 
-def load_cancer_prevalence(key: str, location: str):
-    prev = get_data(data_keys.COLORECTAL_CANCER.RAW_PREVALENCE, location)
+def load_cancer_prevalence(key: str, location: str, prev: pd.DataFrame):
 
     has_cancer_and_is_screened = data_values.SCREENING_BASELINE * prev
     has_cancer_and_is_not_screened = (1 - data_values.SCREENING_BASELINE) * prev
@@ -203,13 +241,6 @@ def load_cancer_prevalence(key: str, location: str):
     return has_cancer_and_is_screened + has_cancer_and_is_not_screened
 
 
-def load_preclinical_prevalence(key: str, location: str):
-    incidence_pc = get_data(data_keys.COLORECTAL_CANCER.INCIDENCE_RATE_PRECLINICAL, location)
-    mst = utilities.get_normal_random_variable_draws(*data_values.MEAN_SOJOURN_TIME, incidence_pc.columns)
-    return incidence_pc * mst
-
-
-
 def _load_em_from_meid(location, meid, measure):
     location_id = utility_data.get_location_id(location)
     data = gbd.get_modelable_entity_draws(meid, location_id)
@@ -228,20 +259,13 @@ def _load_em_from_meid(location, meid, measure):
 # project-specific data functions
 
 def _preprocess_raw_data(data_path: Path) -> pd.DataFrame:
-    if data_path.suffix == '.hdf':
-        raw_data: pd.DataFrame = pd.read_hdf(data_path)
-    elif data_path.suffix == '.csv':
-        raw_data: pd.DataFrame = pd.read_csv(data_path)
-    else:
-        raise ValueError(f'File has unsupported suffix: {data_path.suffix}')
-
-    age_bins = gbd.get_age_bins().set_index('age_group_name')
-    locations = gbd.get_location_ids().set_index('location_name')
+    # Filtered to the SwissRE provinces and cached on disk after the first read.
+    data = cache.read_raw_forecast(data_path)
 
-    swissre_locations_mask = raw_data['location_id'].isin(data_keys.SWISSRE_LOCATION_WEIGHTS)
-    data = raw_data[swissre_locations_mask]
+    age_bins = cache.get_age_bins().set_index('age_group_name')
+    locations = cache.get_location_ids().set_index('location_name')
 
-    data['sex_id'] = data['sex_id'].apply(lambda x: 1 if x == 'Male' else 2)
+    data['sex_id'] = np.where(data['sex_id'] == 'Male', 1, 2)
 
     data = (
         data
@@ -271,40 +295,68 @@ def _preprocess_raw_data(data_path: Path) -> pd.DataFrame:
     return data
 
 
-def _transform_raw_data(location: str, raw_data: pd.DataFrame, is_log_data: bool) -> pd.DataFrame:
+def _transform_raw_data(location: str, raw_data: pd.DataFrame, is_log_data: bool,
+                        year_chunk_size: int = metadata.MAKE_ARTIFACT_PIVOT_YEAR_CHUNK_SIZE) -> pd.DataFrame:
+    """Weights the covered provinces and pivots the draws into columns.
+
+    Parameters
+    ----------
+    location
+        The location to label the output with.
+    raw_data
+        Preprocessed raw forecast data.
+    is_log_data
+        Whether the raw values are in log space.
+    year_chunk_size
+        Number of years to pivot at a time, bounding the size of
+        intermediate arrays.  If ``None``, every year is pivoted at once.
+
+    Returns
+    -------
+        The weighted data indexed by the artifact index columns with one
+        column per draw.
+
+    """
     processed_data = _transform_raw_data_preliminary(raw_data, is_log_data)
-    processed_data['location'] = location
 
     # Weight the covered provinces
-    processed_data['value'] = 0.0
-    for province, weight in data_keys.SWISSRE_LOCATION_WEIGHTS.items():
-        processed_data['value'] = processed_data['value'] + processed_data[province] * weight
-    processed_data['value'] /= sum(data_keys.SWISSRE_LOCATION_WEIGHTS.values())
+    weights = pd.Series(data_keys.SWISSRE_LOCATION_WEIGHTS)
+    values = processed_data[weights.index].to_numpy() @ (weights.to_numpy() / weights.sum())
+    index = processed_data.index
+    del processed_data
 
-    processed_data = (
-        processed_data
-            # Remove province columns
-            .drop([province for province in data_keys.SWISSRE_LOCATION_WEIGHTS.keys()], axis=1)
-            # Set index to final columns and unstack with draws as columns
-            .reset_index()
-            .set_index(metadata.ARTIFACT_INDEX_COLUMNS + ["draw"])
-            .unstack()
-    )
+    # Remove all age groups less than 15 years old
+    is_adult = index.get_level_values('age_start') >= 15
+    return _pivot_draws(location, index[is_adult], values[is_adult], year_chunk_size)
 
-    # Simplify column index and rename draw columns
-    processed_data.columns = [c[1] for c in processed_data.columns]
-    processed_data = processed_data.rename(columns={col: f'draw_{col}' for col in processed_data.columns})
 
-    # Remove all age groups less than 15 years old
-    processed_data = processed_data.reset_index()
-    processed_data = processed_data[processed_data['age_start'] >= 15].set_index(metadata.ARTIFACT_INDEX_COLUMNS)
-    return processed_data
+def _pivot_draws(location: str, index: pd.MultiIndex, values: np.ndarray,
+                 year_chunk_size: int = metadata.MAKE_ARTIFACT_PIVOT_YEAR_CHUNK_SIZE) -> pd.DataFrame:
+    """Pivots long data with a draw index level into a preallocated array with one column per draw."""
+    draws, draw_codes = np.unique(index.get_level_values('draw'), return_inverse=True)
+    demographic_index = index.droplevel('draw')
+    rows = demographic_index.unique().sort_values()
+
+    wide = np.full((len(rows), len(draws)), np.nan)
+    if year_chunk_size is None:
+        wide[rows.get_indexer(demographic_index), draw_codes] = values
+    else:
+        years = demographic_index.get_level_values('year_start')
+        for chunk_start in range(int(years.min()), int(years.max()) + 1, year_chunk_size):
+            in_chunk = np.flatnonzero((years >= chunk_start) & (years < chunk_start + year_chunk_size))
+            wide[rows.get_indexer(demographic_index[in_chunk]), draw_codes[in_chunk]] = values[in_chunk]
+
+    rows = pd.MultiIndex.from_arrays(
+        [np.full(len(rows), location)] + [rows.get_level_values(level) for level in rows.names],
+        names=['location'] + list(rows.names)
+    ).reorder_levels(metadata.ARTIFACT_INDEX_COLUMNS)
+    return pd.DataFrame(wide, index=rows, columns=[f'draw_{draw}' for draw in draws])
 
 
 def _transform_raw_data_preliminary(raw_data: pd.DataFrame, is_log_data: bool = False) -> pd.DataFrame:
     """Transforms data to a form with draws in the index and raw locations as columns"""
-    age_bins = gbd.get_age_bins().set_index('age_group_id')
-    locations = gbd.get_location_ids().set_index('location_id')
+    age_bins = cache.get_age_bins().set_index('age_group_id')
+    locations = cache.get_location_ids().set_index('location_id')
 
     # Transform raw data from log space to linear space
     log_value_column = raw_data.columns[0]
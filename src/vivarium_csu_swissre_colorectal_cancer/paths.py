@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 import vivarium_csu_swissre_colorectal_cancer
@@ -14,3 +15,14 @@ RAW_ACMR_DATA_PATH = Path('/ihme/csu/swiss_re/forecast/294_deaths_12_29_ng_smoot
 RAW_INCIDENCE_RATE_DATA_PATH = Path('/ihme/csu/swiss_re/forecast/441_incidence_12_29_ng_smooth_13.csv')
 RAW_MORTALITY_DATA_PATH = Path('/ihme/csu/swiss_re/forecast/441_deaths_12_29_ng_smooth_13.csv')
 RAW_PREVALENCE_DATA_PATH = Path('/ihme/csu/swiss_re/forecast/441_prevalence_12_29_ng_smooth_13.csv')
+# Local caches of artifact inputs.  Each can be moved with its environment variable.
+CACHE_ROOT = Path.home() / '.cache' / metadata.PROJECT_NAME
+# Filtered copies of the raw forecast files.
+RAW_DATA_CACHE_DIR_ENV = 'SWISSRE_RAW_DATA_CACHE_DIR'
+RAW_DATA_CACHE_DIR = Path(os.environ.get(RAW_DATA_CACHE_DIR_ENV, CACHE_ROOT / 'raw'))
+# GBD reference data, and the only source of it for offline builds.
+REFERENCE_DATA_DIR_ENV = 'SWISSRE_REFERENCE_DATA_DIR'
+REFERENCE_DATA_DIR = Path(os.environ.get(REFERENCE_DATA_DIR_ENV, CACHE_ROOT / 'reference'))
+# GBD measures pulled for each SwissRE province.
+MEASURE_CACHE_DIR_ENV = 'SWISSRE_MEASURE_CACHE_DIR'
+MEASURE_CACHE_DIR = Path(os.environ.get(MEASURE_CACHE_DIR_ENV, CACHE_ROOT / 'measures'))
@@ -1,17 +1,42 @@
+import functools
 from pathlib import Path
+import re
+import warnings
 from typing import NamedTuple, List
 
+import numpy as np
 import pandas as pd
 import yaml
 
-from vivarium_csu_swissre_colorectal_cancer.constants import results
+from vivarium_csu_swissre_colorectal_cancer.constants import results, scenarios
 
 
 SCENARIO_COLUMN = 'scenario'
+AGGREGATE_CACHE_SUMS_KEY = 'seed_sums'
+AGGREGATE_CACHE_FOLDED_KEY = 'folded_seeds'
+AGGREGATE_CACHE_PENDING_KEY = 'pending_rows'
 GROUPBY_COLUMNS = [
     results.INPUT_DRAW_COLUMN,
     SCENARIO_COLUMN
 ]
+VALUE_COLUMN = 'value'
+REPLICATE_COLUMN_PATTERN = re.compile(f'(.+)_{results.REPLICATE_COLUMN}_(\\d+)')
+WEIGHT_CLASS_COLUMN_PATTERN = re.compile(f'(.+)_{results.WEIGHT_CLASS_COLUMN}_(\\d+)')
+VALUE_TYPE_COLUMN = 'value_type'
+RATE_DENOMINATOR_COLUMNS = [
+    SCENARIO_COLUMN,
+    'year',
+    'sex',
+    'age',
+]
+# Label for cells aggregated over every value of a dimension.
+ALL = 'all'
+ROLLUP_DIMENSIONS = ['year', 'sex', 'age']
+# Causes are only summed for measures where they partition the total.
+CAUSE_ROLLUP_MEASURES = ['deaths', 'ylls', 'ylds']
+ROLLUP_YEAR_GROUP_WIDTH = 5
+# Lower and upper bounds of the uncertainty interval, as percentiles.
+UNCERTAINTY_INTERVAL = (2.5, 97.5)
 OUTPUT_COLUMN_SORT_ORDER = [
     'age_group',
     'sex',
@@ -51,8 +76,254 @@ class MeasureData(NamedTuple):
             df.to_csv(output_dir / f'{key}.csv')
 
 
+def summarize_measure_data(measure_data: MeasureData, with_rates: bool = True) -> MeasureData:
+    """Summarizes every measure across input draws.
+
+    Counts are summarized for all measures.  If ``with_rates`` is set, measures
+    stratified by year, sex and age are also summarized as rates per
+    person-year, computed draw by draw before summarizing.
+
+    """
+    person_time = measure_data.person_time
+    summaries = {}
+    for key, data in measure_data._asdict().items():
+        cells, draws, values = get_dense_draws(data)
+        summary = [summarize_draws(cells, values).assign(**{VALUE_TYPE_COLUMN: 'count'})]
+        if with_rates and key != 'person_time' and set(RATE_DENOMINATOR_COLUMNS).issubset(cells.columns):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rates = values / get_person_time_draws(person_time, cells, draws)
+            summary.append(summarize_draws(cells, rates).assign(**{VALUE_TYPE_COLUMN: 'rate'}))
+        summaries[key] = sort_data(pd.concat(summary, ignore_index=True))
+    return MeasureData(**summaries)
+
+
+def get_dense_draws(data: pd.DataFrame) -> (pd.DataFrame, np.ndarray, np.ndarray):
+    """Reshapes long measure data into a dense (cells x draws) array.
+
+    Returns
+    -------
+        The unique dimension combinations, the sorted input draws and an
+        array whose rows line up with the former and columns with the latter.
+        Cells missing a draw are filled with NaN.
+
+    """
+    dims = [c for c in data.columns if c not in [results.INPUT_DRAW_COLUMN, VALUE_COLUMN]]
+    grouped = data.groupby(dims, sort=True)
+    cells = grouped.size().index.to_frame(index=False)
+    cell_codes = grouped.ngroup().values
+    draws, draw_codes = np.unique(data[results.INPUT_DRAW_COLUMN].values, return_inverse=True)
+
+    values = np.full((len(cells), len(draws)), np.nan)
+    values[cell_codes, draw_codes] = data[VALUE_COLUMN].values
+    return cells, draws, values
+
+
+def get_person_time_draws(person_time: pd.DataFrame, cells: pd.DataFrame, draws: np.ndarray) -> np.ndarray:
+    """Aligns person time draws to the rows and columns of another dense array."""
+    pt_cells, pt_draws, pt_values = get_dense_draws(person_time)
+    pt_index = pd.MultiIndex.from_frame(pt_cells[RATE_DENOMINATOR_COLUMNS])
+    rows = pt_index.get_indexer(pd.MultiIndex.from_frame(cells[RATE_DENOMINATOR_COLUMNS]))
+    columns = pd.Index(pt_draws).get_indexer(draws)
+
+    # Pad with a column and row of NaNs so unmatched positions (-1) pick them up.
+    pt_values = np.pad(pt_values, ((0, 1), (0, 1)), mode='constant', constant_values=np.nan)
+    return pt_values[rows][:, columns]
+
+
+def summarize_draws(cells: pd.DataFrame, values: np.ndarray) -> pd.DataFrame:
+    lower, upper = UNCERTAINTY_INTERVAL
+    values = np.where(np.isfinite(values), values, np.nan)
+    with warnings.catch_warnings():
+        # All-NaN cells (e.g. rates with no person time) summarize to NaN.
+        warnings.simplefilter('ignore', RuntimeWarning)
+        summary = cells.assign(
+            mean=np.nanmean(values, axis=1),
+            median=np.nanmedian(values, axis=1),
+            lower=np.nanpercentile(values, lower, axis=1),
+            upper=np.nanpercentile(values, upper, axis=1),
+        )
+    return summary
+
+
+def make_rollup_data(measure_data: MeasureData) -> MeasureData:
+    """Pre-aggregates every measure to its common marginals.
+
+    See :func:`get_rollups`.  Measures without rollup dimensions, like
+    population, produce empty tables.
+
+    """
+    rollups = {}
+    for key, data in measure_data._asdict().items():
+        rollup_dimensions = ROLLUP_DIMENSIONS + (['cause'] if key in CAUSE_ROLLUP_MEASURES else [])
+        rollups[key] = sort_data(get_rollups(data, rollup_dimensions))
+    return MeasureData(**rollups)
+
+
+def get_rollups(data: pd.DataFrame, rollup_dimensions: List[str]) -> pd.DataFrame:
+    """Computes every marginal combination of the rollup dimensions in one pass.
+
+    The measure is laid out as a dense array with one axis per dimension and
+    a final draw axis.  Each rollup dimension is then contracted with a matrix
+    whose rows are its original values, its aggregate groups (five-year groups
+    for ``year``) and a row of ones labelled :data:`ALL`.  Other dimensions
+    are passed through unchanged.
+
+    Returns
+    -------
+        Long data in the same layout as the input, holding only the cells
+        where at least one rollup dimension is aggregated.
+
+    """
+    dims = [c for c in data.columns if c not in [results.INPUT_DRAW_COLUMN, VALUE_COLUMN]]
+    rollup_dims = [d for d in dims if d in rollup_dimensions]
+    if not rollup_dims:
+        return data.iloc[:0]
+
+    levels, codes = zip(*[np.unique(data[d].values, return_inverse=True) for d in dims])
+    draws, draw_codes = np.unique(data[results.INPUT_DRAW_COLUMN].values, return_inverse=True)
+    cube = np.zeros([len(level) for level in levels] + [len(draws)])
+    cube[codes + (draw_codes,)] = np.nan_to_num(data[VALUE_COLUMN].values)
+
+    labels, is_base = [], []
+    for axis, (dim, level) in enumerate(zip(dims, levels)):
+        groups = get_rollup_groups(dim, level) if dim in rollup_dims else []
+        aggregation = np.vstack([np.eye(len(level))]
+                                + [np.isin(level, members).astype(float) for _, members in groups])
+        cube = np.moveaxis(np.tensordot(aggregation, cube, axes=([1], [axis])), 0, axis)
+        labels.append(list(level) + [label for label, _ in groups])
+        is_base.append(np.arange(len(aggregation)) < len(level))
+
+    cells = pd.MultiIndex.from_product(labels, names=dims).to_frame(index=False)
+    aggregated = ~functools.reduce(np.logical_and, np.meshgrid(*is_base, indexing='ij')).ravel()
+    values = cube.reshape(-1, len(draws))[aggregated]
+    cells = cells.loc[aggregated].reset_index(drop=True)
+
+    rollup = pd.DataFrame({
+        results.INPUT_DRAW_COLUMN: np.tile(draws, len(cells)),
+        VALUE_COLUMN: values.ravel(),
+    })
+    rollup = pd.concat([cells.loc[cells.index.repeat(len(draws))].reset_index(drop=True), rollup], axis=1)
+    return rollup[list(data.columns)]
+
+
+def get_rollup_groups(dim: str, level: np.ndarray) -> List[tuple]:
+    """Gets (label, members) pairs for the aggregate groups of a dimension."""
+    groups = []
+    if dim == 'year':
+        first_year = results.YEARS[0]
+        years = sorted(level, key=int)
+        starts = sorted(set(first_year + (int(year) - first_year) // ROLLUP_YEAR_GROUP_WIDTH * ROLLUP_YEAR_GROUP_WIDTH
+                            for year in years))
+        for start in starts:
+            members = [year for year in years if start <= int(year) < start + ROLLUP_YEAR_GROUP_WIDTH]
+            groups.append((f'{members[0]}_to_{members[-1]}', members))
+    groups.append((ALL, list(level)))
+    return groups
+
+
+def get_scenario_differences(data: pd.DataFrame,
+                             pairing_columns: List[str]) -> (pd.DataFrame, pd.DataFrame):
+    """Computes paired outcomes averted and relative outcomes against the baseline.
+
+    Rows are paired across scenarios on ``pairing_columns``, which must include
+    the input draw and should include the random seed when seed-level rows are
+    available, so each difference is taken between runs that share common
+    random numbers.  All scenarios are laid out on one integer-coded pairing
+    index and differenced in bulk rather than merged.
+
+    Parameters
+    ----------
+    data
+        Wide results data with one row per scenario and pairing unit.
+    pairing_columns
+        Columns identifying the runs to pair across scenarios.
+
+    Returns
+    -------
+        Two wide, draw-level tables with the same columns as the output of
+        :func:`aggregate_over_seed`, for each non-baseline scenario: outcomes
+        averted (baseline minus scenario) and the ratio of scenario to baseline
+        outcomes.
+
+    """
+    value_columns = [c for c in data.select_dtypes(include=[np.number]).columns
+                     if c not in pairing_columns + GROUPBY_COLUMNS
+                     + [results.RANDOM_SEED_COLUMN, results.REPLICATE_COLUMN]]
+
+    grouped = data.groupby(pairing_columns, sort=True)
+    units = grouped.size().index.to_frame(index=False)
+    unit_codes = grouped.ngroup().values
+    draws, draw_codes = np.unique(units[results.INPUT_DRAW_COLUMN].values, return_inverse=True)
+
+    scenario_names, scenario_codes = np.unique(data[SCENARIO_COLUMN].values, return_inverse=True)
+    if scenarios.SCENARIOS.baseline not in scenario_names:
+        raise ValueError(f'Cannot compute scenario differences without {scenarios.SCENARIOS.baseline} results.')
+    baseline = int(np.flatnonzero(scenario_names == scenarios.SCENARIOS.baseline)[0])
+
+    values = np.full((len(scenario_names), len(units), len(value_columns)), np.nan)
+    values[scenario_codes, unit_codes] = data[value_columns].values
+
+    # Sum pairing units within each draw, e.g. over random seeds.
+    draw_totals = np.zeros((len(scenario_names), len(draws), len(value_columns)))
+    np.add.at(draw_totals, (slice(None), draw_codes), values)
+
+    differences, ratios = [], []
+    for code, scenario in enumerate(scenario_names):
+        if code == baseline:
+            continue
+        labels = {results.INPUT_DRAW_COLUMN: draws, SCENARIO_COLUMN: scenario}
+        difference = draw_totals[baseline] - draw_totals[code]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = draw_totals[code] / draw_totals[baseline]
+        differences.append(pd.DataFrame(difference, columns=value_columns).assign(**labels))
+        ratios.append(pd.DataFrame(ratio, columns=value_columns).assign(**labels))
+
+    return (pd.concat(differences, ignore_index=True)[GROUPBY_COLUMNS + value_columns],
+            pd.concat(ratios, ignore_index=True)[GROUPBY_COLUMNS + value_columns])
+
+
+class AggregateCache(NamedTuple):
+    """Partial seed sums and the output rows they were computed from.
+
+    ``folded`` lists the (draw, seed) pairs summed into ``seed_sums`` and
+    ``pending`` holds rows already read whose pairs are not yet complete
+    for every scenario.  ``rows_read`` counts the output rows read so far,
+    so the next run only reads the rows after them.
+
+    """
+    seed_sums: pd.DataFrame
+    folded: pd.DataFrame
+    pending: pd.DataFrame
+    keyspace: dict
+    rows_read: int
+
+
 def read_data(path: Path, single_run: bool) -> (pd.DataFrame, List[str]):
-    data = pd.read_hdf(path)
+    return prepare_data(pd.read_hdf(path), path, single_run)
+
+
+def read_new_data(path: Path, single_run: bool, start: int) -> (pd.DataFrame, List[str], int):
+    """Reads output rows from ``start`` on, along with the number of rows in the output.
+
+    Output written by ``run_sweep`` is a table, and only the new rows are
+    read.  Fixed-format output has to be read in full and is sliced.
+
+    """
+    with pd.HDFStore(str(path), mode='r') as store:
+        key = store.keys()[0]
+        storer = store.get_storer(key)
+        if storer.is_table:
+            rows = storer.nrows
+            data = store.select(key, start=start)
+        else:
+            data = store.get(key)
+            rows = len(data)
+            data = data.iloc[start:]
+    data, keyspace = prepare_data(data, path, single_run)
+    return data, keyspace, rows
+
+
+def prepare_data(data: pd.DataFrame, path: Path, single_run: bool) -> (pd.DataFrame, List[str]):
     # noinspection PyUnresolvedReferences
     data = (data
             .drop(columns=data.columns.intersection(results.THROWAWAY_COLUMNS))
@@ -71,7 +342,68 @@ def read_data(path: Path, single_run: bool) -> (pd.DataFrame, List[str]):
         data[results.RANDOM_SEED_COLUMN] = data[results.RANDOM_SEED_COLUMN].astype(int)
         with (path.parent / 'keyspace.yaml').open() as f:
             keyspace = yaml.full_load(f)
-    return data, keyspace
+    return split_replicates(apply_weights(data)), keyspace
+
+
+def apply_weights(data: pd.DataFrame) -> pd.DataFrame:
+    """Combines results of weighted simulations stratified by weight class into weighted totals.
+
+    Each result column ending in ``_weight_class_{k}`` is multiplied by the
+    weight of class ``k`` reported by the run and summed over classes into a
+    column without the suffix.
+
+    """
+    matches = {column: WEIGHT_CLASS_COLUMN_PATTERN.fullmatch(column) for column in data.columns}
+    class_columns = {column: match for column, match in matches.items() if match}
+    if not class_columns:
+        return data
+
+    weighted = {}
+    for column, match in class_columns.items():
+        weight_column = results.CLASS_WEIGHT_COLUMN_TEMPLATE.format(WEIGHT_CLASS=match.group(2))
+        values = data[column] * data[weight_column]
+        name = match.group(1)
+        weighted[name] = weighted[name] + values if name in weighted else values
+
+    weight_columns = [results.CLASS_WEIGHT_COLUMN_TEMPLATE.format(WEIGHT_CLASS=weight_class)
+                      for weight_class in results.WEIGHT_CLASSES]
+    data = data.drop(columns=list(class_columns) + [c for c in weight_columns if c in data.columns])
+    return pd.concat([data, pd.DataFrame(weighted)], axis=1)
+
+
+def split_replicates(data: pd.DataFrame) -> pd.DataFrame:
+    """Splits runs with stacked replicates into one row per replicate.
+
+    Result columns ending in ``_replicate_{r}`` are moved, without the
+    suffix, to a row for replicate ``r``, labelled in the replicate column.
+    Replicates of a run share its random seed and are not independent, so
+    the seed is kept as is and replicates are only ever summed within it.
+    Run-level columns without a replicate label are kept on the first
+    replicate's row and zeroed on the others, so sums over seeds are
+    unchanged.
+
+    """
+    matches = {column: REPLICATE_COLUMN_PATTERN.fullmatch(column) for column in data.columns}
+    replicate_columns = {column: match for column, match in matches.items() if match}
+    if not replicate_columns:
+        return data
+
+    replicate_count = max(int(match.group(2)) for match in replicate_columns.values()) + 1
+    stripped_columns = {match.group(1) for match in replicate_columns.values()}
+    run_columns = [c for c in data.columns if c not in replicate_columns and c not in stripped_columns]
+    run_value_columns = [c for c in data[run_columns].select_dtypes(include=[np.number]).columns
+                         if c not in [results.INPUT_DRAW_COLUMN, results.RANDOM_SEED_COLUMN]]
+
+    replicates = []
+    for replicate in range(replicate_count):
+        columns = {column: match.group(1) for column, match in replicate_columns.items()
+                   if int(match.group(2)) == replicate}
+        replicate_data = pd.concat([data[run_columns], data[list(columns)].rename(columns=columns)], axis=1)
+        if replicate:
+            replicate_data[run_value_columns] = 0
+        replicate_data[results.REPLICATE_COLUMN] = replicate
+        replicates.append(replicate_data)
+    return pd.concat(replicates, ignore_index=True, sort=False)
 
 
 def filter_out_incomplete(data, keyspace):
@@ -93,7 +425,8 @@ def aggregate_over_seed(data):
     non_count_columns = []
     for non_count_template in results.NON_COUNT_TEMPLATES:
         non_count_columns += results.get_result_columns(non_count_template)
-    count_columns = [c for c in data.columns if c not in non_count_columns + GROUPBY_COLUMNS]
+    count_columns = [c for c in data.columns
+                     if c not in non_count_columns + GROUPBY_COLUMNS + [results.REPLICATE_COLUMN]]
 
     # non_count_data = data[non_count_columns + GROUPBY_COLUMNS].groupby(GROUPBY_COLUMNS).mean()
     count_data = data[count_columns + GROUPBY_COLUMNS].groupby(GROUPBY_COLUMNS).sum()
@@ -103,6 +436,79 @@ def aggregate_over_seed(data):
     ], axis=1).reset_index()
 
 
+def get_empty_aggregate_cache() -> AggregateCache:
+    folded = pd.DataFrame(columns=[results.INPUT_DRAW_COLUMN, results.RANDOM_SEED_COLUMN], dtype=int)
+    return AggregateCache(None, folded, pd.DataFrame(), None, 0)
+
+
+def read_aggregate_cache(path: Path) -> AggregateCache:
+    """Reads partial seed sums written by :func:`write_aggregate_cache`.
+
+    Callers must check the cache still matches the output, e.g. that the
+    output directory has not been reused for a new sweep.
+
+    """
+    if not path.exists():
+        return get_empty_aggregate_cache()
+
+    with pd.HDFStore(str(path), mode='r') as store:
+        attrs = store.get_storer(AGGREGATE_CACHE_FOLDED_KEY).attrs
+        if 'rows_read' not in attrs:
+            # Written before rows were tracked.
+            return get_empty_aggregate_cache()
+        seed_sums = store.get(AGGREGATE_CACHE_SUMS_KEY) if AGGREGATE_CACHE_SUMS_KEY in store else None
+        pending = store.get(AGGREGATE_CACHE_PENDING_KEY) if AGGREGATE_CACHE_PENDING_KEY in store else pd.DataFrame()
+        return AggregateCache(seed_sums, store.get(AGGREGATE_CACHE_FOLDED_KEY), pending,
+                              attrs.keyspace, attrs.rows_read)
+
+
+def write_aggregate_cache(path: Path, cache: AggregateCache):
+    tmp_path = path.with_suffix('.tmp')
+    with pd.HDFStore(str(tmp_path), mode='w') as store:
+        store.put(AGGREGATE_CACHE_FOLDED_KEY, cache.folded)
+        attrs = store.get_storer(AGGREGATE_CACHE_FOLDED_KEY).attrs
+        attrs.keyspace = cache.keyspace
+        attrs.rows_read = cache.rows_read
+        if cache.seed_sums is not None:
+            store.put(AGGREGATE_CACHE_SUMS_KEY, cache.seed_sums)
+        if not cache.pending.empty:
+            store.put(AGGREGATE_CACHE_PENDING_KEY, cache.pending)
+    tmp_path.replace(path)
+
+
+def drop_folded_seeds(data: pd.DataFrame, folded: pd.DataFrame) -> pd.DataFrame:
+    """Removes rows for (draw, seed) pairs that are already part of the cached sums."""
+    if folded.empty:
+        return data
+    folded_columns = [results.INPUT_DRAW_COLUMN, results.RANDOM_SEED_COLUMN]
+    row_keys = pd.MultiIndex.from_arrays([data[c].values for c in folded_columns])
+    folded_keys = pd.MultiIndex.from_arrays([folded[c].values for c in folded_columns])
+    return data.loc[~row_keys.isin(folded_keys)].reset_index(drop=True)
+
+
+def fold_into_aggregate(seed_sums: pd.DataFrame, new_data: pd.DataFrame,
+                        folded: pd.DataFrame) -> (pd.DataFrame, pd.DataFrame):
+    """Adds newly completed rows to the cached seed sums.
+
+    ``new_data`` must already have been filtered to complete (draw, seed) pairs
+    so that every scenario in a draw is summed over the same set of seeds.
+
+    """
+    new_folded = (new_data[[results.INPUT_DRAW_COLUMN, results.RANDOM_SEED_COLUMN]]
+                  .drop_duplicates())
+    folded = pd.concat([folded, new_folded], ignore_index=True)
+
+    new_sums = aggregate_over_seed(new_data)
+    if seed_sums is None or seed_sums.empty:
+        return new_sums, folded
+
+    seed_sums = (seed_sums
+                 .set_index(GROUPBY_COLUMNS)
+                 .add(new_sums.set_index(GROUPBY_COLUMNS), fill_value=0)
+                 .reset_index())
+    return seed_sums, folded
+
+
 def pivot_data(data):
     return (data
             .set_index(GROUPBY_COLUMNS)
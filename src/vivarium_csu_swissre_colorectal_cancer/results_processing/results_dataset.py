@@ -0,0 +1,163 @@
+"""Partitioned on-disk layout for processed results and a query API over it.
+
+Each measure is written to its own directory with one file per scenario::
+
+    <root>/<measure>/<scenario>.hdf
+
+Files are stored in table format, sorted and indexed on their dimension
+columns, so a query only opens the partitions it needs and only reads the
+rows matching its filters.  Pre-aggregated marginals from
+:func:`process_results.make_rollup_data` are stored under a separate key in
+the same files and are read directly when a query asks for an aggregated
+cell, e.g. ``sex='all'`` or ``years='2020_to_2024'``.
+
+"""
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Union
+
+import pandas as pd
+
+from vivarium_csu_swissre_colorectal_cancer.results_processing import process_results
+
+DATA_KEY = 'data'
+ROLLUP_KEY = 'rollup'
+PARTITION_SUFFIX = '.hdf'
+PARTITION_COMPLEVEL = 5
+
+
+def write_partitioned(measure_data: process_results.MeasureData, root: Path, key: str = DATA_KEY):
+    """Writes measure data to a partitioned results dataset.
+
+    Parameters
+    ----------
+    measure_data
+        The processed results to write.
+    root
+        The directory to write the dataset to. Existing partitions for the
+        same measure and scenario are replaced.
+    key
+        Which table to write in each partition, :data:`DATA_KEY` for
+        the processed results or :data:`ROLLUP_KEY` for their rollups.
+
+    """
+    for measure, data in measure_data._asdict().items():
+        for scenario, scenario_data in data.groupby(process_results.SCENARIO_COLUMN):
+            write_partition(root / measure / f'{scenario}{PARTITION_SUFFIX}', key, scenario_data)
+
+
+def write_partition(path: Path, key: str, data: pd.DataFrame):
+    path.parent.mkdir(parents=True, exist_ok=True, mode=0o775)
+    data = process_results.sort_data(data.drop(columns=process_results.SCENARIO_COLUMN))
+    dimensions = get_dimension_columns(data)
+    with pd.HDFStore(str(path), mode='a', complevel=PARTITION_COMPLEVEL, complib='blosc') as store:
+        if key in store:
+            store.remove(key)
+        store.put(key, data, format='table', data_columns=dimensions, index=False)
+        store.create_table_index(key, columns=dimensions, optlevel=9, kind='full')
+
+
+def get_dimension_columns(data: pd.DataFrame) -> List[str]:
+    return [c for c in data.columns if c != process_results.VALUE_COLUMN]
+
+
+class ResultsDataset:
+    """Read-only access to a partitioned results dataset.
+
+    Examples
+    --------
+    >>> dataset = ResultsDataset('/path/to/results_dataset')
+    >>> dataset.query('deaths', scenario='alternative', years=range(2025, 2031),
+    ...               sex='female', cause='colon_and_rectum_cancer')
+
+    """
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+        if not self.root.is_dir():
+            raise FileNotFoundError(f'No results dataset found at {str(self.root)}.')
+
+    @property
+    def measures(self) -> List[str]:
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir())
+
+    def scenarios(self, measure: str) -> List[str]:
+        return sorted(p.stem for p in self._measure_dir(measure).glob(f'*{PARTITION_SUFFIX}'))
+
+    def query(self, measure: str, scenario: Union[str, Iterable[str]] = None,
+              years: Union[int, str, Iterable[Union[int, str]]] = None,
+              columns: List[str] = None, **filters: Any) -> pd.DataFrame:
+        """Reads the subset of a measure matching the given filters.
+
+        Parameters
+        ----------
+        measure
+            The measure to read, e.g. ``'deaths'`` or ``'person_time'``.
+        scenario
+            One or more scenarios to read. Defaults to all scenarios.
+        years
+            One or more years to read, e.g. ``2030`` or ``range(2025, 2031)``.
+            Defaults to all years.
+        columns
+            Columns to return. Defaults to all columns.
+        filters
+            Values to select on any other dimension column, e.g.
+            ``sex='female'``, ``cause=[...]`` or ``input_draw=[0, 1]``.
+            Pass :data:`process_results.ALL` or a year group to read
+            pre-aggregated cells.
+
+        Returns
+        -------
+            The matching rows of every requested scenario partition, with a
+            scenario column.
+
+        """
+        scenarios = self.scenarios(measure) if scenario is None else _as_list(scenario)
+        if years is not None:
+            filters['year'] = [str(year) for year in _as_list(years)]
+
+        key = ROLLUP_KEY if self._is_rollup_query(filters) else DATA_KEY
+        data = []
+        for scenario in scenarios:
+            path = self._measure_dir(measure) / f'{scenario}{PARTITION_SUFFIX}'
+            if not path.exists():
+                raise ValueError(f'No {scenario} partition for measure {measure}. '
+                                 f'Available scenarios are {self.scenarios(measure)}.')
+            scenario_data = self._read_partition(path, key, filters, columns)
+            data.append(scenario_data.assign(**{process_results.SCENARIO_COLUMN: scenario}))
+        return pd.concat(data, ignore_index=True)
+
+    def _measure_dir(self, measure: str) -> Path:
+        measure_dir = self.root / measure
+        if not measure_dir.is_dir():
+            raise ValueError(f'Unknown measure {measure}. Available measures are {self.measures}.')
+        return measure_dir
+
+    @staticmethod
+    def _is_rollup_query(filters: Dict[str, Any]) -> bool:
+        requested = {column: [str(value) for value in _as_list(values)] for column, values in filters.items()}
+        return (any(process_results.ALL in values for values in requested.values())
+                or any('_to_' in year for year in requested.get('year', [])))
+
+    @staticmethod
+    def _read_partition(path: Path, key: str, filters: Dict[str, Any], columns: List[str] = None) -> pd.DataFrame:
+        with pd.HDFStore(str(path), mode='r') as store:
+            if key not in store:
+                raise ValueError(f'No {key} table in {str(path)}.')
+            available = store.get_storer(key).data_columns
+            unknown = set(filters).difference(available)
+            if unknown:
+                raise ValueError(f'Cannot filter {path.parent.name} on {sorted(unknown)}. '
+                                 f'Available dimensions are {available}.')
+            where = [f'{column}={_as_list(values)!r}' for column, values in filters.items()]
+            return store.select(key, where=where or None, columns=columns)
+
+
+def _as_list(values: Any) -> List[Any]:
+    if isinstance(values, (str, int)) or not isinstance(values, Iterable):
+        return [values]
+    return list(values)
+
+
+def open_results(root: Union[str, Path]) -> ResultsDataset:
+    """Opens a partitioned results dataset written by ``make_results --partition``."""
+    return ResultsDataset(root)
@@ -2,3 +2,6 @@ from .app_logging import configure_logging_to_terminal
 from .make_specs import build_model_specifications
 from .make_artifacts import build_artifacts
 from .make_results import build_results
+from .make_synthetic_artifact import build_synthetic_artifact
+from .benchmark_storage import benchmark_storage
+from .run_sweep import run_sweep
@@ -0,0 +1,117 @@
+"""Benchmarks artifact storage profiles.
+
+Rewrites a built artifact once per storage profile and measures what each
+profile costs to write, how large the file is, and how long a simulation
+takes to read its inputs from it with a cold and a warm page cache.
+
+Cold reads drop the file from the local page cache with ``posix_fadvise``.
+On network filesystems the server may still hold the data in its own
+cache, so cold timings there are a lower bound.
+
+.. admonition::
+
+   Logging in this module should typically be done at the ``info`` level.
+   Use your best judgement.
+
+"""
+import os
+from pathlib import Path
+import time
+from typing import List, Union
+
+from loguru import logger
+import pandas as pd
+from vivarium.framework.artifact import Artifact
+
+from vivarium_csu_swissre_colorectal_cancer import utilities
+from vivarium_csu_swissre_colorectal_cancer.constants import data_keys, metadata
+
+BENCHMARK_DRAW = 0
+BENCHMARK_RESULTS_FILE = 'storage_benchmark.csv'
+
+
+def benchmark_storage(artifact_path: Union[str, Path], output_dir: Union[str, Path],
+                      storage_profiles: List[str] = None, repeats: int = 3) -> pd.DataFrame:
+    """Measures write time, file size and read times of artifact storage profiles.
+
+    Parameters
+    ----------
+    artifact_path
+        Path to a built artifact to copy the data from.
+    output_dir
+        Directory to write one copy of the artifact per profile and the
+        results table to.
+    storage_profiles
+        Names of the profiles to benchmark.  Defaults to all of them.
+    repeats
+        Number of times each read is timed.  The median is reported.
+
+    Returns
+    -------
+        One row per profile with write seconds, size in MB and median cold
+        and warm read seconds.
+
+    """
+    artifact_path, output_dir = Path(artifact_path), Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    storage_profiles = storage_profiles or list(metadata.ARTIFACT_STORAGE_PROFILES)
+    source = Artifact(artifact_path)
+
+    results = []
+    for storage_profile in storage_profiles:
+        path = output_dir / f'{artifact_path.stem}.{storage_profile}.hdf'
+        if path.exists():
+            path.unlink()
+        logger.info(f'Writing artifact with storage profile {storage_profile} to {str(path)}.')
+        write_seconds = time_write(source, path, storage_profile)
+
+        cold_seconds, warm_seconds = [], []
+        for _ in range(repeats):
+            drop_from_page_cache(path)
+            cold_seconds.append(time_read(path))
+            warm_seconds.append(time_read(path))
+        results.append({
+            'storage_profile': storage_profile,
+            'write_seconds': write_seconds,
+            'size_mb': path.stat().st_size / 1024 ** 2,
+            'cold_read_seconds': pd.Series(cold_seconds).median(),
+            'warm_read_seconds': pd.Series(warm_seconds).median(),
+        })
+        logger.info(f'{storage_profile:<30}: {results[-1]}')
+
+    results = pd.DataFrame(results).set_index('storage_profile').sort_values('cold_read_seconds')
+    results.to_csv(output_dir / BENCHMARK_RESULTS_FILE)
+    logger.info(f'Wrote benchmark results to {str(output_dir / BENCHMARK_RESULTS_FILE)}.')
+    return results
+
+
+def time_write(source: Artifact, path: Path, storage_profile: str) -> float:
+    """Copies every key of the source artifact to path, timing the per-draw writes."""
+    artifact = Artifact(path)
+    write_seconds = 0.0
+    for key in source.keys:
+        if key in data_keys.BY_DRAW_KEYS:
+            data = utilities.read_draws(source.path, key)
+            start = time.time()
+            utilities.write_data_by_draw(artifact, key, data, storage_profile)
+            write_seconds += time.time() - start
+        else:
+            artifact.write(key, source.load(key))
+    return write_seconds
+
+
+def time_read(path: Path) -> float:
+    """Times reading one draw of every per-draw key, as a simulation does on setup."""
+    start = time.time()
+    for key in data_keys.BY_DRAW_KEYS:
+        utilities.read_data_by_draw(path, key, BENCHMARK_DRAW)
+    return time.time() - start
+
+
+def drop_from_page_cache(path: Path):
+    fd = os.open(str(path), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
@@ -0,0 +1,173 @@
+"""Checkpoints for long simulation runs.
+
+A checkpoint holds everything that changes while a simulation runs: the
+state table, the clock, the map from simulants to random number keys and
+the accumulators of every component that defines
+``get_checkpoint_state`` and ``set_checkpoint_state``.  Everything else is
+rebuilt from the model specification, so a checkpoint is restored into a
+freshly set up simulation with the same configuration.
+
+Random numbers are drawn by hashing simulant keys with the clock time, so
+restoring the clock and key map is enough for a resumed run to draw the same
+numbers as an uninterrupted one.
+
+A checkpoint is an HDF file.  The state table and every other pandas object
+are stored as HDF keys, and the remaining state is stored as JSON, so
+nothing is pickled.  The simulation internals read here are private to
+vivarium, so each checkpoint records the vivarium version that wrote it and
+is refused by any other version.
+
+.. admonition::
+
+   Logging in this module should typically be done at the ``info`` level.
+   Use your best judgement.
+
+"""
+from collections import Counter
+import json
+from pathlib import Path
+import time
+from typing import Any, Callable, Dict, List, Union
+
+from loguru import logger
+import numpy as np
+import pandas as pd
+
+from vivarium_csu_swissre_colorectal_cancer.data import cache
+
+CHECKPOINT_SUFFIX = '.checkpoint.hdf'
+POPULATION_KEY = 'population'
+STATE_KEY = 'state'
+FRAME_KEY = 'frame_{}'
+
+PandasObject = Union[pd.DataFrame, pd.Series]
+
+
+def run_with_checkpoints(sim, checkpoint_path: Path, interval: float):
+    """Runs a simulation to its end, writing a checkpoint every ``interval`` seconds.
+
+    If a checkpoint already exists at ``checkpoint_path`` the simulation is
+    resumed from it.  The checkpoint is removed once the run finishes.
+
+    """
+    if checkpoint_path.exists():
+        read_checkpoint(sim, checkpoint_path)
+        logger.info(f'Resumed simulation at {sim.current_time} from {str(checkpoint_path)}.')
+
+    last_checkpoint = time.time()
+    while sim.current_time < sim._clock.stop_time:
+        sim.step()
+        if time.time() - last_checkpoint > interval:
+            write_checkpoint(sim, checkpoint_path)
+            last_checkpoint = time.time()
+
+    if checkpoint_path.exists():
+        checkpoint_path.unlink()
+
+
+def get_checkpoint_state(sim) -> Dict[str, Any]:
+    return {
+        'time': sim._clock._time,
+        'key_mapping': vars(sim._randomness._key_mapping),
+        'components': {name: component.get_checkpoint_state()
+                       for name, component in sim.list_components().items()
+                       if hasattr(component, 'get_checkpoint_state')},
+    }
+
+
+def set_checkpoint_state(sim, population: pd.DataFrame, state: Dict[str, Any]):
+    sim._population._population = population
+    sim._clock._time = state['time']
+    # Randomness streams hold a reference to the key map, so it is updated in place.
+    vars(sim._randomness._key_mapping).update(state['key_mapping'])
+    components = sim.list_components()
+    for name, component_state in state['components'].items():
+        components[name].set_checkpoint_state(component_state)
+
+
+def get_vivarium_version() -> str:
+    return cache.get_package_version('vivarium')
+
+
+def write_checkpoint(sim, path: Path):
+    tmp_path = path.with_suffix('.tmp')
+    frames = []
+    state = {
+        'vivarium_version': get_vivarium_version(),
+        'state': encode_state(get_checkpoint_state(sim), frames),
+    }
+    with pd.HDFStore(str(tmp_path), mode='w') as store:
+        # Table format keeps categorical columns of the state table.
+        store.put(POPULATION_KEY, sim._population._population, format='table')
+        for i, frame in enumerate(frames):
+            store.put(FRAME_KEY.format(i), frame)
+        store.put(STATE_KEY, pd.Series([json.dumps(state)]))
+    tmp_path.replace(path)
+    logger.debug(f'Wrote checkpoint at {sim.current_time} to {str(path)}.')
+
+
+def read_checkpoint(sim, path: Path):
+    """Restores a simulation from a checkpoint.
+
+    Raises
+    ------
+    ValueError
+        If the checkpoint was written by a different vivarium version.
+
+    """
+    with pd.HDFStore(str(path), mode='r') as store:
+        state = json.loads(store.get(STATE_KEY).iloc[0])
+        version = get_vivarium_version()
+        if state['vivarium_version'] != version:
+            raise ValueError(f'Checkpoint {str(path)} was written by vivarium {state["vivarium_version"]} '
+                             f'and cannot be read by vivarium {version}. Remove it to start the run over.')
+        population = store.get(POPULATION_KEY)
+        checkpoint_state = decode_state(state['state'], lambda i: store.get(FRAME_KEY.format(i)))
+    set_checkpoint_state(sim, population, checkpoint_state)
+
+
+def encode_state(value: Any, frames: List[PandasObject]) -> Any:
+    """Converts checkpoint state to JSON, moving pandas objects to ``frames``.
+
+    Every value is tagged with its type so :func:`decode_state` can rebuild
+    it exactly.  Pandas objects are replaced by their position in ``frames``.
+
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        frames.append(value)
+        return {'frame': len(frames) - 1}
+    if isinstance(value, pd.Index):
+        frames.append(pd.Series(np.arange(len(value)), index=value))
+        return {'index': len(frames) - 1}
+    if isinstance(value, dict):
+        if not all(isinstance(key, str) for key in value):
+            raise TypeError('Checkpoint state can only hold mappings with string keys.')
+        kind = 'counter' if isinstance(value, Counter) else 'dict'
+        return {kind: {key: encode_state(item, frames) for key, item in value.items()}}
+    if isinstance(value, (list, tuple)):
+        return {'list': [encode_state(item, frames) for item in value]}
+    if isinstance(value, pd.Timestamp):
+        return {'timestamp': value.isoformat()}
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return {'value': value}
+    raise TypeError(f'Checkpoint state cannot hold a {type(value).__name__}.')
+
+
+def decode_state(value: Dict[str, Any], get_frame: Callable[[int], PandasObject]) -> Any:
+    """Rebuilds checkpoint state written by :func:`encode_state`."""
+    (kind, content), = value.items()
+    if kind == 'frame':
+        return get_frame(content)
+    if kind == 'index':
+        return get_frame(content).index
+    if kind == 'counter':
+        return Counter({key: decode_state(item, get_frame) for key, item in content.items()})
+    if kind == 'dict':
+        return {key: decode_state(item, get_frame) for key, item in content.items()}
+    if kind == 'list':
+        return [decode_state(item, get_frame) for item in content]
+    if kind == 'timestamp':
+        return pd.Timestamp(content)
+    return content
@@ -23,10 +23,14 @@ from vivarium.framework.utilities import handle_exceptions
 
 from vivarium_csu_swissre_colorectal_cancer import paths
 from vivarium_csu_swissre_colorectal_cancer.constants import metadata
-from vivarium_csu_swissre_colorectal_cancer.tools import (build_artifacts,
+from vivarium_csu_swissre_colorectal_cancer.tools import (benchmark_storage,
+                                                 build_artifacts,
                                                  build_model_specifications,
                                                  build_results,
-                                                 configure_logging_to_terminal)
+                                                 build_synthetic_artifact,
+                                                 configure_logging_to_terminal,
+                                                 run_sweep)
+from vivarium_csu_swissre_colorectal_cancer.tools import make_synthetic_artifact as synthetic
 
 
 @click.command()
@@ -69,7 +73,7 @@ def make_specs(template: str, location: str, output_dir: str, verbose: int, with
               show_default=True,
               type=click.Choice(metadata.LOCATIONS + ['all']),
               help=('Location for which to make an artifact. Note: prefer building archives on the cluster.\n'
-                    'If you specify location "all" you must be on a cluster node.'))
+                    'If you specify location "all" you must be on a cluster node or build with several workers.'))
 @click.option('-o', '--output-dir',
               default=str(paths.ARTIFACT_ROOT),
               show_default=True,
@@ -78,16 +82,36 @@ def make_specs(template: str, location: str, output_dir: str, verbose: int, with
 @click.option('-a', '--append',
               is_flag=True,
               help='Append to the artifact instead of overwriting.')
+@click.option('--offline',
+              is_flag=True,
+              help=f'Read GBD reference data only from {str(paths.REFERENCE_DATA_DIR)} '
+                   f'instead of querying the databases.')
+@click.option('--incremental',
+              is_flag=True,
+              help='Keep existing artifacts and rebuild only the keys whose sources, '
+                   'loaders or parameters have changed.')
+@click.option('--storage-profile',
+              default=metadata.DEFAULT_ARTIFACT_STORAGE_PROFILE,
+              show_default=True,
+              type=click.Choice(list(metadata.ARTIFACT_STORAGE_PROFILES)),
+              help='Format and compression to write per-draw data with.')
+@click.option('-w', '--workers',
+              default=1,
+              show_default=True,
+              type=click.IntRange(min=1),
+              help='Number of local processes to build with when not on the cluster. '
+                   'With more than one, locations and key groups are built in parallel.')
 @click.option('-v', 'verbose',
               count=True,
               help='Configure logging verbosity.')
 @click.option('--pdb', 'with_debugger',
               is_flag=True,
               help='Drop into python debugger if an error occurs.')
-def make_artifacts(location: str, output_dir: str, append: bool, verbose: int, with_debugger: bool) -> None:
+def make_artifacts(location: str, output_dir: str, append: bool, offline: bool, incremental: bool,
+                   storage_profile: str, workers: int, verbose: int, with_debugger: bool) -> None:
     configure_logging_to_terminal(verbose)
     main = handle_exceptions(build_artifacts, logger, with_debugger=with_debugger)
-    main(location, output_dir, append, verbose)
+    main(location, output_dir, append, verbose, offline, workers, incremental, storage_profile)
 
 
 @click.command()
@@ -102,7 +126,140 @@ def make_artifacts(location: str, output_dir: str, append: bool, verbose: int, w
               default=False,
               is_flag=True,
               help='Results are from a single, non-parallel run.')
-def make_results(output_file: str, verbose: int, with_debugger: bool, single_run: bool) -> None:
+@click.option('-i', '--incremental',
+              is_flag=True,
+              help='Reuse seed sums from earlier runs and only aggregate newly completed rows. '
+                   'Only rows added since the last run are read from table-format output.')
+@click.option('-p', '--partition',
+              is_flag=True,
+              help='Also write a results dataset partitioned by measure and scenario for fast queries.')
+def make_results(output_file: str, verbose: int, with_debugger: bool, single_run: bool,
+                 incremental: bool, partition: bool) -> None:
     configure_logging_to_terminal(verbose)
     main = handle_exceptions(build_results, logger, with_debugger=with_debugger)
-    main(output_file, single_run)
+    main(output_file, single_run, incremental, partition)
+
+
+@click.command()
+@click.argument('output_path', type=click.Path(dir_okay=False))
+@click.option('-l', '--location',
+              default=metadata.LOCATIONS[0],
+              show_default=True,
+              type=click.Choice(metadata.LOCATIONS),
+              help='Location the synthetic artifact represents.')
+@click.option('-d', '--draws',
+              default=synthetic.SYNTHETIC_DRAWS,
+              show_default=True,
+              type=click.IntRange(min=1),
+              help='Number of draws of draw-level data.')
+@click.option('--year-start',
+              default=synthetic.SYNTHETIC_YEAR_START,
+              show_default=True,
+              help='First year with data.')
+@click.option('--year-end',
+              default=synthetic.SYNTHETIC_YEAR_END,
+              show_default=True,
+              help='Year after the last year with data.')
+@click.option('--seed',
+              default=synthetic.SYNTHETIC_SEED,
+              show_default=True,
+              help='Seed for the draw-level variation.')
+@click.option('-v', 'verbose',
+              count=True,
+              help='Configure logging verbosity.')
+@click.option('--pdb', 'with_debugger',
+              is_flag=True,
+              help='Drop into python debugger if an error occurs.')
+def make_synthetic_artifact(output_path: str, location: str, draws: int, year_start: int, year_end: int,
+                            seed: int, verbose: int, with_debugger: bool) -> None:
+    """Write an artifact of synthetic data to OUTPUT_PATH.
+
+    The artifact has every project key with realistic shapes and value
+    ranges, for testing and benchmarking without access to the raw
+    forecasts or the GBD databases.
+    """
+    configure_logging_to_terminal(verbose)
+    main = handle_exceptions(build_synthetic_artifact, logger, with_debugger=with_debugger)
+    main(output_path, location, draws, year_start, year_end, seed)
+
+
+@click.command()
+@click.argument('artifact_path', type=click.Path(exists=True, dir_okay=False))
+@click.option('-o', '--output-dir',
+              required=True,
+              type=click.Path(file_okay=False),
+              help='Directory to write the benchmark artifacts and results to. '
+                   'Put it on the filesystem simulations read from.')
+@click.option('-p', '--storage-profile', 'storage_profiles',
+              multiple=True,
+              type=click.Choice(list(metadata.ARTIFACT_STORAGE_PROFILES)),
+              help='Storage profile to benchmark. May be given several times. Defaults to all profiles.')
+@click.option('-r', '--repeats',
+              default=3,
+              show_default=True,
+              type=click.IntRange(min=1),
+              help='Number of times each read is timed.')
+@click.option('-v', 'verbose',
+              count=True,
+              help='Configure logging verbosity.')
+@click.option('--pdb', 'with_debugger',
+              is_flag=True,
+              help='Drop into python debugger if an error occurs.')
+def benchmark_artifact_storage(artifact_path: str, output_dir: str, storage_profiles: tuple, repeats: int,
+                               verbose: int, with_debugger: bool) -> None:
+    """Benchmark artifact storage profiles against the artifact at ARTIFACT_PATH.
+
+    Reports the write time, file size and cold and warm read time of each
+    profile, ordered by cold read time.
+    """
+    configure_logging_to_terminal(verbose)
+    main = handle_exceptions(benchmark_storage, logger, with_debugger=with_debugger)
+    main(artifact_path, output_dir, list(storage_profiles), repeats)
+
+
+@click.command()
+@click.argument('model_specification', type=click.Path(exists=True, dir_okay=False))
+@click.argument('branches_file', type=click.Path(exists=True, dir_okay=False))
+@click.option('-o', '--result-directory',
+              required=True,
+              type=click.Path(file_okay=False),
+              help='Directory to write output.hdf and keyspace.yaml to. '
+                   'Rerun with the same directory to resume an interrupted sweep.')
+@click.option('-w', '--workers',
+              default=1,
+              show_default=True,
+              type=click.IntRange(min=1),
+              help='Number of simulations to run at once.')
+@click.option('-s', '--seeds-per-batch',
+              default=metadata.RUN_SWEEP_SEEDS_PER_BATCH,
+              show_default=True,
+              type=click.IntRange(min=1),
+              help='Number of random seeds of one draw and branch each worker runs in sequence, '
+                   'reusing the loaded input data.')
+@click.option('--fork-scenarios',
+              is_flag=True,
+              help='Run the period before the screening scale-up once per draw and seed '
+                   'and fork it into each scenario.')
+@click.option('-c', '--checkpoint-interval',
+              default=metadata.RUN_SWEEP_CHECKPOINT_INTERVAL,
+              show_default=True,
+              type=float,
+              help='Seconds between checkpoints of each running simulation. 0 disables checkpoints.')
+@click.option('-v', 'verbose',
+              count=True,
+              help='Configure logging verbosity.')
+@click.option('--pdb', 'with_debugger',
+              is_flag=True,
+              help='Drop into python debugger if an error occurs.')
+def run_sweep_locally(model_specification: str, branches_file: str, result_directory: str, workers: int,
+                      seeds_per_batch: int, fork_scenarios: bool, checkpoint_interval: float,
+                      verbose: int, with_debugger: bool) -> None:
+    """Run every job of BRANCHES_FILE for MODEL_SPECIFICATION on this machine.
+
+    Results are written in the layout psimulate uses, so make_results can
+    process them.
+    """
+    configure_logging_to_terminal(verbose)
+    main = handle_exceptions(run_sweep, logger, with_debugger=with_debugger)
+    main(model_specification, branches_file, result_directory, workers, seeds_per_batch, fork_scenarios,
+         checkpoint_interval)
@@ -6,18 +6,20 @@
    Use your best judgement.
 
 """
+from concurrent.futures import Future, ProcessPoolExecutor
 import shutil
 import sys
 import time
 import click
 
 from pathlib import Path
-from typing import Union
+from typing import Dict, List, Union
 from loguru import logger
 
 import vivarium_cluster_tools as vct
 
 from vivarium_csu_swissre_colorectal_cancer.constants import data_keys, metadata
+from vivarium_csu_swissre_colorectal_cancer.data.graph import KeyProfile
 from vivarium_csu_swissre_colorectal_cancer.utilities import sanitize_location, delete_if_exists, len_longest_location
 from vivarium_csu_swissre_colorectal_cancer.tools.app_logging import add_logging_sink, decode_status
 
@@ -48,12 +50,16 @@ def check_for_existing(output_dir: Path, location: str, append: bool):
             path.unlink()
 
 
-def build_single(location: str, output_dir: str, append: bool):
+def build_single(location: str, output_dir: str, append: bool, offline: bool = False, incremental: bool = False,
+                 storage_profile: str = metadata.DEFAULT_ARTIFACT_STORAGE_PROFILE):
     path = Path(output_dir) / f'{sanitize_location(location)}.hdf'
-    build_single_location_artifact(path, location)
+    build_single_location_artifact(path, location, offline=offline, incremental=incremental,
+                                   storage_profile=storage_profile)
 
 
-def build_artifacts(location: str, output_dir: str, append: bool, verbose: int):
+def build_artifacts(location: str, output_dir: str, append: bool, verbose: int, offline: bool = False,
+                    workers: int = 1, incremental: bool = False,
+                    storage_profile: str = metadata.DEFAULT_ARTIFACT_STORAGE_PROFILE):
     """Main application function for building artifacts.
     Parameters
     ----------
@@ -70,28 +76,48 @@ def build_artifacts(location: str, output_dir: str, append: bool, verbose: int):
         directory.  Has no effect if artifacts are not found.
     verbose
         How noisy the logger should be.
+    offline
+        Whether to read GBD reference data only from the local reference
+        data directory instead of querying the databases.
+    workers
+        Number of local processes to build with when not on the cluster.
+        With more than one, locations and key groups are built in parallel.
+    incremental
+        Whether to keep existing artifacts and rebuild only the keys whose
+        content hash has changed since they were built.
+    storage_profile
+        Name of the storage profile in
+        :data:`metadata.ARTIFACT_STORAGE_PROFILES` to write per-draw data with.
     """
     output_dir = Path(output_dir)
     vct.mkdir(output_dir, parents=True, exists_ok=True)
 
-    check_for_existing(output_dir, location, append)
+    check_for_existing(output_dir, location, append or incremental)
 
     if location in metadata.LOCATIONS:
-        build_single(location, output_dir, append)
+        if workers > 1:
+            build_artifacts_locally([location], output_dir, workers, verbose, offline, incremental, storage_profile)
+        else:
+            build_single(location, output_dir, append, offline, incremental, storage_profile)
     elif location == 'all':
         if running_from_cluster():
             # parallel build when on cluster
-            build_all_artifacts(output_dir, verbose)
+            build_all_artifacts(output_dir, verbose, offline, incremental, storage_profile)
+        elif workers > 1:
+            # parallel build on this machine
+            build_artifacts_locally(metadata.LOCATIONS, output_dir, workers, verbose, offline, incremental,
+                                    storage_profile)
         else:
             # serial build when not on cluster
             for loc in metadata.LOCATIONS:
-                build_single(loc, output_dir, append)
+                build_single(loc, output_dir, append, offline, incremental, storage_profile)
     else:
         raise ValueError(f'Location must be one of {metadata.LOCATIONS} or the string "all". '
                          f'You specified {location}.')
 
 
-def build_all_artifacts(output_dir: Path, verbose: int):
+def build_all_artifacts(output_dir: Path, verbose: int, offline: bool = False, incremental: bool = False,
+                        storage_profile: str = metadata.DEFAULT_ARTIFACT_STORAGE_PROFILE):
     """Builds artifacts for all locations in parallel.
     Parameters
     ----------
@@ -99,6 +125,13 @@ def build_all_artifacts(output_dir: Path, verbose: int):
         The directory where the artifacts will be built.
     verbose
         How noisy the logger should be.
+    offline
+        Whether to read GBD reference data only from the local reference
+        data directory.
+    incremental
+        Whether to rebuild only the keys whose content hash has changed.
+    storage_profile
+        Name of the storage profile to write per-draw data with.
     Note
     ----
         This function should not be called directly.  It is intended to be
@@ -115,7 +148,10 @@ def build_all_artifacts(output_dir: Path, verbose: int):
 
             job_template = session.createJobTemplate()
             job_template.remoteCommand = shutil.which("python")
-            job_template.args = [__file__, str(path), f'"{location}"']
+            job_template.args = ([__file__, str(path), f'"{location}"']
+                                 + (['--offline'] if offline else [])
+                                 + (['--incremental'] if incremental else [])
+                                 + [f'--storage-profile={storage_profile}'])
             job_template.nativeSpecification = (f'-V '  # Export all environment variables
                                                 f'-b y '  # Command is a binary (python)
                                                 f'-P {metadata.CLUSTER_PROJECT} '  
@@ -147,7 +183,130 @@ def build_all_artifacts(output_dir: Path, verbose: int):
     logger.info('**Done**')
 
 
-def build_single_location_artifact(path: Union[str, Path], location: str, log_to_file: bool = False):
+def build_artifacts_locally(locations: List[str], output_dir: Path, workers: int, verbose: int,
+                            offline: bool = False, incremental: bool = False,
+                            storage_profile: str = metadata.DEFAULT_ARTIFACT_STORAGE_PROFILE):
+    """Builds artifacts in parallel on a local process pool.
+
+    Every (location, key group) pair is built by its own worker into its own
+    partial artifact.  Once all workers are done, the partial artifacts are
+    merged into the final artifact for each location by this process alone.
+
+    Parameters
+    ----------
+    locations
+        The locations to build artifacts for.
+    output_dir
+        The directory where the artifacts will be built.
+    workers
+        The number of worker processes.
+    verbose
+        How noisy the logger should be.
+    offline
+        Whether to read GBD reference data only from the local reference
+        data directory.
+    incremental
+        Whether to rebuild only the keys whose content hash has changed.
+    storage_profile
+        Name of the storage profile to write per-draw data with.
+    Note
+    ----
+        This function should not be called directly.  It is intended to be
+        called by the :func:`build_artifacts` function located in the same
+        module.
+    """
+    # Local import to avoid data dependencies
+    from vivarium_csu_swissre_colorectal_cancer.data import builder
+
+    partial_dir = output_dir / 'partial'
+    vct.mkdir(partial_dir, exists_ok=True)
+
+    jobs: Dict[str, Dict[Path, Future]] = {location: {} for location in locations}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for location in locations:
+            artifact = builder.open_artifact(output_dir / f'{sanitize_location(location)}.hdf', location)
+            if incremental:
+                keys = [key for key_group in data_keys.MAKE_ARTIFACT_KEY_GROUPS for key in key_group]
+                builder.remove_stale_data(artifact, keys, location)
+            for key_group in data_keys.MAKE_ARTIFACT_KEY_GROUPS:
+                keys = [key for key in key_group if key not in artifact]
+                if not keys:
+                    continue
+                path = partial_dir / f'{sanitize_location(location)}_{key_group.name}.hdf'
+                delete_if_exists(path)
+                jobs[location][path] = executor.submit(build_key_group_artifact, str(path), location,
+                                                       key_group.name, keys, offline, storage_profile)
+            logger.info(f'Submitted {len(jobs[location])} local jobs to build artifact for {location}.')
+
+        if verbose:
+            logger.info('Entering monitoring loop.')
+            logger.info('-------------------------')
+            logger.info('')
+
+        while not all(future.done() for location_jobs in jobs.values() for future in location_jobs.values()):
+            if verbose:
+                for location, location_jobs in jobs.items():
+                    logger.info(f'{location:<35}: {get_local_status(location_jobs.values()):>15}')
+                logger.info('')
+            time.sleep(metadata.MAKE_ARTIFACT_SLEEP)
+            if verbose:
+                logger.info('Checking status again')
+                logger.info('---------------------')
+                logger.info('')
+
+    for location, location_jobs in jobs.items():
+        status = get_local_status(location_jobs.values())
+        logger.info(f'{location:<35}: {status:>15}')
+        if status == 'failed':
+            errors = [future.exception() for future in location_jobs.values() if future.exception()]
+            logger.error(f'Failed to build artifact for {location}: {errors}')
+            continue
+        path = output_dir / f'{sanitize_location(location)}.hdf'
+        artifact = builder.open_artifact(path, location)
+        for partial_path in location_jobs:
+            logger.info(f'Merging {partial_path.name} into {path.name}.')
+            builder.merge_artifact(artifact, partial_path, storage_profile)
+            partial_path.unlink()
+
+    logger.info('**Done**')
+
+
+def get_local_status(futures: List[Future]) -> str:
+    """Summarizes the state of a location's local jobs using the DRMAA status names."""
+    futures = list(futures)
+    if any(future.done() and future.exception() for future in futures):
+        return 'failed'
+    elif all(future.done() for future in futures):
+        return 'finished'
+    elif any(future.running() or future.done() for future in futures):
+        return 'running'
+    return 'queued_active'
+
+
+def build_key_group_artifact(path: str, location: str, key_group_name: str, keys: List[str],
+                             offline: bool = False,
+                             storage_profile: str = metadata.DEFAULT_ARTIFACT_STORAGE_PROFILE):
+    """Builds a partial artifact holding keys from one key group for a single location.
+
+    Note
+    ----
+        This function should not be called directly.  It is intended to be
+        run in a worker process by :func:`build_artifacts_locally`.
+    """
+    # Local import to avoid data dependencies
+    from vivarium_csu_swissre_colorectal_cancer.data import builder, cache
+    cache.configure_reference_data(offline=offline)
+
+    key_group = {group.name: group for group in data_keys.MAKE_ARTIFACT_KEY_GROUPS}[key_group_name]
+    artifact = builder.open_artifact(Path(path), location)
+    logger.info(f'Loading and writing {key_group.log_name} data for {location}')
+    profile = builder.build_and_write_data(artifact, keys, location, storage_profile=storage_profile)
+    log_build_profile(profile)
+
+
+def build_single_location_artifact(path: Union[str, Path], location: str, log_to_file: bool = False,
+                                   offline: bool = False, incremental: bool = False,
+                                   storage_profile: str = metadata.DEFAULT_ARTIFACT_STORAGE_PROFILE):
     """Builds an artifact for a single location.
     Parameters
     ----------
@@ -158,6 +317,13 @@ def build_single_location_artifact(path: Union[str, Path], location: str, log_to
         specified in the project globals.
     log_to_file
         Whether we should write the application logs to a file.
+    offline
+        Whether to read GBD reference data only from the local reference
+        data directory.
+    incremental
+        Whether to rebuild only the keys whose content hash has changed.
+    storage_profile
+        Name of the storage profile to write per-draw data with.
     Note
     ----
         This function should not be called directly.  It is intended to be
@@ -173,20 +339,37 @@ def build_single_location_artifact(path: Union[str, Path], location: str, log_to
         add_logging_sink(log_file, verbose=2)
 
     # Local import to avoid data dependencies
-    from vivarium_csu_swissre_colorectal_cancer.data import builder
+    from vivarium_csu_swissre_colorectal_cancer.data import builder, cache
+    cache.configure_reference_data(offline=offline)
 
     logger.info(f'Building artifact for {location} at {str(path)}.')
     artifact = builder.open_artifact(path, location)
 
-    for key_group in data_keys.MAKE_ARTIFACT_KEY_GROUPS:
-        logger.info(f'Loading and writing {key_group.log_name} data')
-        for key in key_group:
-            builder.load_and_write_data(artifact, key, location)
+    logger.info(f'Loading and writing {", ".join(group.log_name for group in data_keys.MAKE_ARTIFACT_KEY_GROUPS)} data')
+    keys = [key for key_group in data_keys.MAKE_ARTIFACT_KEY_GROUPS for key in key_group]
+    profile = builder.build_and_write_data(artifact, keys, location, incremental=incremental,
+                                           storage_profile=storage_profile)
+    log_build_profile(profile)
 
     logger.info(f'**Done building -- {location}**')
 
 
+def log_build_profile(profile: Dict[str, KeyProfile]):
+    """Logs the build time of each key and the change in memory use while it was built."""
+    if not profile:
+        return
+    width = max(len(key) for key in profile)
+    logger.info(f'{"key":<{width}}  {"seconds":>10}  {"RSS +MB":>10}')
+    for key, key_profile in profile.items():
+        logger.info(f'{key:<{width}}  {key_profile.seconds:>10.1f}  {key_profile.rss_delta_mb:>10.1f}')
+
+
 if __name__ == "__main__":
     artifact_path = sys.argv[1]
     artifact_location = sys.argv[2]
-    build_single_location_artifact(artifact_path, artifact_location, log_to_file=True)
+    build_single_location_artifact(artifact_path, artifact_location, log_to_file=True,
+                                   offline='--offline' in sys.argv[3:],
+                                   incremental='--incremental' in sys.argv[3:],
+                                   storage_profile=next((arg.split('=', 1)[1] for arg in sys.argv[3:]
+                                                         if arg.startswith('--storage-profile=')),
+                                                        metadata.DEFAULT_ARTIFACT_STORAGE_PROFILE))
@@ -2,27 +2,112 @@ from pathlib import Path
 import shutil
 
 from loguru import logger
+import pandas as pd
 
-from vivarium_csu_swissre_colorectal_cancer.results_processing import process_results
+from vivarium_csu_swissre_colorectal_cancer.constants import results
+from vivarium_csu_swissre_colorectal_cancer.results_processing import process_results, results_dataset
 
+AGGREGATE_CACHE_FILE = 'aggregate_cache.hdf'
 
-def build_results(output_file: str, single_run: bool):
+def build_results(output_file: str, single_run: bool, incremental: bool = False, partition: bool = False):
     output_file = Path(output_file)
     measure_dir = output_file.parent / 'count_data'
-    if measure_dir.exists():
-        shutil.rmtree(measure_dir)
-    measure_dir.mkdir(exist_ok=True, mode=0o775)
-
-    logger.info(f'Reading in output data from {str(output_file)}.')
-    data, keyspace = process_results.read_data(output_file, single_run)
-    logger.info(f'Filtering incomplete data from outputs.')
-    rows = len(data)
-    data = process_results.filter_out_incomplete(data, keyspace)
-    new_rows = len(data)
-    logger.info(f'Filtered {rows - new_rows} from data due to incomplete information.  {new_rows} remaining.')
-    data = process_results.aggregate_over_seed(data)
+    summary_dir = output_file.parent / 'summary_data'
+    rollup_dir = output_file.parent / 'rollup_data'
+    averted_dir = output_file.parent / 'averted_data'
+    dataset_dir = output_file.parent / 'results_dataset'
+
+    if incremental:
+        data = aggregate_incrementally(output_file, single_run)
+        if data.empty:
+            logger.info('No (draw, seed) pair has completed for every scenario yet. Nothing to write.')
+            return
+        pairing_columns = [results.INPUT_DRAW_COLUMN]
+    else:
+        logger.info(f'Reading in output data from {str(output_file)}.')
+        data, keyspace = process_results.read_data(output_file, single_run)
+        logger.info(f'Filtering incomplete data from outputs.')
+        rows = len(data)
+        data = process_results.filter_out_incomplete(data, keyspace)
+        new_rows = len(data)
+        logger.info(f'Filtered {rows - new_rows} from data due to incomplete information.  {new_rows} remaining.')
+        pairing_columns = [results.INPUT_DRAW_COLUMN, results.RANDOM_SEED_COLUMN]
+        if results.REPLICATE_COLUMN in data.columns:
+            # Replicates of a run are paired with the same replicate in the other scenarios.
+            pairing_columns.append(results.REPLICATE_COLUMN)
+
+    for output_dir in [measure_dir, summary_dir, rollup_dir, averted_dir, dataset_dir]:
+        if output_dir.exists():
+            shutil.rmtree(output_dir)
+        output_dir.mkdir(exist_ok=True, mode=0o775)
+
+    if data[process_results.SCENARIO_COLUMN].nunique() > 1:
+        logger.info(f'Computing outcomes averted relative to baseline.')
+        differences, ratios = process_results.get_scenario_differences(data, pairing_columns)
+        write_averted_data(averted_dir, differences, ratios)
+
+    if not incremental:
+        data = process_results.aggregate_over_seed(data)
     logger.info(f'Computing raw count and proportion data.')
     measure_data = process_results.make_measure_data(data)
     logger.info(f'Writing raw count and proportion data to {str(measure_dir)}')
     measure_data.dump(measure_dir)
+    logger.info(f'Computing rollups over year, sex, age and cause.')
+    rollup_data = process_results.make_rollup_data(measure_data)
+    logger.info(f'Writing rollup data to {str(rollup_dir)}')
+    rollup_data.dump(rollup_dir)
+    if partition:
+        logger.info(f'Writing partitioned results dataset to {str(dataset_dir)}')
+        results_dataset.write_partitioned(measure_data, dataset_dir)
+        results_dataset.write_partitioned(rollup_data, dataset_dir, key=results_dataset.ROLLUP_KEY)
+    logger.info(f'Summarizing count and rate data across draws.')
+    summary_data = process_results.summarize_measure_data(measure_data)
+    logger.info(f'Writing summary data to {str(summary_dir)}')
+    summary_data.dump(summary_dir)
     logger.info('**DONE**')
+
+
+def aggregate_incrementally(output_file: Path, single_run: bool) -> pd.DataFrame:
+    """Folds output rows written since the last run into the cached seed sums."""
+    cache_path = output_file.parent / AGGREGATE_CACHE_FILE
+    logger.info(f'Reading cached seed sums from {str(cache_path)}.')
+    cache = process_results.read_aggregate_cache(cache_path)
+    logger.info(f'Reading output data after row {cache.rows_read} from {str(output_file)}.')
+    new_data, keyspace, rows = process_results.read_new_data(output_file, single_run, cache.rows_read)
+    if cache.rows_read and (cache.keyspace != keyspace or rows < cache.rows_read):
+        # The output directory was reused for a new sweep, or the output was rewritten.
+        logger.info('Cached seed sums do not match the output. Reading the output in full.')
+        cache = process_results.get_empty_aggregate_cache()
+        new_data, keyspace, rows = process_results.read_new_data(output_file, single_run, 0)
+    logger.info(f'{len(cache.folded)} (draw, seed) pairs already aggregated. '
+                f'{rows - cache.rows_read} new output rows.')
+
+    data = pd.concat([cache.pending, new_data], ignore_index=True, sort=False)
+    data = process_results.drop_folded_seeds(data, cache.folded)
+    complete = process_results.filter_out_incomplete(data, keyspace)
+    complete_seeds = complete[[results.INPUT_DRAW_COLUMN, results.RANDOM_SEED_COLUMN]].drop_duplicates()
+    pending = process_results.drop_folded_seeds(data, complete_seeds)
+    logger.info(f'Folding {len(complete)} newly completed rows into cached sums. '
+                f'{len(pending)} rows are still incomplete.')
+
+    seed_sums, folded = cache.seed_sums, cache.folded
+    if not complete.empty:
+        seed_sums, folded = process_results.fold_into_aggregate(seed_sums, complete, folded)
+    if rows != cache.rows_read:
+        process_results.write_aggregate_cache(
+            cache_path, process_results.AggregateCache(seed_sums, folded, pending, keyspace, rows)
+        )
+    if seed_sums is None:
+        return pd.DataFrame()
+    return seed_sums
+
+
+def write_averted_data(averted_dir: Path, differences, ratios):
+    for name, data in [('difference', differences), ('ratio', ratios)]:
+        measure_data = process_results.make_measure_data(data)
+        summary_data = process_results.summarize_measure_data(measure_data, with_rates=False)
+        for output_dir, output_data in [(averted_dir / name, measure_data),
+                                        (averted_dir / f'{name}_summary', summary_data)]:
+            output_dir.mkdir(mode=0o775)
+            logger.info(f'Writing {name} data to {str(output_dir)}')
+            output_data.dump(output_dir)
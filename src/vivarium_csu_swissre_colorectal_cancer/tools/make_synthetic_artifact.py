@@ -0,0 +1,175 @@
+"""Synthetic artifacts for testing and benchmarking.
+
+Builds an artifact holding every key in
+:data:`data_keys.MAKE_ARTIFACT_KEY_GROUPS` from simple parametric curves
+instead of the raw forecast files and GBD databases, so simulations can be
+run anywhere.  Keys have the same index, draw columns and storage layout as
+a real artifact and values in realistic ranges.  The numbers themselves
+mean nothing.
+
+.. admonition::
+
+   Logging in this module should typically be done at the ``info`` level.
+   Use your best judgement.
+
+"""
+from pathlib import Path
+from typing import Union
+
+from loguru import logger
+import numpy as np
+import pandas as pd
+from vivarium.framework.artifact import Artifact, get_location_term
+
+from vivarium_csu_swissre_colorectal_cancer import utilities
+from vivarium_csu_swissre_colorectal_cancer.constants import data_keys, metadata
+
+SYNTHETIC_DRAWS = 10
+# The incidence age shift in the disease model looks up every year from 1990 through 2040.
+SYNTHETIC_YEAR_START = 1990
+SYNTHETIC_YEAR_END = 2041
+SYNTHETIC_SEED = 12345
+
+AGE_GROUP_STARTS = list(range(15, 95, 5))
+OLDEST_AGE_GROUP = (95, 125)
+
+# Rates per person-year are exp(intercept + age_slope * age) * (1 + year_slope) ** (year - 2020)
+RATE_CURVES = {
+    data_keys.POPULATION.ACMR: (-9.5, 0.085, -0.01),
+    data_keys.COLORECTAL_CANCER.RAW_INCIDENCE_RATE: (-11.0, 0.075, 0.01),
+    data_keys.COLORECTAL_CANCER.CSMR: (-12.0, 0.075, -0.005),
+}
+PREVALENCE_TO_INCIDENCE = 4.0
+DISABILITY_WEIGHT_RANGE = (0.05, 0.3)
+DRAW_SPREAD = 0.1
+
+
+def build_synthetic_artifact(output_path: Union[str, Path], location: str = metadata.LOCATIONS[0],
+                             draws: int = SYNTHETIC_DRAWS, year_start: int = SYNTHETIC_YEAR_START,
+                             year_end: int = SYNTHETIC_YEAR_END, seed: int = SYNTHETIC_SEED) -> Path:
+    """Writes a synthetic artifact with every project key.
+
+    Parameters
+    ----------
+    output_path
+        Path of the artifact to write.  An existing file is replaced.
+    location
+        Location the artifact represents.
+    draws
+        Number of draw columns for draw-level data.
+    year_start
+        First year with data.
+    year_end
+        Year after the last year with data.
+    seed
+        Seed for the draw-level variation, so builds are reproducible.
+
+    Returns
+    -------
+        The path to the artifact.
+
+    """
+    output_path = Path(output_path)
+    if output_path.exists():
+        output_path.unlink()
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    logger.info(f'Building synthetic artifact for {location} with {draws} draws '
+                f'and years {year_start} to {year_end - 1} at {str(output_path)}.')
+    random_state = np.random.RandomState(seed)
+    index = get_demographic_index(location, year_start, year_end)
+    data = {
+        data_keys.POPULATION.STRUCTURE: get_population_structure(index),
+        data_keys.POPULATION.AGE_BINS: get_age_bins(),
+        data_keys.POPULATION.DEMOGRAPHY: get_demographic_dimensions(location, year_start),
+        data_keys.POPULATION.TMRLE: get_theoretical_minimum_risk_life_expectancy(),
+        data_keys.COLORECTAL_CANCER.DISABILITY_WEIGHT: get_draws(
+            index, random_state.uniform(*DISABILITY_WEIGHT_RANGE, size=(1, draws)), draws
+        ),
+        data_keys.COLORECTAL_CANCER.RESTRICTIONS: get_restrictions(),
+    }
+    for key, curve in RATE_CURVES.items():
+        data[key] = get_draws(index, get_rate_curve(index, *curve) * get_draw_noise(random_state, draws), draws)
+    data[data_keys.COLORECTAL_CANCER.RAW_PREVALENCE] = (data[data_keys.COLORECTAL_CANCER.RAW_INCIDENCE_RATE]
+                                                         * PREVALENCE_TO_INCIDENCE)
+
+    artifact = Artifact(output_path, filter_terms=[get_location_term(location)])
+    artifact.write(data_keys.METADATA_LOCATIONS, [location])
+    for key_group in data_keys.MAKE_ARTIFACT_KEY_GROUPS:
+        for key in key_group:
+            if key in data_keys.BY_DRAW_KEYS:
+                utilities.write_data_by_draw(artifact, key, data[key])
+            else:
+                artifact.write(key, data[key])
+    logger.info('**Done**')
+    return output_path
+
+
+def get_demographic_index(location: str, year_start: int, year_end: int) -> pd.MultiIndex:
+    age_bins = [(float(start), float(start + 5)) for start in AGE_GROUP_STARTS] + [tuple(map(float, OLDEST_AGE_GROUP))]
+    rows = [(location, sex, age_start, age_end, year, year + 1)
+            for sex in ['Female', 'Male']
+            for age_start, age_end in age_bins
+            for year in range(year_start, year_end)]
+    return pd.MultiIndex.from_tuples(rows, names=metadata.ARTIFACT_INDEX_COLUMNS)
+
+
+def get_rate_curve(index: pd.MultiIndex, intercept: float, age_slope: float, year_slope: float) -> np.ndarray:
+    ages = index.get_level_values('age_start').to_numpy()
+    years = index.get_level_values('year_start').to_numpy()
+    rates = np.exp(intercept + age_slope * ages) * (1 + year_slope) ** (years - 2020)
+    return rates[:, np.newaxis]
+
+
+def get_draw_noise(random_state: np.random.RandomState, draws: int) -> np.ndarray:
+    return random_state.lognormal(0, DRAW_SPREAD, size=(1, draws))
+
+
+def get_draws(index: pd.MultiIndex, values: np.ndarray, draws: int) -> pd.DataFrame:
+    values = np.broadcast_to(values, (len(index), draws)).copy()
+    return pd.DataFrame(values, index=index, columns=[f'draw_{draw}' for draw in range(draws)])
+
+
+def get_population_structure(index: pd.MultiIndex) -> pd.DataFrame:
+    ages = index.get_level_values('age_start').to_numpy()
+    # Fewer people in each older age group
+    return pd.DataFrame({'value': 1_000_000 * np.exp(-0.03 * (ages - 15))}, index=index)
+
+
+def get_age_bins() -> pd.DataFrame:
+    age_bins = pd.DataFrame({
+        'age_start': [float(start) for start in AGE_GROUP_STARTS] + [float(OLDEST_AGE_GROUP[0])],
+        'age_end': [float(start + 5) for start in AGE_GROUP_STARTS] + [float(OLDEST_AGE_GROUP[1])],
+    })
+    age_bins['age_group_name'] = [f'{int(start)} to {int(end) - 1}' for start, end in
+                                  zip(age_bins.age_start, age_bins.age_end)]
+    age_bins.loc[age_bins.index[-1], 'age_group_name'] = f'{OLDEST_AGE_GROUP[0]} plus'
+    return pd.DataFrame(index=pd.MultiIndex.from_frame(age_bins))
+
+
+def get_demographic_dimensions(location: str, year: int) -> pd.DataFrame:
+    rows = [(location, sex, 15, 95, year, year + 1) for sex in ['Male', 'Female']]
+    return pd.DataFrame(rows, columns=metadata.ARTIFACT_INDEX_COLUMNS).set_index(metadata.ARTIFACT_INDEX_COLUMNS)
+
+
+def get_theoretical_minimum_risk_life_expectancy() -> pd.DataFrame:
+    ages = np.arange(0.0, 110.0, 0.01)
+    life_expectancy = pd.DataFrame({
+        'age_start': ages,
+        'age_end': ages + 0.01,
+        'value': np.maximum(88.0 - 0.85 * ages, 1.5),
+    })
+    return life_expectancy.set_index(['age_start', 'age_end'])
+
+
+def get_restrictions() -> dict:
+    return {
+        'male_only': False,
+        'female_only': False,
+        'yll_only': False,
+        'yld_only': False,
+        'yll_age_group_id_start': 8,
+        'yll_age_group_id_end': 235,
+        'yld_age_group_id_start': 8,
+        'yld_age_group_id_end': 235,
+    }
@@ -0,0 +1,424 @@
+"""Runs a branches keyspace on a local process pool.
+
+Expands a branches file into one job per (input draw, random seed, branch)
+and runs the jobs on this machine, writing ``output.hdf`` and
+``keyspace.yaml`` in the layout :func:`build_results` reads.  Pointing a
+sweep at a result directory it has written to before resumes it: the
+keyspace is reused and finished jobs are skipped.
+
+Jobs that share an input draw and branch are handed to workers in batches
+and run one after another in the same process.  Input data that depends only
+on the draw is kept between them (see
+:class:`components.disease.DrawDataCache`), so it is loaded and derived
+once per batch rather than once per random seed.  Each seed still sets up
+its own simulation (lookup tables, components and population), as vivarium
+offers no public way to reseed or repopulate an existing one.
+
+Scenarios only differ once the screening scale-up starts.  With scenario
+forking, a worker runs the shared period once and then forks the process,
+continuing each scenario from a copy-on-write copy of the same simulation
+state.  Paired scenarios then share exactly the same simulants and history
+up to the scale-up.
+
+Running simulations are checkpointed periodically (see :mod:`checkpoint`),
+so a resumed sweep also continues interrupted jobs from their last
+checkpoint instead of starting them over.
+
+While a sweep runs, finished jobs are appended to a working table next to
+the output, so each write only costs as much as the new rows.  The working
+table is moved into place as ``output.hdf`` when the sweep stops.
+
+.. admonition::
+
+   Logging in this module should typically be done at the ``info`` level.
+   Use your best judgement.
+
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import itertools
+import os
+from pathlib import Path
+import pickle
+import shutil
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Union
+
+from loguru import logger
+import numpy as np
+import pandas as pd
+import yaml
+
+from vivarium_csu_swissre_colorectal_cancer.constants import data_values, metadata, results
+from vivarium_csu_swissre_colorectal_cancer.tools import checkpoint
+
+OUTPUT_FILE = 'output.hdf'
+# Finished jobs are appended here while a sweep runs.
+WORKING_OUTPUT_FILE = 'output.partial.hdf'
+OUTPUT_KEY = 'data'
+KEYSPACE_FILE = 'keyspace.yaml'
+BRANCHES_FILE = 'branches.yaml'
+MODEL_SPECIFICATION_FILE = 'model_specification.yaml'
+CHECKPOINT_DIRECTORY = 'checkpoints'
+# Components that read the scenario, switched on each branch of a fork.
+SCENARIO_COMPONENTS = ['screening_algorithm', 'screening_scale_up']
+
+
+class SweepJob(NamedTuple):
+    input_draw: int
+    random_seed: int
+    branch: Dict[str, Any]
+
+    @property
+    def key(self) -> tuple:
+        return (self.input_draw, self.random_seed) + tuple(self.branch[k] for k in sorted(self.branch))
+
+    def get_configuration(self) -> Dict[str, Any]:
+        """Gets the configuration overrides for this job."""
+        configuration = {
+            'input_data': {'input_draw_number': self.input_draw},
+            'randomness': {'random_seed': self.random_seed},
+        }
+        for parameter, value in self.branch.items():
+            *path, name = parameter.split('.')
+            level = configuration
+            for part in path:
+                level = level.setdefault(part, {})
+            level[name] = value
+        return configuration
+
+
+def run_sweep(model_specification: Union[str, Path], branches_file: Union[str, Path],
+              result_directory: Union[str, Path], workers: int,
+              seeds_per_batch: int = metadata.RUN_SWEEP_SEEDS_PER_BATCH, fork_scenarios: bool = False,
+              checkpoint_interval: float = metadata.RUN_SWEEP_CHECKPOINT_INTERVAL):
+    """Runs every job in a branches keyspace on a local process pool.
+
+    Parameters
+    ----------
+    model_specification
+        Path to the model specification to run.
+    branches_file
+        Path to a branches file with ``input_draw_count``,
+        ``random_seed_count`` and ``branches``.
+    result_directory
+        Directory to write results to.  If it already holds a keyspace,
+        that keyspace is used and jobs already in the output are skipped.
+    workers
+        Number of simulations to run at once.
+    seeds_per_batch
+        Number of random seeds of the same draw and branch a worker runs
+        in sequence, reusing the draw's input data.
+    fork_scenarios
+        Whether to run the period before the screening scale-up once per
+        draw and seed and fork it into each scenario.
+    checkpoint_interval
+        Seconds between checkpoints of each running simulation.  Zero or
+        less disables checkpoints.
+
+    """
+    model_specification, result_directory = Path(model_specification), Path(result_directory)
+    result_directory.mkdir(parents=True, exist_ok=True)
+
+    keyspace_path = result_directory / KEYSPACE_FILE
+    if keyspace_path.exists():
+        logger.info(f'Resuming sweep in {str(result_directory)}.')
+        with keyspace_path.open() as f:
+            keyspace = yaml.full_load(f)
+    else:
+        with Path(branches_file).open() as f:
+            branch_configuration = yaml.full_load(f)
+        keyspace = get_keyspace(branch_configuration)
+        with keyspace_path.open('w') as f:
+            yaml.dump(keyspace, f)
+        shutil.copy(branches_file, result_directory / BRANCHES_FILE)
+        shutil.copy(model_specification, result_directory / MODEL_SPECIFICATION_FILE)
+
+    output_path = result_directory / OUTPUT_FILE
+    working_path = result_directory / WORKING_OUTPUT_FILE
+    start_working_output(output_path, working_path, keyspace)
+    finished = get_finished_jobs(read_output_keys(working_path, keyspace), keyspace)
+    jobs = [job for job in get_jobs(keyspace) if job.key not in finished]
+    batches = get_batches(jobs, seeds_per_batch, fork_scenarios)
+    checkpoint_directory = None
+    if checkpoint_interval > 0:
+        checkpoint_directory = result_directory / CHECKPOINT_DIRECTORY
+        checkpoint_directory.mkdir(exist_ok=True)
+    logger.info(f'{len(finished)} jobs already finished. Running {len(jobs)} jobs in {len(batches)} batches '
+                f'with {workers} workers.')
+
+    new_rows = []
+    jobs_done = 0
+    failed_batches = []
+    last_write = time.time()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(run_batch, str(model_specification), batch, fork_scenarios,
+                                       checkpoint_directory, checkpoint_interval): batch for batch in batches}
+            for future in as_completed(futures):
+                try:
+                    batch_rows = future.result()
+                except Exception:
+                    # Keep collecting the other batches, so their jobs don't have to be rerun.
+                    batch = futures[future]
+                    logger.exception(f'Batch of {len(batch)} jobs starting with {batch[0].key} failed.')
+                    failed_batches.append(batch)
+                    continue
+                new_rows.extend(batch_rows)
+                jobs_done += len(batch_rows)
+                if time.time() - last_write > metadata.RUN_SWEEP_WRITE_INTERVAL:
+                    append_output(working_path, new_rows, keyspace)
+                    new_rows, last_write = [], time.time()
+                    logger.info(f'{jobs_done} of {len(jobs)} jobs finished.')
+    finally:
+        # Keep whatever finished, so an interrupted sweep can resume.
+        append_output(working_path, new_rows, keyspace)
+        if working_path.exists():
+            working_path.replace(output_path)
+    if failed_batches:
+        raise RuntimeError(f'{len(failed_batches)} of {len(batches)} batches failed. Finished jobs were '
+                           f'written to {str(output_path)}. Rerun the sweep to retry the failed jobs.')
+    logger.info('**Done**')
+
+
+def get_keyspace(branch_configuration: Dict[str, Any]) -> Dict[str, List]:
+    """Expands a branches file into lists of draws, seeds and branch values."""
+    keyspace = {
+        results.INPUT_DRAW_COLUMN: get_input_draws(branch_configuration['input_draw_count']),
+        results.RANDOM_SEED_COLUMN: get_random_seeds(branch_configuration['random_seed_count']),
+    }
+    for branch in get_branches(branch_configuration.get('branches', [])):
+        for parameter, value in branch.items():
+            values = keyspace.setdefault(parameter, [])
+            if value not in values:
+                values.append(value)
+    return keyspace
+
+
+def get_input_draws(input_draw_count: int) -> List[int]:
+    if input_draw_count > metadata.RUN_SWEEP_MAX_INPUT_DRAWS:
+        raise ValueError(f'Can only run up to {metadata.RUN_SWEEP_MAX_INPUT_DRAWS} input draws.')
+    if input_draw_count == metadata.RUN_SWEEP_MAX_INPUT_DRAWS:
+        return list(range(input_draw_count))
+    random_state = np.random.RandomState(metadata.RUN_SWEEP_KEYSPACE_SEED)
+    return sorted(random_state.choice(metadata.RUN_SWEEP_MAX_INPUT_DRAWS, input_draw_count, replace=False).tolist())
+
+
+def get_random_seeds(random_seed_count: int) -> List[int]:
+    random_state = np.random.RandomState(metadata.RUN_SWEEP_KEYSPACE_SEED + 1)
+    return random_state.choice(10 * random_seed_count, random_seed_count, replace=False).tolist()
+
+
+def get_branches(branches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Expands branch templates into flat ``{'a.b': value}`` branches, one per combination of values."""
+    expanded = []
+    for template in branches:
+        flat = flatten(template)
+        parameters = list(flat)
+        values = [v if isinstance(v, list) else [v] for v in flat.values()]
+        expanded.extend(dict(zip(parameters, combination)) for combination in itertools.product(*values))
+    return expanded or [{}]
+
+
+def flatten(nested: Dict[str, Any], prefix: str = '') -> Dict[str, Any]:
+    flat = {}
+    for key, value in nested.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f'{prefix}{key}.'))
+        else:
+            flat[f'{prefix}{key}'] = value
+    return flat
+
+
+def get_jobs(keyspace: Dict[str, List]) -> List[SweepJob]:
+    parameters = [p for p in keyspace if p not in [results.INPUT_DRAW_COLUMN, results.RANDOM_SEED_COLUMN]]
+    branches = [dict(zip(parameters, values)) for values in itertools.product(*[keyspace[p] for p in parameters])]
+    return [SweepJob(draw, seed, branch) for draw, seed, branch
+            in itertools.product(keyspace[results.INPUT_DRAW_COLUMN], keyspace[results.RANDOM_SEED_COLUMN], branches)]
+
+
+def get_key_columns(keyspace: Dict[str, List]) -> List[str]:
+    """Gets the output columns identifying a job, in the order of :attr:`SweepJob.key`."""
+    parameters = sorted(p for p in keyspace if p not in [results.INPUT_DRAW_COLUMN, results.RANDOM_SEED_COLUMN])
+    return [results.INPUT_DRAW_COLUMN, results.RANDOM_SEED_COLUMN] + parameters
+
+
+def get_finished_jobs(output: pd.DataFrame, keyspace: Dict[str, List]) -> set:
+    if output.empty:
+        return set()
+    return set(output[get_key_columns(keyspace)].itertuples(index=False, name=None))
+
+
+def get_batches(jobs: List[SweepJob], seeds_per_batch: int,
+                fork_scenarios: bool = False) -> List[List[SweepJob]]:
+    """Groups jobs with the same draw and branch into batches of at most ``seeds_per_batch`` seeds.
+
+    With ``fork_scenarios``, jobs that differ only in scenario share a batch
+    and are ordered by seed.
+
+    """
+    groups = {}
+    for job in jobs:
+        branch = tuple((parameter, value) for parameter, value in sorted(job.branch.items())
+                       if not (fork_scenarios and parameter == results.OUTPUT_SCENARIO_COLUMN))
+        groups.setdefault((job.input_draw, branch), {}).setdefault(job.random_seed, []).append(job)
+
+    batches = []
+    for group in groups.values():
+        seed_jobs = list(group.values())
+        batches.extend(list(itertools.chain.from_iterable(seed_jobs[i:i + seeds_per_batch]))
+                       for i in range(0, len(seed_jobs), seeds_per_batch))
+    return batches
+
+
+def run_batch(model_specification: str, batch: List[SweepJob], fork_scenarios: bool = False,
+              checkpoint_directory: Path = None, checkpoint_interval: float = None) -> List[Dict[str, Any]]:
+    """Runs jobs one after another in this process, so they share cached input data."""
+    checkpoints = (checkpoint_directory, checkpoint_interval)
+    if not fork_scenarios:
+        return [run_job(model_specification, job, *checkpoints) for job in batch]
+
+    rows = []
+    for _, seed_jobs in itertools.groupby(batch, key=lambda job: job.random_seed):
+        seed_jobs = list(seed_jobs)
+        # Jobs interrupted after the fork resume from their own checkpoints instead.
+        resumed = [job for job in seed_jobs if has_checkpoint(checkpoint_directory, job)]
+        rows.extend(run_job(model_specification, job, *checkpoints) for job in resumed)
+        forked = [job for job in seed_jobs if job not in resumed]
+        if forked:
+            rows.extend(run_forked_jobs(model_specification, forked, *checkpoints))
+    return rows
+
+
+def run_job(model_specification: str, job: SweepJob, checkpoint_directory: Path = None,
+            checkpoint_interval: float = None) -> Dict[str, Any]:
+    """Runs a single simulation and returns its metrics with the job's keys."""
+    # Local import so the parent process doesn't need a simulation stack.
+    from vivarium import InteractiveContext
+
+    sim = InteractiveContext(model_specification, configuration=job.get_configuration())
+    return finish_job(sim, job, checkpoint_directory, checkpoint_interval)
+
+
+def run_forked_jobs(model_specification: str, jobs: List[SweepJob], checkpoint_directory: Path = None,
+                    checkpoint_interval: float = None) -> List[Dict[str, Any]]:
+    """Runs jobs that differ only in scenario from one shared simulation.
+
+    The first job's simulation is run up to the start of the screening
+    scale-up, before which every scenario behaves the same.  Each other job
+    is then finished in a forked child process, one at a time so a worker
+    never uses more than one core, and the first job in this process.
+
+    """
+    from vivarium import InteractiveContext
+
+    first_job, *other_jobs = jobs
+    sim = InteractiveContext(model_specification, configuration=first_job.get_configuration())
+    sim.run_until(pd.Timestamp(data_values.SCALE_UP_START_DT))
+
+    rows = []
+    for job in other_jobs:
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            exit_code = 1
+            try:
+                set_scenario(sim, job.branch[results.OUTPUT_SCENARIO_COLUMN])
+                with os.fdopen(write_fd, 'wb') as f:
+                    pickle.dump(finish_job(sim, job, checkpoint_directory, checkpoint_interval), f)
+                exit_code = 0
+            finally:
+                # Skip the parent's cleanup handlers, which must only run once.
+                os._exit(exit_code)
+
+        os.close(write_fd)
+        with os.fdopen(read_fd, 'rb') as f:
+            result = f.read()
+        _, status = os.waitpid(pid, 0)
+        if status:
+            raise RuntimeError(f'Forked simulation for job {job.key} failed with status {status}.')
+        rows.append(pickle.loads(result))
+
+    rows.append(finish_job(sim, first_job, checkpoint_directory, checkpoint_interval))
+    return rows
+
+
+def set_scenario(sim, scenario: str):
+    for component in SCENARIO_COMPONENTS:
+        sim.get_component(component).scenario = scenario
+
+
+def finish_job(sim, job: SweepJob, checkpoint_directory: Path = None,
+               checkpoint_interval: float = None) -> Dict[str, Any]:
+    """Runs a simulation to its end and returns its metrics with the job's keys."""
+    checkpoint_path = get_checkpoint_path(checkpoint_directory, job)
+    if checkpoint_path:
+        checkpoint.run_with_checkpoints(sim, checkpoint_path, checkpoint_interval)
+    else:
+        sim.run()
+    sim.finalize()
+    row = dict(sim.report())
+    row.update({results.INPUT_DRAW_COLUMN: job.input_draw, results.RANDOM_SEED_COLUMN: job.random_seed})
+    row.update(job.branch)
+    return row
+
+
+def get_checkpoint_path(checkpoint_directory: Optional[Path], job: SweepJob) -> Optional[Path]:
+    if checkpoint_directory is None:
+        return None
+    return checkpoint_directory / ('_'.join(str(k) for k in job.key) + checkpoint.CHECKPOINT_SUFFIX)
+
+
+def has_checkpoint(checkpoint_directory: Optional[Path], job: SweepJob) -> bool:
+    checkpoint_path = get_checkpoint_path(checkpoint_directory, job)
+    return checkpoint_path is not None and checkpoint_path.exists()
+
+
+def start_working_output(output_path: Path, working_path: Path, keyspace: Dict[str, List]):
+    """Sets up the working table finished jobs are appended to.
+
+    A working table left behind by a sweep that was killed already holds
+    everything in the output and is used as is.  Otherwise the output is
+    copied, and output written in fixed format by an older sweep is
+    converted to a table.
+
+    """
+    if working_path.exists() or not output_path.exists():
+        return
+    with pd.HDFStore(str(output_path), mode='r') as store:
+        is_table = store.get_storer(OUTPUT_KEY).is_table
+    tmp_path = working_path.with_suffix('.tmp')
+    if is_table:
+        shutil.copy(output_path, tmp_path)
+    else:
+        append_output(tmp_path, pd.read_hdf(output_path, key=OUTPUT_KEY).to_dict('records'), keyspace)
+    tmp_path.replace(working_path)
+
+
+def read_output_keys(output_path: Path, keyspace: Dict[str, List]) -> pd.DataFrame:
+    """Reads only the job key columns of a table written by :func:`append_output`."""
+    if not output_path.exists():
+        return pd.DataFrame()
+    return pd.read_hdf(output_path, key=OUTPUT_KEY, columns=get_key_columns(keyspace))
+
+
+def append_output(output_path: Path, new_rows: List[Dict[str, Any]], keyspace: Dict[str, List]):
+    """Appends finished jobs to a table-format output file.
+
+    Every append must match the table's columns and dtypes, so columns are
+    put in a fixed order, result counts are stored as floats and string
+    columns are sized for the longest value in the keyspace.
+
+    """
+    if not new_rows:
+        return
+    data = pd.DataFrame(new_rows)
+    key_columns = get_key_columns(keyspace)
+    value_columns = sorted(c for c in data.columns if c not in key_columns)
+    data = data[key_columns + value_columns]
+    integer_values = data[value_columns].select_dtypes(include=[np.integer, np.bool_]).columns
+    data = data.astype({column: float for column in integer_values})
+    string_lengths = [len(value) for values in keyspace.values() for value in values if isinstance(value, str)]
+    min_itemsize = {'values': max(string_lengths)} if string_lengths else None
+    data.to_hdf(output_path, key=OUTPUT_KEY, format='table', append=True,
+                data_columns=[results.INPUT_DRAW_COLUMN, results.RANDOM_SEED_COLUMN], min_itemsize=min_itemsize)
@@ -6,11 +6,10 @@ from typing import NamedTuple, Union, List, Callable, Dict, Any
 from pathlib import Path
 from loguru import logger
 
-from vivarium_public_health.risks.data_transformations import pivot_categorical
-
 from vivarium_csu_swissre_colorectal_cancer.constants import metadata
 
-from vivarium.framework.randomness import get_hash
+from vivarium.framework.artifact import Artifact, EntityKey
+from vivarium.framework.randomness import RandomnessStream, get_hash
 
 def len_longest_location() -> int:
     """Returns the length of the longest location in the project.
@@ -68,9 +67,116 @@ def get_random_variable(draw: int, seed: str, distribution: Callable, distributi
     return distribution(**distribution_params)
 
 
-def read_data_by_draw(artifact_path: str, key : str, draw: int) -> pd.DataFrame:
-    """Reads data from the artifact on a per-draw basis. This
-    is necessary for Low Birthweight Short Gestation (LBWSG) data.
+def get_draws(randomness: RandomnessStream, index: pd.Index, additional_keys: List[str]) -> pd.DataFrame:
+    """Gets uniform draws for several decisions at once.
+
+    Each column holds exactly the draws ``randomness.get_draw(index, key)``
+    returns for its key.  Simulants are mapped to their positions in the
+    random sequence once for all keys, and each key's sequence is only
+    generated up to the largest position needed, which is a prefix of the
+    sequence vivarium generates.
+
+    Returns
+    -------
+        A frame with the index and one column per additional key.
+
+    """
+    draws = np.empty((len(index), len(additional_keys)))
+    if len(index):
+        positions = get_draw_positions(randomness, index)
+        sample_size = positions.max() + 1
+        for column, additional_key in enumerate(additional_keys):
+            random_state = np.random.RandomState(seed=get_hash(randomness._key(additional_key)))
+            draws[:, column] = random_state.random_sample(sample_size)[positions]
+    return pd.DataFrame(draws, index=index, columns=additional_keys)
+
+
+def get_draw_positions(randomness: RandomnessStream, index: pd.Index) -> np.ndarray:
+    # Mirrors how vivarium.framework.randomness.random finds each simulant's draw.
+    if randomness._for_initialization:
+        return np.arange(len(index))
+    try:
+        return np.asarray(randomness.index_map[index])
+    except (IndexError, TypeError):
+        return np.asarray(index)
+
+
+def is_stored_by_draw(artifact_path: Union[str, Path], key: str) -> bool:
+    """Checks whether data was written to the artifact on a per-draw basis.
+
+    Parameters
+    ----------
+    artifact_path
+        The artifact to look in.
+    key
+        The entity key associated with the data.
+
+    """
+    key = key.replace(".", "/")
+    with pd.HDFStore(str(artifact_path), mode='r') as store:
+        return f'/{key}/index' in store
+
+
+def write_data_by_draw(artifact: Artifact, key: str, data: pd.DataFrame,
+                       storage_profile: str = metadata.DEFAULT_ARTIFACT_STORAGE_PROFILE):
+    """Writes data to the artifact on a per-draw basis, as a shared index
+    table plus one column per draw. Simulations can then read just their
+    own draw. Read it back with :func:`read_data_by_draw` or
+    :func:`read_draws`.
+
+    Parameters
+    ----------
+    artifact
+        The artifact to write to.
+    key
+        The entity key associated with the data to write.
+    data
+        The data to write.
+    storage_profile
+        Name of the storage profile in
+        :data:`metadata.ARTIFACT_STORAGE_PROFILES` to write with.
+
+    """
+    profile = metadata.ARTIFACT_STORAGE_PROFILES[storage_profile]
+    put_kwargs = {'format': profile.format, 'complib': profile.complib, 'complevel': profile.complevel}
+    if profile.expected_rows:
+        put_kwargs['expectedrows'] = profile.expected_rows
+    with pd.HDFStore(artifact.path, mode='a') as store:
+        key = EntityKey(key)
+        artifact._keys.append(key)
+        store.put(f'{key.path}/index', data.index.to_frame(index=False), **put_kwargs)
+        data = data.reset_index(drop=True)
+        for c in data.columns:
+            store.put(f'{key.path}/{c}', data[c], **put_kwargs)
+
+
+def read_draws(artifact_path: Union[str, Path], key: str) -> pd.DataFrame:
+    """Reads every draw of data written to the artifact on a per-draw basis.
+
+    Parameters
+    ----------
+    artifact_path
+        The artifact to read from.
+    key
+        The entity key associated with the data to read.
+
+    Returns
+    -------
+        The data as written, with the full index and one column per draw.
+
+    """
+    prefix = f'/{key.replace(".", "/")}/'
+    with pd.HDFStore(str(artifact_path), mode='r') as store:
+        index = pd.MultiIndex.from_frame(store.get(f'{prefix}index'))
+        columns = [k[len(prefix):] for k in store.keys() if k.startswith(prefix) and k != f'{prefix}index']
+        data = pd.concat({column: store.get(f'{prefix}{column}') for column in columns}, axis=1)
+    data.index = index
+    return data
+
+
+def read_data_by_draw(artifact_path: Union[str, Path], key: str, draw: int) -> pd.DataFrame:
+    """Reads a single draw of data written to the artifact on a per-draw
+    basis, without reading any other draw.
 
     Parameters
     ----------
@@ -79,18 +185,21 @@ def read_data_by_draw(artifact_path: str, key : str, draw: int) -> pd.DataFrame:
     key
         The entity key associated with the data to read.
     draw
-        The data to retrieve.
+        The draw to retrieve.
+
+    Returns
+    -------
+        The demographic index columns, less location, and the draw values
+        in a ``value`` column, matching what the artifact manager returns.
 
     """
     key = key.replace(".", "/")
-    with pd.HDFStore(artifact_path, mode='r') as store:
+    with pd.HDFStore(str(artifact_path), mode='r') as store:
         index = store.get(f'{key}/index')
         draw = store.get(f'{key}/draw_{draw}')
     draw = draw.rename("value")
     data = pd.concat([index, draw], axis=1)
     data = data.drop(columns='location')
-    data = pivot_categorical(data)
-    data[project_globals.LBWSG_MISSING_CATEGORY.CAT] = project_globals.LBWSG_MISSING_CATEGORY.EXPOSURE
     return data
 
 
@@ -0,0 +1,28 @@
+import pytest
+from jinja2 import Template
+
+from vivarium_csu_swissre_colorectal_cancer import paths
+from vivarium_csu_swissre_colorectal_cancer.constants import metadata
+from vivarium_csu_swissre_colorectal_cancer.tools.make_synthetic_artifact import build_synthetic_artifact
+from vivarium_csu_swissre_colorectal_cancer.utilities import sanitize_location
+
+
+@pytest.fixture(scope="session")
+def synthetic_artifact_path(tmp_path_factory):
+    """An artifact of synthetic data, for tests that can't reach the real input data."""
+    return build_synthetic_artifact(tmp_path_factory.mktemp('artifact') / 'swissre_coverage.hdf', draws=2)
+
+
+@pytest.fixture(scope="session")
+def model_specification_path(synthetic_artifact_path):
+    """The project model specification, reading its inputs from the synthetic artifact."""
+    location = metadata.LOCATIONS[0]
+    with (paths.MODEL_SPEC_DIR / 'model_spec.in').open() as f:
+        template = Template(f.read())
+    path = synthetic_artifact_path.parent / f'{sanitize_location(location)}.yaml'
+    path.write_text(template.render(
+        location_proper=location,
+        location_sanitized=synthetic_artifact_path.stem,
+        artifact_directory=synthetic_artifact_path.parent,
+    ))
+    return path
@@ -0,0 +1,19 @@
+import pandas as pd
+
+from vivarium_csu_swissre_colorectal_cancer.constants import data_keys
+from vivarium_csu_swissre_colorectal_cancer.tools.benchmark_storage import benchmark_storage
+from vivarium_csu_swissre_colorectal_cancer.utilities import read_data_by_draw
+
+
+def test_profiles_store_the_same_data(synthetic_artifact_path, tmp_path):
+    profiles = ['fixed_zlib_9', 'table_lz4_5_small_chunks']
+    results = benchmark_storage(synthetic_artifact_path, tmp_path, profiles, repeats=1)
+
+    assert sorted(results.index) == sorted(profiles)
+    assert (results > 0).all().all()
+
+    key = data_keys.COLORECTAL_CANCER.CSMR
+    expected = read_data_by_draw(synthetic_artifact_path, key, 1)
+    for profile in profiles:
+        path = tmp_path / f'{synthetic_artifact_path.stem}.{profile}.hdf'
+        pd.testing.assert_frame_equal(read_data_by_draw(path, key, 1), expected)
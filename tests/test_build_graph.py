@@ -0,0 +1,97 @@
+import importlib
+import sys
+
+import pytest
+
+from vivarium_csu_swissre_colorectal_cancer.data.graph import BuildGraph, BuildNode, get_code_version
+
+
+def test_build_computes_shared_inputs_once():
+    calls = []
+
+    def load(key, location, *inputs):
+        calls.append(key)
+        return sum(inputs) + 1
+
+    nodes = {
+        'raw': BuildNode(load),
+        'left': BuildNode(load, ('raw',)),
+        'right': BuildNode(load, ('raw',)),
+        'both': BuildNode(load, ('left', 'right')),
+    }
+    build_graph = BuildGraph(nodes, 'location', max_workers=2)
+    data = build_graph.build(['both', 'left'])
+
+    assert data == {'both': 5, 'left': 2}
+    assert sorted(calls) == ['both', 'left', 'raw', 'right']
+    assert set(build_graph.profile) == set(nodes)
+
+
+def test_build_uses_existing_data():
+    nodes = {
+        'raw': BuildNode(lambda key, location: pytest.fail('existing data was rebuilt')),
+        'derived': BuildNode(lambda key, location, raw: raw * 2, ('raw',)),
+    }
+    build_graph = BuildGraph(nodes, 'location', load_existing=lambda key: 3 if key == 'raw' else None)
+    assert build_graph.get('derived') == 6
+
+
+def test_build_rejects_cycles():
+    nodes = {
+        'a': BuildNode(lambda key, location, b: b, ('b',)),
+        'b': BuildNode(lambda key, location, a: a, ('a',)),
+    }
+    with pytest.raises(ValueError):
+        BuildGraph(nodes, 'location').get('a')
+
+
+def load_value(key, location, *inputs):
+    return 1
+
+
+def test_hash_changes_with_parameters_and_inputs():
+    def get_hashes(raw_parameters):
+        nodes = {
+            'raw': BuildNode(load_value, parameters=raw_parameters),
+            'derived': BuildNode(load_value, ('raw',)),
+            'other': BuildNode(load_value),
+        }
+        build_graph = BuildGraph(nodes, 'location')
+        return {key: build_graph.get_hash(key) for key in nodes}
+
+    original, changed = get_hashes((0.1,)), get_hashes((0.2,))
+    assert original == get_hashes((0.1,))
+    assert original['raw'] != changed['raw']
+    assert original['derived'] != changed['derived']
+    assert original['other'] == changed['other']
+
+
+def test_profile_measures_memory_of_each_key():
+    def allocate(key, location, *inputs):
+        return bytearray(64 * 1024 ** 2) if key == 'large' else b''
+
+    nodes = {'large': BuildNode(allocate), 'small': BuildNode(allocate, ('large',))}
+    build_graph = BuildGraph(nodes, 'location')
+    build_graph.build(['small'])
+
+    assert build_graph.profile['large'].rss_delta_mb > 32
+    assert build_graph.profile['small'].rss_delta_mb < 32
+
+
+def test_code_version_changes_with_helpers_in_other_modules(tmp_path, monkeypatch):
+    package = tmp_path / 'code_version_package'
+    package.mkdir()
+    (package / '__init__.py').touch()
+    helpers = package / 'helpers.py'
+    helpers.write_text('def scale(value):\n    return 2 * value\n')
+    (package / 'loaders.py').write_text('from code_version_package import helpers\n\n\n'
+                                        'def load(key, location):\n    return helpers.scale(1)\n')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    for module in ['code_version_package', 'code_version_package.helpers', 'code_version_package.loaders']:
+        monkeypatch.delitem(sys.modules, module, raising=False)
+    loaders = importlib.import_module('code_version_package.loaders')
+
+    original = get_code_version(loaders.load, package='code_version_package')
+    assert get_code_version(loaders.load, package='code_version_package') == original
+    helpers.write_text('def scale(value):\n    return 10 * value\n')
+    assert get_code_version(loaders.load, package='code_version_package') != original
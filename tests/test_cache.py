@@ -0,0 +1,81 @@
+from typing import NamedTuple
+
+import pandas as pd
+
+from vivarium_csu_swissre_colorectal_cancer.data import cache
+
+
+def write_raw_data(path):
+    pd.DataFrame({
+        cache.RAW_LOCATION_COLUMN: ['Tianjin', 'Beijing', 'Henan'],
+        'value': [1.0, 2.0, 3.0],
+    }).to_csv(path, index=False)
+
+
+def test_read_raw_forecast_caches_swissre_locations(tmp_path):
+    data_path = tmp_path / 'raw.csv'
+    write_raw_data(data_path)
+    cache_dir = tmp_path / 'cache'
+    stale_path = cache_dir / 'raw.stale.hdf'
+    cache_dir.mkdir()
+    stale_path.touch()
+
+    data = cache.read_raw_forecast(data_path, cache_dir)
+    assert set(data[cache.RAW_LOCATION_COLUMN]) == {'Tianjin', 'Henan'}
+    assert not stale_path.exists()
+    assert len(list(cache_dir.glob('raw.*.hdf'))) == 1
+    pd.testing.assert_frame_equal(cache.read_raw_forecast(data_path, cache_dir), data)
+
+
+def test_read_raw_forecast_without_writable_cache(tmp_path):
+    data_path = tmp_path / 'raw.csv'
+    write_raw_data(data_path)
+    # A file in place of the cache directory can't be written to, even by root.
+    cache_dir = tmp_path / 'cache'
+    cache_dir.touch()
+
+    data = cache.read_raw_forecast(data_path, cache_dir)
+    assert set(data[cache.RAW_LOCATION_COLUMN]) == {'Tianjin', 'Henan'}
+
+
+def test_reference_data_without_writable_directory(tmp_path):
+    reference_dir = tmp_path / 'reference'
+    reference_dir.touch()
+    cache.configure_reference_data(reference_dir)
+    try:
+        data = cache.get_reference_data('age_bins', lambda: pd.DataFrame({'age_group_id': [1, 2]}))
+        assert data['age_group_id'].tolist() == [1, 2]
+    finally:
+        cache.configure_reference_data()
+
+
+class Entity(NamedTuple):
+    name: str
+
+
+def test_measures_are_cached_by_data_source_version(tmp_path, monkeypatch):
+    requests = [(Entity('sequela_1'), 'prevalence', 'Beijing'), (Entity('sequela_2'), 'prevalence', 'Beijing')]
+    fetched = []
+
+    def fetch(entity, measure, location):
+        fetched.append(entity.name)
+        return pd.DataFrame({'value': [float(len(fetched))]})
+
+    monkeypatch.setattr(cache, 'get_data_source_version', lambda: 'old')
+    cache.get_measures(requests, fetch, max_workers=2, cache_dir=tmp_path)
+    cache.get_measures(requests, fetch, max_workers=2, cache_dir=tmp_path)
+    assert len(fetched) == 2
+
+    monkeypatch.setattr(cache, 'get_data_source_version', lambda: 'new')
+    cache.get_measures(requests, fetch, max_workers=2, cache_dir=tmp_path)
+    assert len(fetched) == 4
+    assert sorted(path.name for path in tmp_path.glob('*.hdf')) == ['sequela_1.prevalence.beijing.new.hdf',
+                                                                   'sequela_2.prevalence.beijing.new.hdf']
+
+
+def test_measures_without_writable_cache(tmp_path):
+    cache_dir = tmp_path / 'measures'
+    cache_dir.touch()
+    data = cache.get_measures([(Entity('sequela_1'), 'prevalence', 'Beijing')],
+                              lambda *request: pd.DataFrame({'value': [1.0]}), max_workers=1, cache_dir=cache_dir)
+    assert data[0]['value'].tolist() == [1.0]
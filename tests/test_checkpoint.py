@@ -0,0 +1,83 @@
+from collections import Counter
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+from vivarium import InteractiveContext
+
+from vivarium_csu_swissre_colorectal_cancer.tools import checkpoint
+
+
+class Observer:
+
+    def __init__(self):
+        self.counts = Counter()
+
+    def get_checkpoint_state(self):
+        return {'counts': self.counts}
+
+    def set_checkpoint_state(self, state):
+        self.counts = state['counts']
+
+
+def make_sim():
+    observer = Observer()
+    sim = SimpleNamespace(
+        _population=SimpleNamespace(_population=pd.DataFrame({'alive': ['alive', 'alive']})),
+        _clock=SimpleNamespace(_time=pd.Timestamp('2020-01-01')),
+        _randomness=SimpleNamespace(_key_mapping=SimpleNamespace(_map=pd.Series([3, 5]))),
+        list_components=lambda: {'observer': observer},
+    )
+    sim.current_time = sim._clock._time
+    return sim, observer
+
+
+def test_checkpoint_round_trip(tmp_path):
+    sim, observer = make_sim()
+    sim._population._population.loc[1, 'alive'] = 'dead'
+    sim._clock._time = sim.current_time = pd.Timestamp('2025-06-01')
+    sim._randomness._key_mapping._map = pd.Series([3, 5, 8])
+    observer.counts.update({'deaths': 1})
+    path = tmp_path / f'job{checkpoint.CHECKPOINT_SUFFIX}'
+    checkpoint.write_checkpoint(sim, path)
+
+    resumed, resumed_observer = make_sim()
+    key_mapping = resumed._randomness._key_mapping
+    checkpoint.read_checkpoint(resumed, path)
+
+    assert resumed._population._population.equals(sim._population._population)
+    assert resumed._clock._time == pd.Timestamp('2025-06-01')
+    assert resumed._randomness._key_mapping is key_mapping
+    assert list(key_mapping._map) == [3, 5, 8]
+    assert resumed_observer.counts == Counter({'deaths': 1})
+
+
+def test_checkpoint_refuses_other_vivarium_version(tmp_path, monkeypatch):
+    sim, _ = make_sim()
+    path = tmp_path / f'job{checkpoint.CHECKPOINT_SUFFIX}'
+    checkpoint.write_checkpoint(sim, path)
+
+    monkeypatch.setattr(checkpoint, 'get_vivarium_version', lambda: '0.0.0')
+    resumed, _ = make_sim()
+    with pytest.raises(ValueError, match='vivarium'):
+        checkpoint.read_checkpoint(resumed, path)
+
+
+def test_checkpoint_resumes_simulation(model_specification_path, tmp_path):
+    configuration = {'population': {'population_size': 2_000}}
+    path = tmp_path / f'sim{checkpoint.CHECKPOINT_SUFFIX}'
+
+    uninterrupted = InteractiveContext(str(model_specification_path), configuration=configuration)
+    uninterrupted.take_steps(3)
+    checkpoint.write_checkpoint(uninterrupted, path)
+    uninterrupted.take_steps(3)
+
+    resumed = InteractiveContext(str(model_specification_path), configuration=configuration)
+    checkpoint.read_checkpoint(resumed, path)
+    assert resumed.current_time < uninterrupted.current_time
+    resumed.take_steps(3)
+
+    assert resumed.current_time == uninterrupted.current_time
+    pd.testing.assert_frame_equal(resumed.get_population(), uninterrupted.get_population())
+    index = uninterrupted.get_population().index
+    assert resumed.get_value('metrics')(index) == uninterrupted.get_value('metrics')(index)
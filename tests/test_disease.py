@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+
+import pandas as pd
+from vivarium import InteractiveContext
+
+from vivarium_csu_swissre_colorectal_cancer.components.disease import DrawDataCache
+
+from vivarium_csu_swissre_colorectal_cancer.constants import data_keys
+from vivarium_csu_swissre_colorectal_cancer.utilities import is_stored_by_draw
+
+
+def test_simulation_sets_up_from_per_draw_artifact(synthetic_artifact_path, model_specification_path):
+    for key in data_keys.BY_DRAW_KEYS:
+        assert is_stored_by_draw(synthetic_artifact_path, key)
+
+    sim = InteractiveContext(str(model_specification_path))
+    sim.step()
+    assert sim.get_population().alive.eq('alive').any()
+
+
+def make_builder(artifact_path, draw=0):
+    return SimpleNamespace(configuration=SimpleNamespace(
+        input_data=SimpleNamespace(artifact_path=str(artifact_path), input_draw_number=draw)
+    ))
+
+
+def test_cached_draw_data_is_reloaded_when_the_artifact_changes(tmp_path):
+    artifact_path = tmp_path / 'artifact.hdf'
+    builder = make_builder(artifact_path)
+    cache = DrawDataCache(max_draws=1)
+
+    artifact_path.write_text('first build')
+    first = cache.get(builder, 'data', lambda: pd.DataFrame({'value': [1.0]}))
+    cached = cache.get(builder, 'data', lambda: pd.DataFrame({'value': [2.0]}))
+    assert first.value[0] == cached.value[0] == 1.0
+
+    artifact_path.write_text('rebuilt artifact')
+    rebuilt = cache.get(builder, 'data', lambda: pd.DataFrame({'value': [2.0]}))
+    assert rebuilt.value[0] == 2.0
+
+
+def test_cached_draw_data_keeps_recent_draws(tmp_path):
+    artifact_path = tmp_path / 'artifact.hdf'
+    artifact_path.write_text('artifact')
+    cache = DrawDataCache(max_draws=2)
+    loads = []
+
+    def get(draw):
+        return cache.get(make_builder(artifact_path, draw), 'data', lambda: loads.append(draw) or pd.DataFrame())
+
+    for draw in [0, 1, 0, 1, 2, 1]:
+        get(draw)
+    assert loads == [0, 1, 2]
+    get(0)
+    assert loads == [0, 1, 2, 0]
+
+    cache.clear()
+    get(0)
+    assert loads == [0, 1, 2, 0, 0]
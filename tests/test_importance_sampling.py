@@ -0,0 +1,92 @@
+import shutil
+
+import numpy as np
+import pandas as pd
+from vivarium import InteractiveContext
+from vivarium.framework.artifact import Artifact
+import yaml
+
+from vivarium_csu_swissre_colorectal_cancer.components import importance_sampling
+from vivarium_csu_swissre_colorectal_cancer.constants import data_keys, data_values, metadata, results
+
+
+def test_class_weights_undo_oversampling():
+    exposure, oversampling = 0.05, 4
+    age_weights = (1.6, 0.4)
+    weights = importance_sampling.get_class_weights(age_weights, exposure, exposure * oversampling)
+
+    # Expected weight over the sampled risk groups is one for each age group.
+    sampled_exposure = exposure * oversampling
+    for in_oversampled_ages in [0, 1]:
+        expected = ((1 - sampled_exposure) * weights[2 * in_oversampled_ages]
+                    + sampled_exposure * weights[2 * in_oversampled_ages + 1])
+        assert np.isclose(expected, age_weights[in_oversampled_ages])
+
+
+def test_oversample_ages_uses_sampled_ages():
+    size, oversampling = 100_000, 3.0
+    random_state = np.random.RandomState(0)
+    # Ages sampled from a single 15 to 95 bin, as from the project's population structure.
+    age = pd.Series(random_state.uniform(15, 95, size))
+    selection_draw, age_draw = (pd.Series(random_state.uniform(size=size)) for _ in range(2))
+
+    oversampled_age, (young_weight, old_weight) = importance_sampling.oversample_ages(
+        age, oversampling, selection_draw, age_draw
+    )
+
+    old, oversampled_old = (a >= data_values.OVERSAMPLED_AGE_START for a in [age, oversampled_age])
+    p = old.mean()
+    assert np.isclose(oversampled_old.mean(), oversampling * p / (oversampling * p + 1 - p), atol=1e-4)
+    assert np.isclose(old_weight * oversampled_old.sum(), old.sum())
+    assert np.isclose(young_weight * (~oversampled_old).sum(), (~old).sum())
+    assert (oversampled_age[age != oversampled_age] >= data_values.OVERSAMPLED_AGE_START).all()
+
+    weights = np.where(oversampled_old, old_weight, young_weight)
+    for threshold in [50, 75]:
+        weighted_share = weights[oversampled_age >= threshold].sum() / weights.sum()
+        assert np.isclose(weighted_share, (age >= threshold).mean(), atol=0.01)
+
+
+def get_single_bin_population_structure(location):
+    # The structure built by data.loader.load_population_structure.
+    return pd.DataFrame([
+        {'location': location, 'sex': sex, 'age_start': 15, 'age_end': 95,
+         'year_start': year, 'year_end': year + 1, 'value': 100}
+        for year in [2019, 2020] for sex in ['Male', 'Female']
+    ]).set_index(metadata.ARTIFACT_INDEX_COLUMNS)
+
+
+def make_simulation(model_specification_path, artifact_path, tmp_path, weighted):
+    with model_specification_path.open() as f:
+        model_specification = yaml.full_load(f)
+    configuration = model_specification['configuration']
+    configuration['input_data']['artifact_path'] = str(artifact_path)
+    configuration['population']['population_size'] = 10_000
+    if weighted:
+        model_specification['components']['vivarium_public_health']['population'].remove('BasePopulation()')
+        model_specification['components']['vivarium_csu_swissre_colorectal_cancer.components'] += [
+            'WeightedPopulation()', 'SimulantWeights()'
+        ]
+        configuration['importance_sampling'] = {'age_oversampling': 3.0, 'high_risk_oversampling': 2.0}
+    path = tmp_path / f'{"weighted" if weighted else "unweighted"}.yaml'
+    with path.open('w') as f:
+        yaml.dump(model_specification, f)
+    return InteractiveContext(str(path))
+
+
+def test_weighted_population_on_single_bin_structure(synthetic_artifact_path, model_specification_path, tmp_path):
+    artifact_path = tmp_path / synthetic_artifact_path.name
+    shutil.copy(synthetic_artifact_path, artifact_path)
+    Artifact(artifact_path).replace(data_keys.POPULATION.STRUCTURE,
+                                    get_single_bin_population_structure(metadata.LOCATIONS[0]))
+
+    unweighted = make_simulation(model_specification_path, artifact_path, tmp_path, weighted=False).get_population()
+    weighted = make_simulation(model_specification_path, artifact_path, tmp_path, weighted=True).get_population()
+    weights = weighted[results.WEIGHT_COLUMN]
+
+    in_oversampled_ages = weighted.age >= data_values.OVERSAMPLED_AGE_START
+    assert in_oversampled_ages.mean() > (unweighted.age >= data_values.OVERSAMPLED_AGE_START).mean() + 0.05
+    assert np.isclose(weights.sum(), len(weighted), rtol=0.02)
+    for threshold in [data_values.OVERSAMPLED_AGE_START, data_values.FIRST_SCREENING_AGE]:
+        weighted_share = weights[weighted.age >= threshold].sum() / weights.sum()
+        assert np.isclose(weighted_share, (unweighted.age >= threshold).mean(), atol=0.02)
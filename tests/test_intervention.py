@@ -5,8 +5,8 @@ from vivarium import InteractiveContext
 from vivarium_csu_swissre_colorectal_cancer.constants import data_values
 
 @pytest.fixture(scope="module")
-def sim():
-    sim = InteractiveContext('src/vivarium_csu_swissre_colorectal_cancer/model_specifications/swissre_coverage.yaml')
+def sim(model_specification_path):
+    sim = InteractiveContext(str(model_specification_path))
     sim.step()
     return sim
 
@@ -0,0 +1,31 @@
+import numpy as np, pandas as pd
+import pytest
+
+from vivarium_csu_swissre_colorectal_cancer.constants import metadata
+
+# The loader imports the GBD access packages, which are only installed with the dev extras.
+loader = pytest.importorskip('vivarium_csu_swissre_colorectal_cancer.data.loader')
+
+
+def make_long_data():
+    rows = [(sex, age, age + 5, year, year + 1, draw)
+            for draw in [2, 0, 1]
+            for sex in ['Male', 'Female']
+            for age in [15.0, 20.0]
+            for year in range(2019, 2041)]
+    index = pd.MultiIndex.from_tuples(rows, names=['sex', 'age_start', 'age_end',
+                                                   'year_start', 'year_end', 'draw'])
+    values = np.random.RandomState(0).uniform(size=len(index))
+    return index, values
+
+
+@pytest.mark.parametrize('year_chunk_size', [None, 1, 5, metadata.MAKE_ARTIFACT_PIVOT_YEAR_CHUNK_SIZE, 100])
+def test_pivot_draws_matches_unstack(year_chunk_size):
+    index, values = make_long_data()
+    expected = pd.Series(values, index=index).unstack('draw')
+
+    wide = loader._pivot_draws('SwissRE Coverage', index, values, year_chunk_size)
+    assert list(wide.index.names) == metadata.ARTIFACT_INDEX_COLUMNS
+    assert list(wide.columns) == ['draw_0', 'draw_1', 'draw_2']
+    wide = wide.reset_index('location', drop=True)
+    assert np.allclose(wide.values, expected.loc[wide.index].values)
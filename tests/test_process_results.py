@@ -0,0 +1,161 @@
+import numpy as np, pandas as pd
+import yaml
+
+from vivarium_csu_swissre_colorectal_cancer.constants import results
+from vivarium_csu_swissre_colorectal_cancer.results_processing import process_results
+
+
+def make_output_data(draws, seeds, scenarios=('baseline', 'alternative')):
+    rows = []
+    for draw in draws:
+        for seed in seeds:
+            for scenario in scenarios:
+                rows.append({
+                    results.INPUT_DRAW_COLUMN: draw,
+                    results.RANDOM_SEED_COLUMN: seed,
+                    process_results.SCENARIO_COLUMN: scenario,
+                    'deaths': float(draw + seed),
+                })
+    return pd.DataFrame(rows)
+
+
+def test_incremental_aggregation_matches_full_aggregation():
+    data = make_output_data(draws=[0, 1], seeds=[0, 1, 2, 3])
+    expected = process_results.aggregate_over_seed(data).set_index(process_results.GROUPBY_COLUMNS).sort_index()
+
+    folded = pd.DataFrame(columns=[results.INPUT_DRAW_COLUMN, results.RANDOM_SEED_COLUMN], dtype=int)
+    first = data[data[results.RANDOM_SEED_COLUMN] < 2]
+    seed_sums, folded = process_results.fold_into_aggregate(None, first, folded)
+    assert len(folded) == 4
+
+    new_data = process_results.drop_folded_seeds(data, folded)
+    assert len(new_data) == len(data) - len(first)
+    seed_sums, folded = process_results.fold_into_aggregate(seed_sums, new_data, folded)
+
+    actual = seed_sums.set_index(process_results.GROUPBY_COLUMNS).sort_index()
+    assert np.allclose(actual['deaths'], expected['deaths'])
+    assert process_results.drop_folded_seeds(data, folded).empty
+
+
+def write_incremental_output(output_dir, data, keyspace):
+    with (output_dir / 'keyspace.yaml').open('w') as f:
+        yaml.dump(keyspace, f)
+    data = data.rename(columns={process_results.SCENARIO_COLUMN: results.OUTPUT_SCENARIO_COLUMN})
+    data.to_hdf(output_dir / 'output.hdf', 'data', format='table', append=True, min_itemsize={'values': 16})
+
+
+def test_incremental_aggregation_reads_only_new_rows(tmp_path):
+    from vivarium_csu_swissre_colorectal_cancer.tools.make_results import AGGREGATE_CACHE_FILE, aggregate_incrementally
+    keyspace = {results.INPUT_DRAW_COLUMN: [0],
+                results.RANDOM_SEED_COLUMN: [0, 1],
+                results.OUTPUT_SCENARIO_COLUMN: ['baseline', 'alternative']}
+    data = make_output_data(draws=[0], seeds=[0, 1])
+    output_path = tmp_path / 'output.hdf'
+
+    # Only the baseline run of seed 0 has finished.
+    write_incremental_output(tmp_path, data.iloc[:1], keyspace)
+    assert aggregate_incrementally(output_path, single_run=False).empty
+    cache = process_results.read_aggregate_cache(tmp_path / AGGREGATE_CACHE_FILE)
+    assert cache.rows_read == 1 and len(cache.pending) == 1
+
+    write_incremental_output(tmp_path, data.iloc[1:], keyspace)
+    seed_sums = aggregate_incrementally(output_path, single_run=False)
+    expected = process_results.aggregate_over_seed(data)
+    pd.testing.assert_frame_equal(seed_sums.set_index(process_results.GROUPBY_COLUMNS).sort_index(),
+                                  expected.set_index(process_results.GROUPBY_COLUMNS).sort_index(),
+                                  check_like=True)
+    cache = process_results.read_aggregate_cache(tmp_path / AGGREGATE_CACHE_FILE)
+    assert cache.rows_read == len(data) and cache.pending.empty
+
+
+def test_get_dense_draws_aligns_cells_and_draws():
+    data = pd.DataFrame({
+        results.INPUT_DRAW_COLUMN: [3, 1, 3, 1],
+        process_results.SCENARIO_COLUMN: ['baseline', 'baseline', 'alternative', 'alternative'],
+        'value': [4.0, 2.0, 3.0, 1.0],
+    })
+    cells, draws, values = process_results.get_dense_draws(data)
+    assert list(cells[process_results.SCENARIO_COLUMN]) == ['alternative', 'baseline']
+    assert list(draws) == [1, 3]
+    assert np.allclose(values, [[1.0, 3.0], [2.0, 4.0]])
+
+
+def test_summarize_draws():
+    cells = pd.DataFrame({'measure': ['deaths']})
+    values = np.arange(1, 101, dtype=float).reshape(1, -1)
+    summary = process_results.summarize_draws(cells, values)
+    assert np.isclose(summary.loc[0, 'mean'], 50.5)
+    assert np.isclose(summary.loc[0, 'median'], 50.5)
+    assert summary.loc[0, 'lower'] < summary.loc[0, 'mean'] < summary.loc[0, 'upper']
+
+
+def test_scenario_differences_are_paired_by_seed():
+    data = make_output_data(draws=[0, 1], seeds=[0, 1])
+    data.loc[data[process_results.SCENARIO_COLUMN] == 'alternative', 'deaths'] -= 1.0
+    pairing_columns = [results.INPUT_DRAW_COLUMN, results.RANDOM_SEED_COLUMN]
+
+    differences, ratios = process_results.get_scenario_differences(data, pairing_columns)
+
+    assert list(differences[process_results.SCENARIO_COLUMN].unique()) == ['alternative']
+    assert list(differences[results.INPUT_DRAW_COLUMN]) == [0, 1]
+    assert np.allclose(differences['deaths'], 2.0)  # one death averted per seed
+    baseline = process_results.aggregate_over_seed(data).query('scenario == "baseline"')['deaths'].values
+    assert np.allclose(ratios['deaths'], (baseline - 2.0) / baseline)
+
+
+def test_rollups_cover_marginals():
+    rows = [{results.INPUT_DRAW_COLUMN: draw, process_results.SCENARIO_COLUMN: 'baseline',
+             'year': str(year), 'sex': sex, 'value': 1.0}
+            for draw in [0, 1] for year in range(2020, 2027) for sex in ['male', 'female']]
+    data = pd.DataFrame(rows)
+
+    rollups = process_results.get_rollups(data, ['year', 'sex']).set_index(
+        [results.INPUT_DRAW_COLUMN, 'year', 'sex'])['value']
+
+    assert rollups.loc[(0, process_results.ALL, process_results.ALL)] == 14
+    assert rollups.loc[(1, '2020_to_2024', 'male')] == 5
+    assert rollups.loc[(1, '2025_to_2026', process_results.ALL)] == 4
+    assert rollups.loc[(0, '2021', process_results.ALL)] == 2
+    assert not rollups.index.isin([(0, '2021', 'male')]).any()
+
+
+def test_split_replicates_gives_one_row_per_replicate():
+    data = pd.DataFrame({
+        results.INPUT_DRAW_COLUMN: [0, 0],
+        results.RANDOM_SEED_COLUMN: [7, 7],
+        process_results.SCENARIO_COLUMN: ['baseline', 'alternative'],
+        results.TOTAL_YLLS_COLUMN: [10.0, 8.0],
+        'deaths_replicate_0': [1.0, 2.0],
+        'deaths_replicate_1': [3.0, 4.0],
+    })
+    keyspace = {results.INPUT_DRAW_COLUMN: [0], results.RANDOM_SEED_COLUMN: [7],
+                results.OUTPUT_SCENARIO_COLUMN: ['baseline', 'alternative']}
+
+    split = process_results.split_replicates(data)
+
+    assert len(split) == 4
+    assert 'deaths' in split.columns
+    assert split[results.RANDOM_SEED_COLUMN].unique().tolist() == [7]
+    assert sorted(split[results.REPLICATE_COLUMN].unique()) == [0, 1]
+    assert len(process_results.filter_out_incomplete(split, keyspace)) == 4
+    totals = process_results.aggregate_over_seed(split).set_index(process_results.SCENARIO_COLUMN)
+    assert results.REPLICATE_COLUMN not in totals.columns
+    assert np.allclose(totals.loc[['baseline', 'alternative'], 'deaths'], [4.0, 6.0])
+    assert np.allclose(totals.loc[['baseline', 'alternative'], results.TOTAL_YLLS_COLUMN], [10.0, 8.0])
+
+    pairing_columns = [results.INPUT_DRAW_COLUMN, results.RANDOM_SEED_COLUMN, results.REPLICATE_COLUMN]
+    differences, _ = process_results.get_scenario_differences(split, pairing_columns)
+    assert np.allclose(differences['deaths'], [-2.0])
+
+
+def test_apply_weights_sums_weighted_classes():
+    data = pd.DataFrame({
+        results.INPUT_DRAW_COLUMN: [0],
+        'deaths_weight_class_0': [2.0],
+        'deaths_weight_class_3': [4.0],
+        results.CLASS_WEIGHT_COLUMN_TEMPLATE.format(WEIGHT_CLASS=0): [1.5],
+        results.CLASS_WEIGHT_COLUMN_TEMPLATE.format(WEIGHT_CLASS=3): [0.25],
+    })
+    weighted = process_results.apply_weights(data)
+    assert list(weighted.columns) == [results.INPUT_DRAW_COLUMN, 'deaths']
+    assert np.isclose(weighted.loc[0, 'deaths'], 2.0 * 1.5 + 4.0 * 0.25)
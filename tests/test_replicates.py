@@ -0,0 +1,37 @@
+import pytest
+from vivarium import InteractiveContext
+import yaml
+
+from vivarium_csu_swissre_colorectal_cancer.constants import results
+
+
+def make_simulation(model_specification_path, tmp_path, key_columns):
+    with model_specification_path.open() as f:
+        model_specification = yaml.full_load(f)
+    model_specification['components']['vivarium_public_health']['population'].remove('BasePopulation()')
+    model_specification['components']['vivarium_csu_swissre_colorectal_cancer.components'].append(
+        'ReplicatedPopulation()'
+    )
+    configuration = model_specification['configuration']
+    configuration['population']['population_size'] = 3_000
+    configuration['replicates'] = {'count': 3}
+    configuration['randomness']['key_columns'] = key_columns
+    path = tmp_path / 'replicated.yaml'
+    with path.open('w') as f:
+        yaml.dump(model_specification, f)
+    return InteractiveContext(str(path))
+
+
+def test_replicates_are_stratified(model_specification_path, tmp_path):
+    sim = make_simulation(model_specification_path, tmp_path, ['entrance_time', 'age', results.REPLICATE_COLUMN])
+    sim.take_steps(2)
+
+    pop = sim.get_population()
+    assert pop[results.REPLICATE_COLUMN].value_counts().tolist() == [1_000] * 3
+    metrics = sim.get_value('metrics')(pop.index)
+    assert any(column.endswith(f'_{results.REPLICATE_COLUMN}_2') for column in metrics)
+
+
+def test_replicates_need_their_own_randomness_keys(model_specification_path, tmp_path):
+    with pytest.raises(ValueError, match='randomness.key_columns'):
+        make_simulation(model_specification_path, tmp_path, ['entrance_time', 'age'])
@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+
+from vivarium_csu_swissre_colorectal_cancer.results_processing import process_results
+from vivarium_csu_swissre_colorectal_cancer.results_processing.results_dataset import (ROLLUP_KEY, open_results,
+                                                                                      write_partitioned)
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    rows = [{'input_draw': draw, 'scenario': scenario, 'year': str(year), 'sex': sex,
+             'measure': 'death', 'cause': 'other_causes', 'value': float(year)}
+            for draw in [0, 1] for scenario in ['baseline', 'alternative']
+            for year in range(2020, 2025) for sex in ['male', 'female']]
+    data = pd.DataFrame(rows)
+    measure_data = process_results.MeasureData(*[data] * len(process_results.MeasureData._fields))
+    write_partitioned(measure_data, tmp_path)
+    return open_results(tmp_path)
+
+
+def test_query_reads_requested_partitions_and_rows(dataset):
+    assert dataset.scenarios('deaths') == ['alternative', 'baseline']
+
+    data = dataset.query('deaths', scenario='alternative', years=range(2021, 2023), sex='female')
+    assert set(data.scenario) == {'alternative'}
+    assert set(data.year) == {'2021', '2022'}
+    assert set(data.sex) == {'female'}
+    assert len(data) == 2 * 2  # draws x years
+
+
+def test_query_rejects_unknown_dimensions(dataset):
+    with pytest.raises(ValueError):
+        dataset.query('deaths', age_group='all_ages')
+    with pytest.raises(ValueError):
+        dataset.query('not_a_measure')
+
+
+def test_query_reads_rollups(tmp_path):
+    rows = [{'input_draw': 0, 'scenario': 'baseline', 'year': str(year), 'sex': sex, 'value': 1.0}
+            for year in range(2020, 2025) for sex in ['male', 'female']]
+    data = pd.DataFrame(rows)
+    rollups = process_results.get_rollups(data, ['year', 'sex'])
+    write_partitioned(process_results.MeasureData(*[data] * len(process_results.MeasureData._fields)), tmp_path)
+    write_partitioned(process_results.MeasureData(*[rollups] * len(process_results.MeasureData._fields)),
+                      tmp_path, key=ROLLUP_KEY)
+
+    data = open_results(tmp_path).query('person_time', years='all', sex='all')
+    assert data.value.tolist() == [10.0]
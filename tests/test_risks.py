@@ -1,7 +1,7 @@
 from vivarium import InteractiveContext
 
-def test_preclinical_incidence():
-    sim = InteractiveContext('src/vivarium_csu_swissre_colorectal_cancer/model_specifications/swissre_coverage.yaml')
+def test_preclinical_incidence(model_specification_path):
+    sim = InteractiveContext(str(model_specification_path))
 
     pop = sim.get_population()
     exp = sim.get_value("family_history_or_adenoma.exposure")(pop.index)
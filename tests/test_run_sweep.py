@@ -0,0 +1,111 @@
+import pandas as pd
+import pytest
+import yaml
+
+from vivarium_csu_swissre_colorectal_cancer.constants import results
+from vivarium_csu_swissre_colorectal_cancer.tools import run_sweep
+
+
+def test_keyspace_expands_branches():
+    keyspace = run_sweep.get_keyspace({
+        'input_draw_count': 3,
+        'random_seed_count': 4,
+        'branches': [{'screening_algorithm': {'scenario': ['baseline', 'alternative']}}],
+    })
+    assert len(keyspace[results.INPUT_DRAW_COLUMN]) == 3
+    assert len(set(keyspace[results.RANDOM_SEED_COLUMN])) == 4
+    assert keyspace[results.OUTPUT_SCENARIO_COLUMN] == ['baseline', 'alternative']
+
+    jobs = run_sweep.get_jobs(keyspace)
+    assert len(jobs) == 3 * 4 * 2
+    assert jobs[0].get_configuration() == {
+        'input_data': {'input_draw_number': jobs[0].input_draw},
+        'randomness': {'random_seed': jobs[0].random_seed},
+        'screening_algorithm': {'scenario': 'baseline'},
+    }
+
+
+def test_finished_jobs_are_skipped():
+    keyspace = {results.INPUT_DRAW_COLUMN: [0, 1],
+                results.RANDOM_SEED_COLUMN: [5],
+                results.OUTPUT_SCENARIO_COLUMN: ['baseline', 'alternative']}
+    output = pd.DataFrame({results.INPUT_DRAW_COLUMN: [1], results.RANDOM_SEED_COLUMN: [5],
+                           results.OUTPUT_SCENARIO_COLUMN: ['alternative'], 'total_population': [10.0]})
+
+    finished = run_sweep.get_finished_jobs(output, keyspace)
+    remaining = [job for job in run_sweep.get_jobs(keyspace) if job.key not in finished]
+    assert len(remaining) == 3
+    assert (1, 5, 'alternative') not in [job.key for job in remaining]
+
+
+def test_batches_share_draw_and_branch():
+    keyspace = {results.INPUT_DRAW_COLUMN: [0, 1],
+                results.RANDOM_SEED_COLUMN: list(range(5)),
+                results.OUTPUT_SCENARIO_COLUMN: ['baseline', 'alternative']}
+    batches = run_sweep.get_batches(run_sweep.get_jobs(keyspace), seeds_per_batch=2)
+
+    assert len(batches) == 2 * 2 * 3
+    for batch in batches:
+        assert len({(job.input_draw,) + job.key[2:] for job in batch}) == 1
+    assert sum(len(batch) for batch in batches) == 2 * 5 * 2
+
+
+def test_forked_batches_pair_scenarios_by_seed():
+    keyspace = {results.INPUT_DRAW_COLUMN: [0, 1],
+                results.RANDOM_SEED_COLUMN: list(range(5)),
+                results.OUTPUT_SCENARIO_COLUMN: ['baseline', 'alternative']}
+    batches = run_sweep.get_batches(run_sweep.get_jobs(keyspace), seeds_per_batch=2, fork_scenarios=True)
+
+    assert len(batches) == 2 * 3
+    for batch in batches:
+        assert len({job.input_draw for job in batch}) == 1
+        seeds = [job.random_seed for job in batch]
+        assert seeds == sorted(seeds, key=seeds.index)  # Each seed's jobs are contiguous.
+        assert all(seeds.count(seed) == 2 for seed in seeds)
+
+
+def run_batch_failing_on_draw_one(model_specification, batch, *args):
+    if batch[0].input_draw == 1:
+        raise ValueError('Simulation failed.')
+    return [{results.INPUT_DRAW_COLUMN: job.input_draw, results.RANDOM_SEED_COLUMN: job.random_seed,
+             **job.branch, 'total_population': 10.0} for job in batch]
+
+
+def test_failed_batches_keep_other_results(tmp_path, monkeypatch):
+    keyspace = {results.INPUT_DRAW_COLUMN: [0, 1, 2],
+                results.RANDOM_SEED_COLUMN: [5],
+                results.OUTPUT_SCENARIO_COLUMN: ['baseline', 'alternative']}
+    with (tmp_path / run_sweep.KEYSPACE_FILE).open('w') as f:
+        yaml.dump(keyspace, f)
+    # Workers are forked, so they see the patched batch runner.
+    monkeypatch.setattr(run_sweep, 'run_batch', run_batch_failing_on_draw_one)
+
+    with pytest.raises(RuntimeError, match='1 of 3 batches failed'):
+        run_sweep.run_sweep('model_specification.yaml', 'branches.yaml', tmp_path, workers=2,
+                            seeds_per_batch=1, checkpoint_interval=0)
+
+    output = pd.read_hdf(tmp_path / run_sweep.OUTPUT_FILE)
+    assert sorted(output[results.INPUT_DRAW_COLUMN].unique()) == [0, 2]
+    assert len(run_sweep.get_finished_jobs(output, keyspace)) == 4
+
+
+def test_output_is_appended_to_a_working_table(tmp_path):
+    keyspace = {results.INPUT_DRAW_COLUMN: [0, 1],
+                results.RANDOM_SEED_COLUMN: [5],
+                results.OUTPUT_SCENARIO_COLUMN: ['baseline', 'alternative']}
+    output_path = tmp_path / run_sweep.OUTPUT_FILE
+    working_path = tmp_path / run_sweep.WORKING_OUTPUT_FILE
+    # Output written in fixed format by an older sweep.
+    pd.DataFrame({results.INPUT_DRAW_COLUMN: [0], results.RANDOM_SEED_COLUMN: [5],
+                  results.OUTPUT_SCENARIO_COLUMN: ['baseline'], 'total_population': [10]}).to_hdf(output_path, 'data')
+
+    run_sweep.start_working_output(output_path, working_path, keyspace)
+    for draw in [0, 1]:
+        run_sweep.append_output(working_path, [{results.INPUT_DRAW_COLUMN: draw, results.RANDOM_SEED_COLUMN: 5,
+                                                results.OUTPUT_SCENARIO_COLUMN: 'alternative',
+                                                'total_population': 12}], keyspace)
+
+    keys = run_sweep.read_output_keys(working_path, keyspace)
+    assert run_sweep.get_finished_jobs(keys, keyspace) == {(0, 5, 'baseline'), (0, 5, 'alternative'),
+                                                           (1, 5, 'alternative')}
+    assert pd.read_hdf(working_path)['total_population'].tolist() == [10.0, 12.0, 12.0]
@@ -3,9 +3,17 @@ import numpy as np, pandas as pd
 
 from vivarium import InteractiveContext
 
+from vivarium_csu_swissre_colorectal_cancer.components.screening import get_offset
+from vivarium_csu_swissre_colorectal_cancer.constants import data_values
+from vivarium_csu_swissre_colorectal_cancer.utilities import get_draws
+
+def to_timestamp(offsets, start_time):
+    offsets = offsets.where(offsets != data_values.NO_SCREENING_DATE)
+    return (start_time + pd.to_timedelta(offsets, unit='ns')).rename(offsets.name)
+
 @pytest.fixture(scope="module")
-def sim():
-    sim = InteractiveContext('src/vivarium_csu_swissre_colorectal_cancer/model_specifications/swissre_coverage.yaml')
+def sim(model_specification_path):
+    sim = InteractiveContext(str(model_specification_path))
     sim.step()
     return sim
 
@@ -22,7 +30,8 @@ def test_screenings_are_getting_scheduled(sim):
 def test_previous_screenings_initialized_to_happen_before_sim(sim):
     pop = sim.get_population()
     component = sim.get_component('screening_algorithm')
-    time_since_previous_screening = ((component.clock() - pop.previous_screening_date)
+    previous_screening_date = to_timestamp(pop.previous_screening_date, component.start_time)
+    time_since_previous_screening = ((component.clock() - previous_screening_date)
                                      / pd.Timedelta(days=1))
     medium_risk = (pop.screening_result == 'negative_cancer_screen')
     assert 365/2 <= np.mean(time_since_previous_screening[medium_risk]) <= 365, 'medium-risk population seen in the last year'
@@ -30,13 +39,16 @@ def test_previous_screenings_initialized_to_happen_before_sim(sim):
     high_risk = (pop.screening_result == 'at_high_risk_cancer_screen')
     assert 5*365/2 <= np.mean(time_since_previous_screening[high_risk]) <= 5*365, 'high-risk population seen in last five years'
 
-def test_next_screenings_initialized_to_happen_appropriately(initial_pop):
-    assert np.all(initial_pop.next_screening_date.dropna() >= '2020-01-01')
+def test_next_screenings_initialized_to_happen_appropriately(sim, initial_pop):
+    component = sim.get_component('screening_algorithm')
+    next_screening_date = to_timestamp(initial_pop.next_screening_date, component.start_time)
+    assert np.all(next_screening_date.dropna() >= '2020-01-01')
 
 def test_next_screenings_initialized_to_happen_before_sim(sim):
     pop = sim.get_population()
     component = sim.get_component('screening_algorithm')
-    time_to_next_screening = ((pop.next_screening_date - component.clock())
+    next_screening_date = to_timestamp(pop.next_screening_date, component.start_time)
+    time_to_next_screening = ((next_screening_date - component.clock())
                                      / pd.Timedelta(days=1))
     within_screening_age = component._within_screening_age(pop.age)
 
@@ -81,18 +93,39 @@ def test_schedule_screening(sim):
     component = sim.get_component('screening_algorithm')
     
     n = 10_000
-    previous_screening = pd.Series([component.clock()]*n)
+    previous_screening = pd.Series([get_offset(component.clock(), component.start_time)]*n)
     screening_result = pd.Series(['negative_cancer_screen']*n)
     age = pd.Series([60]*n)
 
     next_screening = component._schedule_screening(previous_screening, screening_result)
-    assert np.allclose(np.mean((next_screening - previous_screening) / pd.Timedelta(days=1)),
-                       365, rtol=.35)
+    days_to_next_screening = (next_screening - previous_screening) / data_values.NANOSECONDS_PER_DAY
+    assert np.allclose(np.mean(days_to_next_screening), 365, rtol=.35)
 
     screening_result[:] = "at_high_risk_cancer_screen"
     next_screening = component._schedule_screening(previous_screening, screening_result)
-    assert np.allclose(np.mean((next_screening - previous_screening) / pd.Timedelta(days=1)),
-                       5*365, rtol=.35)
+    days_to_next_screening = (next_screening - previous_screening) / data_values.NANOSECONDS_PER_DAY
+    assert np.allclose(np.mean(days_to_next_screening), 5*365, rtol=.35)
+
+def test_schedule_screening_matches_timestamps(sim):
+    component = sim.get_component('screening_algorithm')
+
+    n = 1_000
+    draw = pd.Series(np.random.uniform(size=3*n))
+    screening_result = pd.Series(['negative_cancer_screen']*n + ['at_high_risk_cancer_screen']*n
+                                 + ['positive_colorectal_cancer_screen']*n)
+    previous_screening = pd.Series([get_offset(component.clock(), component.start_time)]*(3*n))
+
+    next_screening = to_timestamp(component._schedule_screening(previous_screening, screening_result, draw),
+                                  component.start_time)
+
+    expected = pd.Series(pd.NaT, index=draw.index)
+    for result, (_, distribution, kwargs) in [('negative_cancer_screen', data_values.DAYS_UNTIL_NEXT_ANNUAL),
+                                              ('at_high_risk_cancer_screen', data_values.DAYS_UNTIL_NEXT_QUINQUENNIAL)]:
+        scheduled = screening_result == result
+        expected[scheduled] = component.clock() + pd.to_timedelta(distribution.ppf(draw[scheduled], **kwargs),
+                                                                  unit='day')
+    assert next_screening.isna().equals(expected.isna())
+    assert ((next_screening - expected).dropna().abs() <= pd.Timedelta(1, unit='ns')).all()
 
 def test_do_screening(sim):
     component = sim.get_component('screening_algorithm')
@@ -117,6 +150,32 @@ def test_do_screening(sim):
 
     assert screened_cancer_state.nunique() == 3
 
+def test_batched_draws_match_single_draws(sim):
+    component = sim.get_component('screening_algorithm')
+    index = sim.get_population().index[::7]
+    keys = ['attendance', 'fobt_sensitivity', 'schedule_next']
+    draws = get_draws(component.randomness, index, keys)
+    for key in keys:
+        assert draws[key].equals(component.randomness.get_draw(index, key))
+
+def test_living_index_matches_population(sim):
+    pop = sim.get_population()
+    living = sim.get_component('living_index').living
+    assert living.sort_values().equals(pop.index[pop.alive == 'alive'].sort_values())
+
+def test_living_index_answers_full_population_without_scanning_dead(sim, monkeypatch):
+    component = sim.get_component('living_index')
+    full_index = sim.get_population(untracked=True).index
+    subset = full_index[::3]
+    expected_subset = subset.intersection(component.living)
+
+    def fail(*args, **kwargs):
+        raise AssertionError('the full population index was intersected')
+    monkeypatch.setattr(pd.Index, 'intersection', fail)
+    assert component.get_living(full_index) is component.living
+    monkeypatch.undo()
+    assert component.get_living(subset).equals(expected_subset)
+
 @pytest.mark.skip
 def test_high_risk_detection_rate(sim):
     # TODO: confirm that high risk is being detected at the rate expected
@@ -0,0 +1,22 @@
+from vivarium.framework.artifact import Artifact
+
+from vivarium_csu_swissre_colorectal_cancer.constants import data_keys, metadata
+from vivarium_csu_swissre_colorectal_cancer.utilities import read_data_by_draw
+
+
+def test_synthetic_artifact_has_every_key(synthetic_artifact_path):
+    artifact = Artifact(synthetic_artifact_path)
+    for key_group in data_keys.MAKE_ARTIFACT_KEY_GROUPS:
+        for key in key_group:
+            assert key in artifact
+
+    acmr = artifact.load(data_keys.POPULATION.ACMR)
+    assert list(acmr.columns) == ['draw_0', 'draw_1']
+    assert ((acmr > 0) & (acmr < 1)).all().all()
+
+
+def test_synthetic_artifact_stores_draws_separately(synthetic_artifact_path):
+    prevalence = read_data_by_draw(synthetic_artifact_path, data_keys.COLORECTAL_CANCER.RAW_PREVALENCE, 1)
+    assert list(prevalence.columns) == metadata.ARTIFACT_INDEX_COLUMNS[1:] + ['value']
+    assert prevalence.year_start.min() == 1990 and prevalence.year_start.max() == 2040
+    assert ((prevalence.value > 0) & (prevalence.value < 1)).all()